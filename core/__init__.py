@@ -1,3 +1,33 @@
 from .models import get_model_names
-from .search import copy_search_results, semantic_search, textual_search
-from .tag import show_stats, show_tags, tag_all_images
+from .search import (
+    benchmark_scoring_modes,
+    catalog_geo_search,
+    catalog_semantic_search,
+    catalog_semantic_search_batch,
+    catalog_similar_images,
+    catalog_textual_search,
+    catalog_textual_search_batch,
+    check_search_regressions,
+    copy_search_results,
+    geo_search,
+    semantic_search,
+    semantic_search_batch,
+    show_scoring_mode_reports,
+    similar_images,
+    streaming_semantic_search_batch,
+    textual_search,
+    textual_search_batch,
+)
+from .tag import (
+    benchmark_inference_profile,
+    benchmark_text_only_model,
+    enrich_images,
+    find_duplicates,
+    select_images_to_enrich,
+    show_stats,
+    show_tags,
+    tag_all_images,
+    tag_cascade,
+    tag_catalog,
+    watch_directory,
+)
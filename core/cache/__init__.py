@@ -0,0 +1,14 @@
+"""
+Global, content-addressed cache of derived artifacts (LLM descriptions & tags, embeddings, geocodes), shared across
+directories.  Artifacts are keyed by a hash of their inputs (e.g. image content + model + prompt) instead of by
+directory & filename, such that copied, moved or renamed images don't need to be processed again.
+"""
+
+from ._artifact_cache import (
+    ArtifactCache,
+    artifact_key,
+    compute_file_hash,
+    get_artifact_cache,
+    get_or_compute,
+    set_artifact_cache,
+)
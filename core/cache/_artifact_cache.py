@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, TypeVar
+
+from core.config import ARTIFACT_CACHE_DIR, ARTIFACT_CACHE_MAX_SIZE_MB
+
+T = TypeVar("T")
+
+
+# =================================================================================================
+#  Keys
+# =================================================================================================
+def compute_file_hash(path: Path) -> str:
+    """Return sha256 hex digest of the content of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def artifact_key(*parts: str) -> str:
+    """
+    Return cache key for an artifact, based on all inputs it was derived from, e.g. ('description', <image hash>,
+    <model>, <prompt>).  Any change to any of the parts results in a different key.
+    """
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+# =================================================================================================
+#  Cache
+# =================================================================================================
+class ArtifactCache:
+    """
+    Size-bounded cache of JSON-serializable artifacts, stored as 1 file per artifact.  When the total size exceeds the
+    limit, least-recently-used artifacts (based on file modification time, which is refreshed upon each hit) are
+    evicted.  Writes are atomic, so the cache can safely be shared by multiple processes.
+    """
+
+    def __init__(self, directory: Path, max_size_mb: float):
+        self.directory = directory
+        self.max_size_bytes = int(max_size_mb * 1e6)
+        self._size_bytes: int | None = None  # determined lazily, upon first write
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any | None:
+        """Return cached artifact, or None if not present."""
+        path = self._path(key)
+        try:
+            value = json.loads(path.read_text(encoding="utf-8"))
+            os.utime(path)  # mark as recently used
+            return value
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, key: str, value: Any):
+        """Store artifact (any JSON-serializable value) & evict old artifacts if needed."""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(value), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._size_bytes is None:
+                self._size_bytes = sum(size for _, size, _ in self._scan())
+            else:
+                self._size_bytes += path.stat().st_size
+            if self._size_bytes > self.max_size_bytes:
+                self._evict()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _scan(self) -> list[tuple[Path, int, int]]:
+        """Returns (path, size, mtime_ns)-tuples of all cached artifacts."""
+        files = []
+        if self.directory.exists():
+            for subdirectory in os.scandir(self.directory):
+                if subdirectory.is_dir():
+                    for entry in os.scandir(subdirectory.path):
+                        if entry.name.endswith(".json"):
+                            try:
+                                stat = entry.stat()
+                                files.append((Path(entry.path), stat.st_size, stat.st_mtime_ns))
+                            except FileNotFoundError:
+                                pass  # evicted concurrently
+        return files
+
+    def _evict(self):
+        """Remove least-recently-used artifacts until the cache is at 80% of its max size."""
+        files = sorted(self._scan(), key=lambda file: file[2])
+        self._size_bytes = sum(size for _, size, _ in files)
+        for path, size, _ in files:
+            if self._size_bytes <= 0.8 * self.max_size_bytes:
+                break
+            path.unlink(missing_ok=True)
+            self._size_bytes -= size
+
+
+# =================================================================================================
+#  Process-wide cache
+# =================================================================================================
+_active_cache: ArtifactCache | None = (
+    ArtifactCache(ARTIFACT_CACHE_DIR, ARTIFACT_CACHE_MAX_SIZE_MB)
+    if (ARTIFACT_CACHE_DIR is not None) and (ARTIFACT_CACHE_MAX_SIZE_MB > 0)
+    else None
+)
+
+
+def get_artifact_cache() -> ArtifactCache | None:
+    """Return the process-wide artifact cache, or None if caching is disabled."""
+    return _active_cache
+
+
+def set_artifact_cache(directory: Path | None, max_size_mb: float):
+    """Configure the process-wide artifact cache.  directory=None or max_size_mb=0 disables caching."""
+    global _active_cache
+    _active_cache = ArtifactCache(directory, max_size_mb) if (directory is not None) and (max_size_mb > 0) else None
+
+
+def get_or_compute(
+    key: str,
+    compute: Callable[[], T],
+    serialize: Callable[[T], Any] = lambda value: value,
+    deserialize: Callable[[Any], T] = lambda value: value,
+) -> T:
+    """
+    Return artifact from the process-wide cache, or compute & cache it if not present (or if caching is disabled).
+    :param key: Cache key, see artifact_key(...).
+    :param compute: Function computing the artifact.
+    :param serialize: Function converting the artifact into a JSON-serializable value.
+    :param deserialize: Inverse of serialize.
+    """
+    cache = get_artifact_cache()
+    if cache is not None:
+        cached_value = cache.get(key)
+        if cached_value is not None:
+            try:
+                return deserialize(cached_value)
+            except Exception:
+                pass  # e.g. cached by an older version with a different format -> recompute
+
+    value = compute()
+    if cache is not None:
+        cache.put(key, serialize(value))
+    return value
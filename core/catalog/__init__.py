@@ -0,0 +1,8 @@
+"""
+Functionality for working with catalogs, i.e. directory trees containing many image folders.  Each image folder is
+treated as a separate shard, with its own metadata subfolder, such that tagging & searching can be distributed
+over shards instead of handling one giant collection.
+"""
+
+from ._discover import discover_image_directories, is_excluded_directory, is_image_file
+from ._manifest import CATALOG_FILENAME, get_catalog, read_catalog, update_catalog
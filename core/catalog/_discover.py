@@ -0,0 +1,46 @@
+import os
+from pathlib import Path
+
+from core.config import SUPPORTED_IMAGE_EXTENSIONS
+
+
+def discover_image_directories(root: Path, include_empty: bool = False) -> list[Path]:
+    """
+    Recursively discover all directories below (and including) root that contain at least one supported image file.
+    Metadata folders, folders with copied search results and hidden folders are skipped.
+
+    :param root: (Path) Root directory of the catalog.
+    :param include_empty: (bool) If True, also return directories that don't contain any images (yet).
+    :return: sorted list of directories.
+    """
+    image_directories = []
+    to_visit = [root]
+    while to_visit:
+        directory = to_visit.pop()
+        has_images = False
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not is_excluded_directory(entry.name):
+                            to_visit.append(Path(entry.path))
+                    elif (not has_images) and is_image_file(entry.name):
+                        has_images = True
+        except OSError as e:
+            print(f"Error scanning directory {directory}: {e}")
+            continue
+
+        if has_images or include_empty:
+            image_directories.append(directory)
+
+    return sorted(image_directories)
+
+
+def is_image_file(filename: str) -> bool:
+    """Returns True if the filename has one of the supported image extensions (case-insensitive)."""
+    return os.path.splitext(filename)[1].lower() in SUPPORTED_IMAGE_EXTENSIONS
+
+
+def is_excluded_directory(name: str) -> bool:
+    """Directories we never consider part of the catalog: metadata, copied search results & hidden folders."""
+    return (name == "metadata") or name.startswith("search_") or name.startswith(".")
@@ -0,0 +1,57 @@
+import datetime
+from pathlib import Path
+
+from core.data import Catalog
+
+from ._discover import discover_image_directories
+
+CATALOG_FILENAME = "catalog.json"
+
+
+def get_catalog(root: Path, refresh: bool = False) -> Catalog:
+    """
+    Return the catalog of the given root directory, (re)discovering all shards if no catalog is persisted yet
+    or if a refresh is requested.
+    """
+    catalog = None if refresh else read_catalog(root)
+    return catalog or update_catalog(root)
+
+
+def read_catalog(root: Path) -> Catalog | None:
+    """
+    Read the persisted catalog of the given root directory.
+    :return: Catalog object if the file exists and is valid, otherwise None.
+    """
+    catalog_path = root / CATALOG_FILENAME
+    if not catalog_path.exists():
+        return None
+    else:
+        try:
+            return Catalog.model_validate_json(catalog_path.read_text())
+        except Exception as e:
+            print(f"Error reading catalog {catalog_path}: {e}")
+            return None
+
+
+def update_catalog(root: Path, new_shards: list[Path] | None = None) -> Catalog:
+    """
+    Update & persist the catalog of the given root directory.
+
+    :param root: (Path) Root directory of the catalog.
+    :param new_shards: (optional) image folders to add to the existing catalog.  If None, the entire tree below root is
+                         rediscovered.
+    :return: the updated Catalog.
+    """
+    if new_shards is None:
+        shards = discover_image_directories(root)
+    else:
+        existing = read_catalog(root)
+        shards = (existing.shard_paths(root) if existing else []) + new_shards
+
+    catalog = Catalog(
+        updated=datetime.datetime.now(),
+        shards=sorted({shard.relative_to(root).as_posix() for shard in shards}),
+    )
+
+    (root / CATALOG_FILENAME).write_text(catalog.model_dump_json(indent=4))
+    return catalog
@@ -1,3 +1,6 @@
+import os
+from pathlib import Path
+
 SUPPORTED_IMAGE_EXTENSIONS = [".jpg", ".jpeg", ".webp", ".gif", ".png"]
 
 # The model configured below is used for image tagging, which requires a multimodal LLM with vision capabilities.
@@ -9,3 +12,78 @@ SUPPORTED_IMAGE_EXTENSIONS = [".jpg", ".jpeg", ".webp", ".gif", ".png"]
 #                                 + a peculiar focus on specific (irrelevant) tags (e.g. 'urns').
 DEFAULT_LLM_MODEL_TEXT_IMAGE = "llava:7b"  # alternatives: 'llama3.2-vision:11b', 'llava-llama3:8b', 'moondream:1.8b'
 DEFAULT_LLM_MODEL_TEXT = "llama3.2-vision:11b"
+
+# Cascade mode ('tag --fast-model'): all images are first tagged with a fast model, making everything searchable
+# quickly, after which (a selection of) them is refined with the regular model.  With '--refine weak', only results
+# with fewer tags or shorter descriptions than requested in the prompts (see _tag_image.py) are refined.
+DEFAULT_LLM_MODEL_FAST = "moondream:1.8b"
+CASCADE_REFINE_MIN_TAGS = 10
+CASCADE_REFINE_MIN_DESCRIPTION_WORDS = 50
+
+# LLM responses are streamed & bounded by a token budget (Ollama's num_predict;  0 = unbounded), since models sometimes
+# ramble for hundreds of tokens.  Tag extraction is stopped as soon as LLM_STOP_AFTER_TAGS distinct (clean) tags were
+# received (0 = never stop early), which is kept above CASCADE_REFINE_MIN_TAGS such that results aren't deemed weak.
+LLM_MAX_TOKENS_DESCRIPTION = 400
+LLM_MAX_TOKENS_TAGS = 120
+LLM_STOP_AFTER_TAGS = 20
+
+# Number of image folders (shards) that are searched in parallel when searching an entire catalog (--recursive).
+DEFAULT_CATALOG_SEARCH_WORKERS = 8
+
+# Streaming semantic search ('semantic-search --streaming') scores embeddings straight from an on-disk index (in the
+# metadata/_index folder) in chunks of STREAMING_SEARCH_CHUNK_MB, with the next chunk being read while the current one
+# is scored, such that memory use is bounded regardless of the number of images.
+STREAMING_SEARCH_CHUNK_MB = 64
+
+# Watch mode (see 'watch' command): new files are only tagged after no further changes were detected during
+# WATCH_DEBOUNCE_SEC, so bursts of new files (e.g. an import from a camera) are handled as one batch.  The poll
+# interval is only used on platforms without inotify support.
+WATCH_DEBOUNCE_SEC = 2.0
+WATCH_POLL_INTERVAL_SEC = 5.0
+
+# Query embeddings computed with the text-only (reduced precision) version of the embedding model should match those of
+# the full model at least up to this cosine similarity (checked by 'benchmark-embeddings --text-only True').
+TEXT_ONLY_MODEL_MIN_SIMILARITY = 0.999
+
+# Images whose image embeddings have at least this cosine similarity are reported as near-duplicates by 'find-duplicates'.
+DEFAULT_DUPLICATE_MIN_SIMILARITY = 0.95
+
+# Default minimum score for query-by-example search ('similar-images').  Image-vs-image similarities are typically
+# higher than text-vs-image similarities, hence a higher default than for text queries.
+DEFAULT_SIMILAR_IMAGES_MIN_SCORE = 0.75
+
+# Near-identical images (burst shots, edited copies, ...) are detected using 64-bit perceptual hashes ('tag --dedup').
+# Images whose hashes differ in at most this many bits are tagged only once, with results reused for the others.
+DEDUP_MAX_HASH_DISTANCE = 4
+
+# EXIF data (time & GPS location) is parsed from the header of images only, using EXIF_READ_WORKERS threads (to hide
+# storage latency), with results cached in memory for up to EXIF_CACHE_MAX_ENTRIES images (keyed by path, size & mtime).
+EXIF_READ_WORKERS = 8
+EXIF_CACHE_MAX_ENTRIES = 100_000
+
+# Global cache of derived artifacts (LLM descriptions & tags, embeddings, geocodes), keyed by image content instead of
+# path, such that copied, moved or renamed images are not processed again.  Least-recently-used artifacts are evicted
+# when the cache exceeds ARTIFACT_CACHE_MAX_SIZE_MB (0 disables the cache).  The cache is opt-in:  it is only enabled
+# if a directory is configured, either via the IMAGE_SEARCH_CACHE_DIR environment variable or the --cache-dir option.
+ARTIFACT_CACHE_DIR = Path(os.environ["IMAGE_SEARCH_CACHE_DIR"]) if os.environ.get("IMAGE_SEARCH_CACHE_DIR") else None
+ARTIFACT_CACHE_MAX_SIZE_MB = 1_000
+
+# Warm-start snapshots of embedding models (local copies with weights in the dtype they're used in), which load much
+# faster than the model from the Hugging Face hub cache.  Each snapshot takes about as much disk space as the model in
+# that dtype (e.g. ~15GB for jina-embeddings-v4 in fp32), so they can be disabled by setting
+# IMAGE_SEARCH_MODEL_SNAPSHOTS=0.  Snapshots of previous revisions of a model are removed once a new one is created.
+MODEL_SNAPSHOTS_ENABLED = os.environ.get("IMAGE_SEARCH_MODEL_SNAPSHOTS", "1") != "0"
+MODEL_SNAPSHOT_DIR = Path(
+    os.environ.get("IMAGE_SEARCH_MODEL_SNAPSHOT_DIR", Path.home() / ".cache" / "image_search_models")
+)
+
+# Tagging can be distributed over multiple Ollama endpoints (see --ollama-hosts).  An endpoint that fails (connection
+# lost, server error, no response within OLLAMA_REQUEST_TIMEOUT_SEC) is skipped for OLLAMA_ENDPOINT_RETRY_SEC, with its
+# in-flight requests retried on other endpoints.  The timeout is generous, since large models can take minutes per image.
+OLLAMA_ENDPOINT_RETRY_SEC = 30.0
+OLLAMA_REQUEST_TIMEOUT_SEC = 600.0
+
+# Cooperative tagging ('tag --cooperative'): workers claim images using lease files, which they refresh every
+# LEASE_HEARTBEAT_SEC.  Leases that were not refreshed for LEASE_EXPIRY_SEC (crashed worker) are reclaimed by others.
+LEASE_HEARTBEAT_SEC = 30.0
+LEASE_EXPIRY_SEC = 600.0
@@ -2,6 +2,7 @@
 Data classes & data structures related to functionality in this repo.
 """
 
+from ._catalog import Catalog
 from ._embeddings import Embedding, EmbeddingModel, ImageEmbeddings
-from ._metadata import ImageMetadata, LocationInfo, SearchData, TimeInfo
-from ._search import SearchResult
+from ._metadata import GenerationStats, ImageMetadata, LocationInfo, ModelTier, SearchData, TimeInfo
+from ._search import GeoFilter, SearchResult, TimeFilter
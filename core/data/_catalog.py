@@ -0,0 +1,18 @@
+from datetime import datetime
+from pathlib import Path
+
+from pydantic import BaseModel
+
+
+class Catalog(BaseModel):
+    """
+    Manifest of a catalog, i.e. a directory tree with many image folders ('shards'), each with their own metadata.
+    Persisting this avoids re-scanning the entire tree for every search.
+    """
+
+    updated: datetime  # when the catalog was last (re)discovered
+    shards: list[str] = []  # paths of image folders, relative to the catalog root, in posix format ('.' = root)
+
+    def shard_paths(self, root: Path) -> list[Path]:
+        """Return absolute paths of all shards, given the catalog root."""
+        return [root / shard for shard in self.shards]
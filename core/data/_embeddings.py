@@ -51,7 +51,7 @@ class ImageEmbeddings(BaseModel):
     """Embeddings for an image + its extracted text, used for similarity search."""
 
     img: Embedding  # embedding based purely on the image
-    txt: Embedding  # embedding based on the text extracted in various ways (i.e. the SearchData object)
+    txt: Embedding | None = None  # embedding of the extracted text (SearchData);  None if no LLM was run yet
 
 
 class Embedding(BaseModel):
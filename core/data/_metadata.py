@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
+from enum import StrEnum
 
 from pydantic import BaseModel
 
@@ -117,13 +118,33 @@ class SearchData(BaseModel, SearchableItem):
         return desc.strip("\n").strip()
 
 
+class ModelTier(StrEnum):
+    """Tier of the model cascade (see 'tag --fast-model') that produced the search data of an image."""
+
+    EMBEDDINGS_ONLY = "embeddings-only"  # no LLM run yet ('tag --mode embeddings-only'), only image embedding & EXIF
+    FAST = "fast"  # fast first-pass model, making images searchable quickly
+    REFINED = "refined"  # stronger model, refining the results of the fast pass
+
+
+class GenerationStats(BaseModel):
+    """LLM output tokens generated to extract the search data of an image (description + tags)."""
+
+    n_tokens: int = 0  # number of generated tokens
+    t_generate: float = 0.0  # seconds spent generating them
+    n_tokens_saved: int = 0  # tokens not generated due to early termination (estimate: remainder of the token budget)
+    t_saved: float = 0.0  # estimated seconds saved by early termination (n_tokens_saved at the observed token rate)
+
+
 class ImageMetadata(BaseModel):
     """
     Metadata for an image file, containing all context that is relevant for searching + other info.
     """
 
     filename: str  # filename of the image  (excluding path)
-    model: str  # Multi-Modal used to extract search data
+    model: str  # Multi-Modal used to extract search data  ("" if tier is EMBEDDINGS_ONLY)
     t_extract: float  # time taken to extract search data
     search_data: SearchData  # data relevant for searching
     embeddings: ImageEmbeddings | None = None  # embeddings used for similarity search (i.e. semantic search)
+    sibling_filename: str | None = None  # near-identical image whose extracted search data was reused, if any
+    tier: ModelTier | None = None  # cascade tier that produced search_data (None = not tagged in cascade mode)
+    generation_stats: GenerationStats | None = None  # None if LLM outputs were reused (artifact cache or sibling)
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from datetime import datetime
 
 
 @dataclass
@@ -6,3 +7,61 @@ class SearchResult:
     filename: str
     score: float
     score_src: str
+
+
+@dataclass(frozen=True)
+class TimeFilter:
+    """
+    Structured filter on the time an image was taken.  Images without time info never match an active filter.
+    """
+
+    start: datetime | None = None  # inclusive
+    end: datetime | None = None  # exclusive
+    weekdays: frozenset[int] | None = None  # 0=Monday, ..., 6=Sunday
+    months: frozenset[int] | None = None  # 1=January, ..., 12=December
+
+    @property
+    def is_active(self) -> bool:
+        return any(value is not None for value in [self.start, self.end, self.weekdays, self.months])
+
+    def __str__(self) -> str:
+        parts = []
+        if self.start is not None:
+            parts.append(f"from {self.start:%Y-%m-%d %H:%M:%S}")
+        if self.end is not None:
+            parts.append(f"until {self.end:%Y-%m-%d %H:%M:%S}")
+        if self.weekdays is not None:
+            parts.append("on " + ", ".join(datetime(2024, 1, 1 + d).strftime("%A") for d in sorted(self.weekdays)))
+        if self.months is not None:
+            parts.append("in " + ", ".join(datetime(2024, m, 1).strftime("%B") for m in sorted(self.months)))
+        return " ".join(parts) if parts else "no time filter"
+
+
+@dataclass(frozen=True)
+class GeoFilter:
+    """
+    Structured filter on the location an image was taken: within radius_km of a center point and/or within a
+    bounding box.  Images without location info never match an active filter.
+    """
+
+    center: tuple[float, float] | None = None  # (lat, lon) in degrees;  requires radius_km
+    radius_km: float | None = None
+    bbox: tuple[float, float, float, float] | None = None  # (min_lat, min_lon, max_lat, max_lon);  min_lon > max_lon
+    #                                                        means the box crosses the antimeridian
+
+    def __post_init__(self):
+        if (self.center is None) != (self.radius_km is None):
+            raise ValueError("GeoFilter center & radius_km should be provided together.")
+
+    @property
+    def is_active(self) -> bool:
+        return (self.center is not None) or (self.bbox is not None)
+
+    def __str__(self) -> str:
+        parts = []
+        if self.center is not None:
+            parts.append(f"within {self.radius_km:g} km of ({self.center[0]:.5f}, {self.center[1]:.5f})")
+        if self.bbox is not None:
+            min_lat, min_lon, max_lat, max_lon = self.bbox
+            parts.append(f"within lat [{min_lat:.5f}, {max_lat:.5f}], lon [{min_lon:.5f}, {max_lon:.5f}]")
+        return " and ".join(parts) if parts else "no geo filter"
@@ -1 +1,2 @@
 from ._list import ensure_model_exists, get_model_names
+from ._ollama_pool import OllamaEndpoint, OllamaPool, StreamedChat, get_ollama_pool, set_ollama_endpoints
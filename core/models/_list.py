@@ -1,20 +1,17 @@
-import ollama
+from ._ollama_pool import get_ollama_pool
 
 
 def get_model_names() -> list[str]:
     """
     :return: list of model names that match the required capabilities
     """
-    return sorted([model.model for model in ollama.list().models])
+    return get_ollama_pool().list_models()
 
 
 def ensure_model_exists(model_name: str) -> None:
     """
-    Ensure that a model with the given name exists in the Ollama environment.
+    Ensure that a model with the given name exists in the Ollama environment (i.e. on at least 1 healthy endpoint).
     :param model_name: Name of the model to check.
     :raises ValueError: If the model does not exist.
     """
-    if model_name not in get_model_names():
-        raise ValueError(
-            f"Model '{model_name}' not installed.  Install or specify another model using the --model option."
-        )
+    get_ollama_pool().ensure_model_exists(model_name)
@@ -0,0 +1,257 @@
+"""
+Load balancing of LLM requests over multiple Ollama endpoints (e.g. one 'ollama serve' per GPU box), each with its own
+(connection-pooled) client and a weight, i.e. the max number of concurrent requests it is sent.  Endpoints that fail
+are taken out of rotation for a while, with requests that were in flight being retried on the other endpoints.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+import httpx
+import ollama
+
+from core.config import OLLAMA_ENDPOINT_RETRY_SEC, OLLAMA_REQUEST_TIMEOUT_SEC
+
+
+# =================================================================================================
+#  Endpoints
+# =================================================================================================
+@dataclass(frozen=True)
+class OllamaEndpoint:
+    host: str | None = None  # None = default host (OLLAMA_HOST environment variable, or localhost:11434)
+    weight: int = 1  # max number of concurrent requests sent to this endpoint
+
+    @classmethod
+    def parse(cls, spec: str) -> OllamaEndpoint:
+        """Parse 'host' or 'host=weight', e.g. 'http://gpu1:11434=2'."""
+        host, _, weight = spec.strip().partition("=")
+        if weight and not (weight.isdigit() and int(weight) > 0):
+            raise ValueError(f"Invalid weight in Ollama endpoint '{spec}'; expected a positive integer.")
+        return OllamaEndpoint(host=host, weight=int(weight) if weight else 1)
+
+    def __str__(self) -> str:
+        return f"{self.host or 'default'} (x{self.weight})"
+
+
+@dataclass
+class StreamedChat:
+    """Result of a streamed chat request, see OllamaPool.chat_stream(...)."""
+
+    content: str  # content of the response message
+    n_tokens: int  # number of generated tokens
+    t_generate: float  # seconds between the first & last generated token
+    stopped_early: bool  # True if generation was stopped (by should_stop) before the model finished
+
+    @property
+    def t_per_token(self) -> float:
+        return self.t_generate / max(self.n_tokens - 1, 1)
+
+
+# =================================================================================================
+#  Pool
+# =================================================================================================
+class OllamaPool:
+    """
+    Thread-safe pool of Ollama endpoints.  Each request is sent to the healthy endpoint with the lowest load relative
+    to its weight, blocking while all of them are at capacity, such that the total number of concurrent requests is
+    bounded by the sum of all weights (see concurrency).
+    """
+
+    def __init__(
+        self,
+        endpoints: list[OllamaEndpoint],
+        retry_sec: float = OLLAMA_ENDPOINT_RETRY_SEC,
+        timeout_sec: float = OLLAMA_REQUEST_TIMEOUT_SEC,
+    ):
+        if not endpoints:
+            raise ValueError("At least 1 Ollama endpoint is required.")
+        self.endpoints = endpoints
+        self.retry_sec = retry_sec
+        self._clients = [ollama.Client(host=endpoint.host, timeout=timeout_sec) for endpoint in endpoints]
+        self._in_flight = [0] * len(endpoints)
+        self._unavailable_until = [0.0] * len(endpoints)  # time.monotonic() until which an endpoint is skipped
+        self._condition = threading.Condition()
+
+    @property
+    def concurrency(self) -> int:
+        """Max number of concurrent requests over all endpoints."""
+        return sum(endpoint.weight for endpoint in self.endpoints)
+
+    # -------------------------------------------------------------------------
+    #  Health & models
+    # -------------------------------------------------------------------------
+    def check_health(self) -> list[list[str] | None]:
+        """
+        Contact all endpoints & return the list of available models of each endpoint, or None for endpoints that are
+        unreachable (which are taken out of rotation for retry_sec seconds).
+        """
+        models_per_endpoint = []
+        for i, client in enumerate(self._clients):
+            try:
+                models_per_endpoint.append(sorted(model.model for model in client.list().models))
+                self._mark_available(i)
+            except Exception as e:
+                self._mark_unavailable(i, e)
+                models_per_endpoint.append(None)
+        return models_per_endpoint
+
+    def list_models(self) -> list[str]:
+        """Return models available on at least 1 healthy endpoint."""
+        return sorted({model for models in self.check_health() if models for model in models})
+
+    def ensure_model_exists(self, model_name: str):
+        """
+        Check that the model is available on all healthy endpoints.  Endpoints without it are taken out of rotation.
+        :raises ValueError: If no healthy endpoint has the model.
+        """
+        n_ok = 0
+        for i, models in enumerate(self.check_health()):
+            if models is None:
+                continue
+            elif model_name in models:
+                n_ok += 1
+            else:
+                self._mark_unavailable(i, f"model '{model_name}' not installed", retry_sec=float("inf"))
+
+        if n_ok == 0:
+            raise ValueError(
+                f"Model '{model_name}' not installed.  Install or specify another model using the --model option."
+            )
+        elif len(self.endpoints) > 1:
+            print(f"Using {n_ok}/{len(self.endpoints)} Ollama endpoint(s).")
+
+    # -------------------------------------------------------------------------
+    #  Requests
+    # -------------------------------------------------------------------------
+    def chat(self, **kwargs) -> ollama.ChatResponse:
+        """
+        Same as ollama.chat(...), executed on the least-loaded healthy endpoint.  If the endpoint fails (connection
+        lost, server error, timeout), it is taken out of rotation and the request is retried on another endpoint.
+        :raises ConnectionError: If no (other) healthy endpoint is available.
+        """
+        tried = set()
+        while True:
+            i = self._acquire(exclude=tried)
+            try:
+                return self._clients[i].chat(**kwargs)
+            except Exception as e:
+                if not _is_endpoint_failure(e):
+                    raise
+                self._mark_unavailable(i, e)
+                tried.add(i)
+            finally:
+                self._release(i)
+
+    def chat_stream(self, should_stop: Callable[[str], bool] | None = None, **kwargs) -> StreamedChat:
+        """
+        Same as chat(...), but with the response being streamed, such that generation can be stopped early: after each
+        received chunk, should_stop is called with the content received so far and as soon as it returns True, the
+        request is aborted (which makes Ollama stop generating).  Failover is the same as for chat(...), with requests
+        that are retried on another endpoint starting over.
+        """
+        tried = set()
+        while True:
+            i = self._acquire(exclude=tried)
+            try:
+                return _consume_stream(self._clients[i].chat(stream=True, **kwargs), should_stop)
+            except Exception as e:
+                if not _is_endpoint_failure(e):
+                    raise
+                self._mark_unavailable(i, e)
+                tried.add(i)
+            finally:
+                self._release(i)
+
+    def _acquire(self, exclude: set[int]) -> int:
+        """Reserve a slot on the least-loaded available endpoint, waiting if all of them are at capacity."""
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                available = [
+                    i for i in range(len(self.endpoints)) if (i not in exclude) and (self._unavailable_until[i] <= now)
+                ]
+                if not available:
+                    raise ConnectionError(
+                        "No healthy Ollama endpoint available: "
+                        + ", ".join(str(endpoint) for endpoint in self.endpoints)
+                    )
+                with_capacity = [i for i in available if self._in_flight[i] < self.endpoints[i].weight]
+                if with_capacity:
+                    i = min(with_capacity, key=lambda i: self._in_flight[i] / self.endpoints[i].weight)
+                    self._in_flight[i] += 1
+                    return i
+                self._condition.wait(timeout=1.0)  # timeout, such that endpoints coming back are noticed
+
+    def _release(self, i: int):
+        with self._condition:
+            self._in_flight[i] -= 1
+            self._condition.notify_all()
+
+    def _mark_available(self, i: int):
+        with self._condition:
+            self._unavailable_until[i] = 0.0
+            self._condition.notify_all()
+
+    def _mark_unavailable(self, i: int, reason: Exception | str, retry_sec: float | None = None):
+        retry_sec = self.retry_sec if retry_sec is None else retry_sec
+        with self._condition:
+            was_available = self._unavailable_until[i] <= time.monotonic()
+            self._unavailable_until[i] = time.monotonic() + retry_sec
+            self._condition.notify_all()
+        if was_available:
+            retry_str = f"retrying after {retry_sec:.0f}s" if retry_sec < float("inf") else "not retrying"
+            print(f"Ollama endpoint {self.endpoints[i]} unavailable ({reason}); {retry_str}.")
+
+
+def _consume_stream(stream: Iterator[ollama.ChatResponse], should_stop: Callable[[str], bool] | None) -> StreamedChat:
+    """Collect the streamed response, until the model is done or should_stop(<content so far>) returns True."""
+    content, n_tokens, t_first, t_last = "", 0, None, None
+    try:
+        for chunk in stream:
+            if chunk.done:
+                n_tokens = chunk.eval_count or n_tokens  # exact count, if reported
+                content += chunk.message.content or ""
+                break
+            t_last = time.monotonic()
+            t_first = t_first or t_last
+            content += chunk.message.content or ""
+            n_tokens += 1  # Ollama streams 1 token per chunk
+            if (should_stop is not None) and should_stop(content):
+                return StreamedChat(content, n_tokens, t_last - t_first, stopped_early=True)
+    finally:
+        stream.close()  # closes the connection, if generation is stopped early
+    return StreamedChat(content, n_tokens, (t_last - t_first) if t_first else 0.0, stopped_early=False)
+
+
+def _is_endpoint_failure(e: Exception) -> bool:
+    """True for errors caused by the endpoint (as opposed to the request), which warrant a retry elsewhere."""
+    if isinstance(e, ollama.ResponseError):
+        return e.status_code >= 500
+    return isinstance(e, (ConnectionError, httpx.TransportError))
+
+
+# =================================================================================================
+#  Process-wide pool
+# =================================================================================================
+_active_pool: OllamaPool | None = None  # created lazily, using the default host
+_active_pool_lock = threading.Lock()
+
+
+def get_ollama_pool() -> OllamaPool:
+    """Return the process-wide pool of Ollama endpoints (by default, only the default host)."""
+    global _active_pool
+    with _active_pool_lock:
+        if _active_pool is None:
+            _active_pool = OllamaPool([OllamaEndpoint()])
+        return _active_pool
+
+
+def set_ollama_endpoints(endpoints: list[OllamaEndpoint]):
+    """Configure the process-wide pool of Ollama endpoints."""
+    global _active_pool
+    with _active_pool_lock:
+        _active_pool = OllamaPool(endpoints)
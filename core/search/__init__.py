@@ -1,3 +1,30 @@
+from ._benchmark import (
+    ScoringModeReport,
+    benchmark_scoring_modes,
+    check_search_regressions,
+    default_scoring_modes,
+    show_scoring_mode_reports,
+)
+from ._catalog_search import (
+    catalog_geo_search,
+    catalog_semantic_search,
+    catalog_semantic_search_batch,
+    catalog_similar_images,
+    catalog_textual_search,
+    catalog_textual_search_batch,
+)
 from ._copy_search_results import copy_search_results
-from ._semantic_search import semantic_search
-from ._textual_search import textual_search
+from ._evaluate import (
+    QueryScores,
+    ThresholdCurves,
+    compute_semantic_scores,
+    compute_textual_scores,
+    compute_threshold_curves,
+    read_ground_truth,
+)
+from ._geo_search import geo_search
+from ._scoring import ScoringMode, VectorQuantization
+from ._semantic_search import semantic_search, semantic_search_batch
+from ._similar_images import similar_images
+from ._streaming_search import score_embedding_index, streaming_semantic_search_batch
+from ._textual_search import textual_search, textual_search_batch
@@ -0,0 +1,187 @@
+"""
+Harness for comparing search quality vs. speed of the available scoring modes of semantic search (see ScoringMode),
+based on a labelled query set (see read_ground_truth).  All modes are evaluated on exactly the same corpus & query
+embeddings, such that differences in results can only be attributed to the scoring mode.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from core.tag import read_metadata_table
+
+from ._evaluate import QueryScores, compute_threshold_curves
+from ._scoring import CorpusEmbeddings, ScoringMode, VectorQuantization, embed_queries, rank_scores
+
+
+# =================================================================================================
+#  Data classes
+# =================================================================================================
+@dataclass
+class ScoringModeReport:
+    """Quality & cost of a scoring mode, averaged over all queries."""
+
+    mode: ScoringMode
+    recall_at_k: float  # fraction of relevant images in the top-k
+    precision_at_k: float  # fraction of the top-k that is relevant
+    precision: float  # precision of all results with score >= min_score
+    recall: float  # recall of all results with score >= min_score
+    overlap_at_k: float  # fraction of the top-k that is identical to the top-k of exact scoring
+    ms_per_query: float  # scoring & ranking time, excluding computation of the query embedding
+    memory_mb: float  # memory used by the (truncated / quantized) corpus embeddings
+
+
+# =================================================================================================
+#  Main functionality
+# =================================================================================================
+def default_scoring_modes(dim: int) -> list[ScoringMode]:
+    """Exact scoring (always first), all quantizations at full dimension, and truncation to 512 & 128 dimensions."""
+    modes = [ScoringMode(quantization=quantization) for quantization in VectorQuantization]
+    for truncated_dim in [512, 128]:
+        if truncated_dim < dim:
+            modes += [
+                ScoringMode(dim=truncated_dim),
+                ScoringMode(dim=truncated_dim, quantization=VectorQuantization.INT8),
+            ]
+    return modes
+
+
+def benchmark_scoring_modes(
+    directory: Path,
+    ground_truth: dict[str, list[str]],
+    modes: list[ScoringMode] | None = None,
+    k: int = 10,
+    min_score: float = 0.49,
+    n_repeats: int = 5,
+) -> list[ScoringModeReport]:
+    """
+    Run all queries of the ground truth through each scoring mode & report recall@k, precision & latency.
+
+    :param directory: Path to the directory containing tagged images.
+    :param ground_truth: dict mapping each query to the list of filenames of all relevant images.
+    :param modes: Scoring modes to evaluate; default = default_scoring_modes(...).  Exact scoring is always
+                    evaluated as well, since it is the reference for overlap_at_k.
+    :param k: Number of top results to evaluate recall@k, precision@k & overlap@k on.
+    :param min_score: Score threshold at which precision & recall are evaluated.
+    :param n_repeats: Latency is the fastest of this many repeats, to reduce timing noise.
+    :return: List of ScoringModeReport objects, 1 per mode, with exact scoring first.
+    """
+
+    # --- prep --------------------------------------------
+    corpus = CorpusEmbeddings.from_table(read_metadata_table(directory))
+    if not corpus.embedding_models:
+        print("No embeddings found in metadata of images in this folder.")
+        return []
+
+    queries = list(ground_truth)
+    query_embeddings = embed_queries(queries, corpus.embedding_models)
+    if modes is None:
+        modes = default_scoring_modes(
+            max(matrix.dim for matrix in list(corpus.img.values()) + list(corpus.txt.values()))
+        )
+    modes = [ScoringMode()] + [mode for mode in modes if mode != ScoringMode()]
+
+    # --- evaluate ----------------------------------------
+    reports = []
+    exact_top_k = None
+    for mode in modes:
+        mode_corpus = corpus.with_scoring_mode(mode)
+
+        # latency
+        t_elapsed = []
+        for _ in range(n_repeats):
+            t_start = time.perf_counter()
+            scores, is_txt = mode_corpus.score(query_embeddings)
+            for i in range(len(queries)):
+                rank_scores(mode_corpus.filenames, scores[i], is_txt[i], min_score)
+            t_elapsed.append(time.perf_counter() - t_start)
+
+        # quality
+        top_k = _top_k(scores, k)
+        if exact_top_k is None:
+            exact_top_k = top_k
+        curves = compute_threshold_curves(QueryScores(queries, corpus.filenames, scores), ground_truth, [min_score])
+        recall_at_k, precision_at_k = _recall_precision_at_k(queries, corpus.filenames, top_k, ground_truth, k)
+
+        reports.append(
+            ScoringModeReport(
+                mode=mode,
+                recall_at_k=recall_at_k,
+                precision_at_k=precision_at_k,
+                precision=float(curves.avg_precision[0]),
+                recall=float(curves.avg_recall[0]),
+                overlap_at_k=float(
+                    np.mean([len(set(a) & set(b)) / max(len(b), 1) for a, b in zip(top_k, exact_top_k)])
+                ),
+                ms_per_query=1000 * min(t_elapsed) / len(queries),
+                memory_mb=mode_corpus.nbytes / 1e6,
+            )
+        )
+
+    return reports
+
+
+def show_scoring_mode_reports(reports: list[ScoringModeReport], k: int):
+    """Print reports side by side, with relative speed & memory vs. exact scoring (= first report)."""
+    baseline = reports[0]
+    print()
+    print(
+        f"  {'mode':<16}  {f'recall@{k}':>10}  {f'prec@{k}':>8}  {'precision':>9}  {'recall':>7}  "
+        + f"{f'overlap@{k}':>10}  {'ms/query':>9}  {'speed-up':>8}  {'memory MB':>9}"
+    )
+    for report in reports:
+        print(
+            f"  {str(report.mode):<16}  {report.recall_at_k:10.3f}  {report.precision_at_k:8.3f}  "
+            + f"{report.precision:9.3f}  {report.recall:7.3f}  {report.overlap_at_k:10.3f}  "
+            + f"{report.ms_per_query:9.3f}  {baseline.ms_per_query / report.ms_per_query:7.2f}x  "
+            + f"{report.memory_mb:9.2f}"
+        )
+
+
+def check_search_regressions(
+    reports: list[ScoringModeReport], min_recall_at_k: float | None = None, max_recall_drop: float | None = None
+) -> list[str]:
+    """
+    Check reports against regression thresholds, e.g. for use in CI.
+
+    :param reports: Reports as returned by benchmark_scoring_modes(...), with exact scoring first.
+    :param min_recall_at_k: If provided, each mode should reach at least this recall@k.
+    :param max_recall_drop: If provided, recall@k of each mode should be at most this much lower than for exact scoring.
+    :return: List of human-readable descriptions of all violations (empty if all checks pass).
+    """
+    baseline = reports[0]
+    violations = []
+    for report in reports:
+        if (min_recall_at_k is not None) and (report.recall_at_k < min_recall_at_k):
+            violations.append(f"[{report.mode}] recall@k={report.recall_at_k:.3f} < {min_recall_at_k:.3f}")
+        if (max_recall_drop is not None) and (baseline.recall_at_k - report.recall_at_k > max_recall_drop):
+            violations.append(
+                f"[{report.mode}] recall@k drops by {baseline.recall_at_k - report.recall_at_k:.3f} "
+                + f"vs. exact scoring (> {max_recall_drop:.3f})"
+            )
+    return violations
+
+
+# =================================================================================================
+#  Helpers
+# =================================================================================================
+def _top_k(scores: np.ndarray, k: int) -> list[list[int]]:
+    """Indices of the (at most) k highest-scoring images per query, ignoring images without score."""
+    order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    return [[int(j) for j in row if np.isfinite(scores[i, j])] for i, row in enumerate(order)]
+
+
+def _recall_precision_at_k(
+    queries: list[str], filenames: list[str], top_k: list[list[int]], ground_truth: dict[str, list[str]], k: int
+) -> tuple[float, float]:
+    recall, precision = [], []
+    for query, indices in zip(queries, top_k):
+        relevant_filenames = set(ground_truth[query])
+        n_relevant_in_top_k = sum(filenames[j] in relevant_filenames for j in indices)
+        recall.append(n_relevant_in_top_k / len(relevant_filenames) if relevant_filenames else 1.0)
+        precision.append(n_relevant_in_top_k / k)
+    return float(np.mean(recall)), float(np.mean(precision))
@@ -0,0 +1,262 @@
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from core.catalog import get_catalog
+from core.config import DEFAULT_CATALOG_SEARCH_WORKERS
+from core.data import EmbeddingModel, GeoFilter, SearchResult, TimeFilter
+from core.tag import read_metadata_table
+
+from ._geo_search import geo_search
+from ._scoring import CorpusEmbeddings, ScoringMode, embed_queries, rank_scores
+from ._similar_images import get_example_query_embeddings, rank_example_scores
+from ._streaming_search import score_embedding_index
+from ._textual_search import textual_search_batch
+
+
+# =================================================================================================
+#  Main functionality
+# =================================================================================================
+def catalog_semantic_search(
+    root: Path,
+    query: str,
+    min_score: float,
+    max_workers: int = DEFAULT_CATALOG_SEARCH_WORKERS,
+    scoring_mode: ScoringMode = ScoringMode(),
+    time_filter: TimeFilter | None = None,
+    geo_filter: GeoFilter | None = None,
+    streaming: bool = False,
+    max_results: int | None = None,
+) -> list[SearchResult]:
+    """
+    Semantic search over all shards (image folders) of a catalog.  Shards are searched in parallel, each shard only
+    holding its own metadata in memory, after which the ranked per-shard results are merged.
+
+    :param root: Root directory of the catalog.
+    :param query: Text query to search for.
+    :param min_score: Minimum score to be included as a result.
+    :param max_workers: Number of shards that are searched in parallel.
+    :param scoring_mode: How image embeddings are represented when scoring, see semantic_search.
+    :param time_filter: (optional) Only images taken at times matching this filter are considered.
+    :param geo_filter: (optional) Only images taken at locations matching this filter are considered.
+    :param streaming: When true, shards are scored in chunks from their on-disk embedding index, see
+                        streaming_semantic_search_batch(...).
+    :param max_results: (optional) Max number of results (the best ones).
+    :return: List of SearchResult objects, with filenames relative to the catalog root.
+    """
+    return catalog_semantic_search_batch(
+        root, [query], min_score, max_workers, scoring_mode, time_filter, geo_filter, streaming, max_results
+    )[query]
+
+
+def catalog_semantic_search_batch(
+    root: Path,
+    queries: list[str],
+    min_score: float,
+    max_workers: int = DEFAULT_CATALOG_SEARCH_WORKERS,
+    scoring_mode: ScoringMode = ScoringMode(),
+    time_filter: TimeFilter | None = None,
+    geo_filter: GeoFilter | None = None,
+    streaming: bool = False,
+    max_results: int | None = None,
+) -> dict[str, list[SearchResult]]:
+    """
+    Same as catalog_semantic_search, but for multiple queries at once.  Each shard is read only once and scored
+    against all queries at once, while the queries are encoded only once per embedding model, regardless of how many
+    shards use that model.
+
+    :param root: Root directory of the catalog.
+    :param queries: List of text queries to search for.
+    :param min_score: Minimum score to be included as a result.
+    :param max_workers: Number of shards that are searched in parallel.
+    :param scoring_mode: How image embeddings are represented when scoring, see semantic_search.
+    :param time_filter: (optional) Only images taken at times matching this filter are considered.
+    :param geo_filter: (optional) Only images taken at locations matching this filter are considered.
+    :param streaming: When true, shards are scored in chunks from their on-disk embedding index, see
+                        streaming_semantic_search_batch(...).
+    :param max_results: (optional) Max number of results per query (the best ones).
+    :return: dict mapping each query to a list of SearchResult objects, with filenames relative to the catalog root.
+    """
+    query_embeddings = _QueryEmbeddings(queries)
+
+    def search_shard(shard_path: Path) -> list[list[SearchResult]]:
+        if streaming:
+            results = score_embedding_index(
+                shard_path,
+                query_embeddings.get,
+                len(queries),
+                min_score,
+                max_results,
+                scoring_mode,
+                time_filter,
+                geo_filter,
+            )
+            return results or [[] for _ in queries]
+        corpus = CorpusEmbeddings.from_table(
+            read_metadata_table(shard_path, time_filter, geo_filter)
+        ).with_scoring_mode(scoring_mode)
+        if not corpus.embedding_models:
+            return [[] for _ in queries]
+        scores, is_txt = corpus.score(query_embeddings.get(corpus.embedding_models))
+        return [
+            rank_scores(corpus.filenames, scores[i], is_txt[i], min_score)[:max_results] for i in range(len(queries))
+        ]
+
+    results = _search_all_shards_batch(root, search_shard, len(queries), max_workers)
+    return {query: query_results[:max_results] for query, query_results in zip(queries, results)}
+
+
+def catalog_similar_images(
+    root: Path, filename: str, min_score: float, max_workers: int = DEFAULT_CATALOG_SEARCH_WORKERS
+) -> list[SearchResult]:
+    """
+    Query-by-example search over all shards (image folders) of a catalog, see similar_images(...) for details.
+
+    :param root: Root directory of the catalog.
+    :param filename: Filename of the example image, relative to the catalog root.
+    :param min_score: Minimum score to be included as a result.
+    :param max_workers: Number of shards that are searched in parallel.
+    :return: List of SearchResult objects, with filenames relative to the catalog root.
+    """
+    query_embeddings = get_example_query_embeddings(root / filename)
+    if query_embeddings is None:
+        return []
+
+    def search_shard(shard_path: Path) -> list[SearchResult]:
+        return rank_example_scores(shard_path, query_embeddings, min_score)
+
+    example_filename = Path(filename).as_posix()
+    return [
+        result for result in _search_all_shards(root, search_shard, max_workers) if result.filename != example_filename
+    ]
+
+
+def catalog_textual_search(
+    root: Path,
+    query: str,
+    use_time_location_data: bool,
+    max_workers: int = DEFAULT_CATALOG_SEARCH_WORKERS,
+    time_filter: TimeFilter | None = None,
+    geo_filter: GeoFilter | None = None,
+) -> list[SearchResult]:
+    """
+    Textual search over all shards (image folders) of a catalog, see textual_search(...) for details on scoring.
+
+    :param root: Root directory of the catalog.
+    :param query: Text query to search for (comma or space-separated).
+    :param use_time_location_data: When false, extracted time & location data is ignored in the search.
+    :param max_workers: Number of shards that are searched in parallel.
+    :param time_filter: (optional) Only images taken at times matching this filter are considered.
+    :param geo_filter: (optional) Only images taken at locations matching this filter are considered.
+    :return: List of SearchResult objects, with filenames relative to the catalog root.
+    """
+    return catalog_textual_search_batch(root, [query], use_time_location_data, max_workers, time_filter, geo_filter)[
+        query
+    ]
+
+
+def catalog_textual_search_batch(
+    root: Path,
+    queries: list[str],
+    use_time_location_data: bool,
+    max_workers: int = DEFAULT_CATALOG_SEARCH_WORKERS,
+    time_filter: TimeFilter | None = None,
+    geo_filter: GeoFilter | None = None,
+) -> dict[str, list[SearchResult]]:
+    """
+    Same as catalog_textual_search, but for multiple queries at once, such that each shard is read only once.
+
+    :param root: Root directory of the catalog.
+    :param queries: List of text queries to search for.
+    :param use_time_location_data: When false, extracted time & location data is ignored in the search.
+    :param max_workers: Number of shards that are searched in parallel.
+    :param time_filter: (optional) Only images taken at times matching this filter are considered.
+    :param geo_filter: (optional) Only images taken at locations matching this filter are considered.
+    :return: dict mapping each query to a list of SearchResult objects, with filenames relative to the catalog root.
+    """
+
+    def search_shard(shard_path: Path) -> list[list[SearchResult]]:
+        results_by_query = textual_search_batch(shard_path, queries, use_time_location_data, time_filter, geo_filter)
+        return [results_by_query[query] for query in queries]
+
+    results = _search_all_shards_batch(root, search_shard, len(queries), max_workers)
+    return dict(zip(queries, results))
+
+
+def catalog_geo_search(
+    root: Path, geo_filter: GeoFilter, max_workers: int = DEFAULT_CATALOG_SEARCH_WORKERS
+) -> list[SearchResult]:
+    """
+    Geo search over all shards (image folders) of a catalog, see geo_search(...) for details on scoring.
+
+    :param root: Root directory of the catalog.
+    :param geo_filter: Area to search in.
+    :param max_workers: Number of shards that are searched in parallel.
+    :return: List of SearchResult objects, with filenames relative to the catalog root.
+    """
+    return _search_all_shards(root, lambda shard_path: geo_search(shard_path, geo_filter), max_workers)
+
+
+# =================================================================================================
+#  Helpers
+# =================================================================================================
+def _search_all_shards(root: Path, search_shard, max_workers: int) -> list[SearchResult]:
+    """
+    Execute search_shard(shard_path) -> list[SearchResult] for all shards of the catalog in parallel and merge the
+    (already sorted) results, such that the final result is sorted the same way as for a single directory.
+    """
+    return _search_all_shards_batch(root, lambda shard_path: [search_shard(shard_path)], 1, max_workers)[0]
+
+
+def _search_all_shards_batch(root: Path, search_shard, n_queries: int, max_workers: int) -> list[list[SearchResult]]:
+    """
+    Same as _search_all_shards, for search_shard(shard_path) -> list[list[SearchResult]] returning (sorted) results
+    for n_queries queries at once, which are merged per query.
+    """
+    catalog = get_catalog(root)
+
+    def search_and_prefix(shard: str) -> list[list[SearchResult]]:
+        return [
+            [
+                SearchResult(
+                    filename=_catalog_filename(shard, result.filename), score=result.score, score_src=result.score_src
+                )
+                for result in results
+            ]
+            for results in search_shard(root / shard)
+        ]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results_by_shard = list(executor.map(search_and_prefix, catalog.shards))
+
+    # each list is sorted by (-score, filename) and prefixing preserves this order within a shard
+    return [
+        list(heapq.merge(*[results[i] for results in results_by_shard], key=lambda sr: (-sr.score, sr.filename)))
+        for i in range(n_queries)
+    ]
+
+
+def _catalog_filename(shard: str, filename: str) -> str:
+    """Filename relative to the catalog root."""
+    return filename if shard == "." else f"{shard}/{filename}"
+
+
+class _QueryEmbeddings:
+    """
+    Thread-safe lazy cache of query embeddings per embedding model, such that the queries are encoded only once per
+    model, regardless of how many shards use that model.
+    """
+
+    def __init__(self, queries: list[str]):
+        self._queries = queries
+        self._embeddings: dict[EmbeddingModel, np.ndarray] = dict()
+        self._lock = threading.Lock()
+
+    def get(self, embedding_models: set[EmbeddingModel]) -> dict[EmbeddingModel, np.ndarray]:
+        with self._lock:
+            missing_models = embedding_models - set(self._embeddings)
+            self._embeddings.update(embed_queries(self._queries, missing_models))
+            return {embedding_model: self._embeddings[embedding_model] for embedding_model in embedding_models}
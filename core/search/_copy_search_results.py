@@ -5,18 +5,21 @@ from pathlib import Path
 from core.data import SearchResult
 
 
-def copy_search_results(image_path: Path, query: str, search_results: list[SearchResult]) -> None:
+def copy_search_results(
+    image_path: Path, query: str, search_results: list[SearchResult], folder_suffix: str = ""
+) -> None:
     """
     Copy all images found in the search result to a dedicated subfolder, together with some metadata.
 
-    :param image_path: (Path) Path to the image files.
+    :param image_path: (Path) Path to the image files (or catalog root, in which case filenames are relative paths).
     :param query:  (str) Search query used to find the images.
     :param search_results: list of SearchResult objects representing the search results.
+    :param folder_suffix: (str) Suffix for the results folder name, to keep results of multiple queries apart.
     """
 
     # --- folder prep -------------------------------------
     now = datetime.datetime.now()
-    results_path = image_path / ("search_" + now.strftime("%Y%m%d_%H%M%S"))
+    results_path = image_path / ("search_" + now.strftime("%Y%m%d_%H%M%S") + folder_suffix)
     results_path.mkdir(parents=True, exist_ok=True)
 
     # --- determine target file names ---------------------
@@ -32,7 +35,7 @@ def copy_search_results(image_path: Path, query: str, search_results: list[Searc
 
     for i, result in enumerate(search_results, start=1):
         src_filename = result.filename
-        dst_filename = f"{i:0>6}_{src_filename}"
+        dst_filename = f"{i:0>6}_{'_'.join(Path(src_filename).parts)}"  # flatten results from catalog subfolders
         src = image_path / result.filename
         if src.exists():
             dst = results_path / dst_filename
@@ -0,0 +1,153 @@
+"""
+Functionality for evaluating search quality against ground truth, e.g. to determine suitable score thresholds.
+
+Scores are computed only once per query (for all images), after which precision/recall/F1 for any number of
+thresholds are derived in a single vectorized pass, instead of re-running the search for every threshold.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from core.catalog import is_image_file
+from core.tag import read_metadata_table
+
+from ._scoring import CorpusEmbeddings, embed_queries
+from ._textual_search import compute_textual_score
+
+
+# =================================================================================================
+#  Data classes
+# =================================================================================================
+@dataclass
+class QueryScores:
+    """Scores of all images for a number of queries.  Images that are not a search result get score -inf."""
+
+    queries: list[str]
+    filenames: list[str]
+    scores: np.ndarray  # (n_queries, n_images)-matrix
+
+
+@dataclass
+class ThresholdCurves:
+    """Precision, recall & F1 score per query, as a function of the score threshold."""
+
+    queries: list[str]
+    thresholds: np.ndarray  # (n_thresholds,)-array
+    precision: np.ndarray  # (n_queries, n_thresholds)-matrix
+    recall: np.ndarray  # (n_queries, n_thresholds)-matrix
+    f1: np.ndarray  # (n_queries, n_thresholds)-matrix
+
+    @property
+    def avg_precision(self) -> np.ndarray:
+        return self.precision.mean(axis=0)
+
+    @property
+    def avg_recall(self) -> np.ndarray:
+        return self.recall.mean(axis=0)
+
+    @property
+    def avg_f1(self) -> np.ndarray:
+        return self.f1.mean(axis=0)
+
+    @property
+    def i_best(self) -> int:
+        """Index of the threshold with the highest average F1 score."""
+        return int(np.argmax(self.avg_f1))
+
+
+# =================================================================================================
+#  Scoring
+# =================================================================================================
+def compute_semantic_scores(directory: Path, queries: list[str]) -> QueryScores:
+    """Compute semantic search scores (see semantic_search) of all images in the directory for all queries."""
+    corpus = CorpusEmbeddings.from_table(read_metadata_table(directory))
+    if not corpus.embedding_models:
+        scores = np.full((len(queries), len(corpus.filenames)), -np.inf)
+    else:
+        scores, _ = corpus.score(embed_queries(queries, corpus.embedding_models))
+    return QueryScores(queries=queries, filenames=corpus.filenames, scores=scores)
+
+
+def compute_textual_scores(directory: Path, queries: list[str], use_time_location_data: bool) -> QueryScores:
+    """Compute textual search scores (see textual_search) of all images in the directory for all queries."""
+    table = read_metadata_table(directory)
+    text_search_strings = table.text_search_strings(use_time_location_data)
+    scores = np.array(
+        [
+            [compute_textual_score(text_search_string, query) for text_search_string in text_search_strings]
+            for query in queries
+        ],
+        dtype=np.float64,
+    ).reshape(len(queries), len(table))
+    scores[scores <= 0] = -np.inf  # images without any matches are not a search result, regardless of threshold
+    return QueryScores(
+        queries=queries,
+        filenames=table.filenames.tolist(),
+        scores=scores,
+    )
+
+
+# =================================================================================================
+#  Evaluation
+# =================================================================================================
+def compute_threshold_curves(
+    query_scores: QueryScores, ground_truth: dict[str, list[str]], thresholds: list[float] | np.ndarray
+) -> ThresholdCurves:
+    """
+    Compute precision, recall & F1 score for each query & threshold, where the results for a threshold are all images
+    with score >= threshold.  Precision of an empty result is defined as 1.0.
+
+    :param query_scores: Scores of all images for all queries, e.g. from compute_semantic_scores(...).
+    :param ground_truth: dict mapping each query to the list of filenames of all relevant images.
+    :param thresholds: score thresholds to be evaluated.
+    :return: ThresholdCurves object.
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    shape = (len(query_scores.queries), len(thresholds))
+    precision, recall, f1 = np.zeros(shape), np.zeros(shape), np.zeros(shape)
+
+    for i, query in enumerate(query_scores.queries):
+        relevant_filenames = set(ground_truth[query])
+        is_relevant = np.array([filename in relevant_filenames for filename in query_scores.filenames], dtype=bool)
+
+        # sort by descending score, such that the results for any threshold are a prefix of this order
+        order = np.argsort(-query_scores.scores[i], kind="stable")
+        sorted_scores = query_scores.scores[i][order]
+        cum_tp = np.concatenate([[0], np.cumsum(is_relevant[order])])  # cum_tp[k] = # relevant images in top-k
+
+        # number of results (n_pos) & true positives (tp) for each threshold
+        n_pos = len(sorted_scores) - np.searchsorted(sorted_scores[::-1], thresholds, side="left")
+        tp = cum_tp[n_pos]
+
+        recall[i] = tp / len(relevant_filenames) if relevant_filenames else 1.0
+        precision[i] = np.where(n_pos > 0, tp / np.maximum(n_pos, 1), 1.0)
+        f1[i] = np.where(
+            precision[i] + recall[i] > 0,
+            2 * precision[i] * recall[i] / np.maximum(precision[i] + recall[i], 1e-12),
+            0.0,
+        )
+
+    return ThresholdCurves(
+        queries=query_scores.queries,
+        thresholds=thresholds,
+        precision=precision,
+        recall=recall,
+        f1=f1,
+    )
+
+
+def read_ground_truth(ground_truth_directory: Path) -> dict[str, list[str]]:
+    """
+    Read ground truth from a directory with 1 subfolder per query (named after the query), containing (copies of)
+    all images that are relevant for that query.
+    :return: dict mapping each query to the list of filenames of all relevant images.
+    """
+    return {
+        query_directory.name: sorted(file.name for file in query_directory.iterdir() if is_image_file(file.name))
+        for query_directory in sorted(ground_truth_directory.iterdir())
+        if query_directory.is_dir()
+    }
@@ -0,0 +1,38 @@
+from pathlib import Path
+
+import numpy as np
+
+from core.data import GeoFilter, SearchResult
+from core.tag import get_geo_index, haversine_km
+
+
+def geo_search(directory: Path, geo_filter: GeoFilter) -> list[SearchResult]:
+    """
+    Search for images taken within a radius of a point and/or within a bounding box, using only the persistent geo
+    index of the directory, i.e. without reading any metadata files (other than those that changed since the index
+    was last updated).
+
+    If a radius is given, images are ranked by distance, with score = 1 - distance/radius (1.0 at the center, 0.0
+    at the edge).  Otherwise, all images have score 1.0 and are sorted by filename.
+
+    :param directory: Path to the directory containing tagged images.
+    :param geo_filter: Area to search in.
+    :return: List of SearchResult objects of all images in the area.
+    """
+    if not geo_filter.is_active:
+        print("No area to search in; specify a radius and/or bounding box.")
+        return []
+
+    index = get_geo_index(directory)
+    rows = index.select_rows(geo_filter)
+    if geo_filter.center is None:
+        scores = np.ones(len(rows))
+    else:
+        distances = haversine_km(geo_filter.center[0], geo_filter.center[1], index.lat[rows], index.lon[rows])
+        scores = 1.0 - distances / geo_filter.radius_km if geo_filter.radius_km > 0 else np.ones(len(rows))
+
+    results = [
+        SearchResult(filename=filename, score=float(score), score_src="geo")
+        for filename, score in zip(index.filenames[rows].tolist(), scores)
+    ]
+    return sorted(results, key=lambda sr: (-sr.score, sr.filename))
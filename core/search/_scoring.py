@@ -0,0 +1,209 @@
+"""
+Vectorized scoring engine for semantic search: all embeddings of a corpus are kept as contiguous, row-normalized
+float32 matrices (one per embedding model), such that any number of queries can be scored against the entire corpus
+with a single matrix-matrix product per model.
+
+Optionally, corpus embeddings can be truncated to fewer dimensions (jina embeddings are trained such that leading
+dimensions carry most information) and/or quantized, trading accuracy for memory & speed; see ScoringMode.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from enum import StrEnum
+
+import numpy as np
+
+from core.data import EmbeddingModel, SearchResult
+from core.tag import EmbeddingColumn, MetadataTable
+from core.tag.embeddings import construct_embeddings_from_texts, normalize_rows
+
+_BLOCK_SIZE = 4096  # number of rows of quantized matrices that are dequantized at once when scoring
+
+
+# =================================================================================================
+#  Scoring modes
+# =================================================================================================
+class VectorQuantization(StrEnum):
+    FLOAT32 = "float32"  # exact
+    FLOAT16 = "float16"  # 2x less memory
+    INT8 = "int8"  # 4x less memory;  symmetric per-row scalar quantization
+    BINARY = "binary"  # 32x less memory;  only signs are kept, scores are estimated from hamming distances
+
+
+@dataclass(frozen=True)
+class ScoringMode:
+    """How corpus embeddings are represented when scoring; the default is exact scoring."""
+
+    dim: int | None = None  # truncate embeddings to this number of leading dimensions;  None = all dimensions
+    quantization: VectorQuantization = VectorQuantization.FLOAT32
+
+    def __str__(self) -> str:
+        return f"{'full' if self.dim is None else f'dim={self.dim}'}/{self.quantization.value}"
+
+
+# =================================================================================================
+#  Corpus
+# =================================================================================================
+@dataclass
+class EmbeddingMatrix:
+    rows: np.ndarray  # (n,)-array with indices of the images (in the corpus) the rows of 'values' correspond to
+    values: np.ndarray  # (n, d)-matrix with row-normalized embeddings (or a quantized version thereof)
+    quantization: VectorQuantization = VectorQuantization.FLOAT32
+    scales: np.ndarray | None = None  # (n,)-array with per-row scale factors (INT8 only)
+    n_bits: int | None = None  # number of dimensions packed into each row, excluding padding bits (BINARY only)
+
+    @property
+    def dim(self) -> int:
+        return self.n_bits if self.quantization == VectorQuantization.BINARY else self.values.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def with_scoring_mode(self, mode: ScoringMode) -> EmbeddingMatrix:
+        """Return truncated and/or quantized version of this (exact, float32) matrix."""
+        values = self.values
+        if mode.dim and (mode.dim < values.shape[1]):
+            values = normalize_rows(values[:, : mode.dim])
+
+        match mode.quantization:
+            case VectorQuantization.FLOAT32:
+                return EmbeddingMatrix(self.rows, np.ascontiguousarray(values))
+            case VectorQuantization.FLOAT16:
+                return EmbeddingMatrix(self.rows, values.astype(np.float16), mode.quantization)
+            case VectorQuantization.INT8:
+                scales = np.maximum(np.max(np.abs(values), axis=1), 1e-12) / 127
+                quantized = np.round(values / scales[:, None]).astype(np.int8)
+                return EmbeddingMatrix(self.rows, quantized, mode.quantization, scales.astype(np.float32))
+            case VectorQuantization.BINARY:
+                packed = np.packbits(values > 0, axis=1)  # last byte zero-padded if dim is not a multiple of 8
+                return EmbeddingMatrix(self.rows, packed, mode.quantization, n_bits=values.shape[1])
+            case _:
+                raise ValueError(f"Unsupported quantization: {mode.quantization}")
+
+    def similarities(self, queries: np.ndarray) -> np.ndarray:
+        """
+        Compute (estimated) cosine similarities between queries and all rows of this matrix.
+        :param queries: (q, d)-matrix with row-normalized query embeddings (d >= self.dim).
+        :return: (q, n)-matrix with similarities.
+        """
+        if queries.shape[1] > self.dim:
+            queries = normalize_rows(queries[:, : self.dim])  # truncate queries the same way as the corpus
+
+        if self.quantization == VectorQuantization.FLOAT32:
+            return queries @ self.values.T
+
+        similarities = np.empty((queries.shape[0], self.values.shape[0]), dtype=np.float32)
+        packed_queries = np.packbits(queries > 0, axis=1)
+        for start in range(0, self.values.shape[0], _BLOCK_SIZE):
+            block = self.values[start : start + _BLOCK_SIZE]
+            if self.quantization == VectorQuantization.BINARY:
+                # angle between vectors ~ pi * fraction of differing signs  (= SimHash);  padding bits are zero in
+                # both queries & corpus, so they never differ, but should not be counted as dimensions either.
+                hamming = np.bitwise_count(packed_queries[:, None, :] ^ block[None, :, :]).sum(axis=2)
+                similarities[:, start : start + _BLOCK_SIZE] = np.cos(np.pi * hamming / self.dim)
+            else:
+                block = block.astype(np.float32)
+                if self.scales is not None:
+                    block *= self.scales[start : start + _BLOCK_SIZE, None]
+                similarities[:, start : start + _BLOCK_SIZE] = queries @ block.T
+        return similarities
+
+
+@dataclass
+class CorpusEmbeddings:
+    """Image & text embeddings of a collection of images, grouped per embedding model."""
+
+    filenames: list[str]
+    img: dict[EmbeddingModel, EmbeddingMatrix]
+    txt: dict[EmbeddingModel, EmbeddingMatrix]
+
+    @classmethod
+    def from_table(cls, table: MetadataTable) -> CorpusEmbeddings:
+        return CorpusEmbeddings(
+            filenames=table.filenames.tolist(),
+            img={model: _to_matrix(column) for model, column in table.img.items()},
+            txt={model: _to_matrix(column) for model, column in table.txt.items()},
+        )
+
+    @property
+    def embedding_models(self) -> set[EmbeddingModel]:
+        return set(self.img) | set(self.txt)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by all embedding matrices."""
+        return sum(matrix.nbytes for matrix in list(self.img.values()) + list(self.txt.values()))
+
+    def with_scoring_mode(self, mode: ScoringMode) -> CorpusEmbeddings:
+        """Return version of this corpus with embeddings represented according to the given scoring mode."""
+        if mode == ScoringMode():
+            return self
+        return CorpusEmbeddings(
+            filenames=self.filenames,
+            img={model: matrix.with_scoring_mode(mode) for model, matrix in self.img.items()},
+            txt={model: matrix.with_scoring_mode(mode) for model, matrix in self.txt.items()},
+        )
+
+    def score(self, query_embeddings: dict[EmbeddingModel, np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Compute cosine similarity scores of q queries vs all images of the corpus.  Each image gets the max of its
+        query-vs-image and query-vs-text similarity.  Images without embeddings (for any of the models for which
+        query embeddings are provided) get score -inf.
+
+        :param query_embeddings: dict mapping (a subset of) the models in self.embedding_models to a (q, d)-matrix
+                                   with row-normalized query embeddings.
+        :return: tuple of 2 (q, n)-matrices: (scores, is_txt), with is_txt indicating if the score was based on the
+                   text embedding (True) or on the image embedding (False).
+        """
+        n_queries = next(iter(query_embeddings.values())).shape[0]
+        img_scores = self._score_matrices(self.img, query_embeddings, n_queries)
+        txt_scores = self._score_matrices(self.txt, query_embeddings, n_queries)
+
+        is_txt = txt_scores >= img_scores  # on ties, we report 'txt' as the source
+        return np.where(is_txt, txt_scores, img_scores), is_txt
+
+    def _score_matrices(
+        self,
+        matrices: dict[EmbeddingModel, EmbeddingMatrix],
+        query_embeddings: dict[EmbeddingModel, np.ndarray],
+        n_queries: int,
+    ) -> np.ndarray:
+        scores = np.full((n_queries, len(self.filenames)), -np.inf, dtype=np.float32)
+        for model, matrix in matrices.items():
+            if model in query_embeddings:
+                scores[:, matrix.rows] = matrix.similarities(query_embeddings[model])
+        return scores
+
+
+def _to_matrix(column: EmbeddingColumn) -> EmbeddingMatrix:
+    return EmbeddingMatrix(rows=column.rows, values=normalize_rows(column.values))
+
+
+# =================================================================================================
+#  Queries & ranking
+# =================================================================================================
+def embed_queries(queries: list[str], embedding_models: set[EmbeddingModel]) -> dict[EmbeddingModel, np.ndarray]:
+    """
+    Compute row-normalized query embeddings for all queries, using 1 batched call per embedding model, using the
+    lightweight text-only model.
+    :return: dict mapping each model to a (q, d)-matrix.
+    """
+    query_embeddings = dict()
+    for model in embedding_models:
+        embeddings = construct_embeddings_from_texts(queries, model, is_query=True, text_only_model=True)
+        query_embeddings[model] = normalize_rows(np.array([e.values for e in embeddings], dtype=np.float32))
+    return query_embeddings
+
+
+def rank_scores(filenames: list[str], scores: np.ndarray, is_txt: np.ndarray, min_score: float) -> list[SearchResult]:
+    """
+    Convert a (n,)-array of scores (for 1 query) into a list of SearchResults with score >= min_score, sorted by
+    descending score & filename.
+    """
+    results = [
+        SearchResult(filename=filenames[i], score=float(scores[i]), score_src="txt" if is_txt[i] else "img")
+        for i in np.flatnonzero(scores >= min_score)
+    ]
+    return sorted(results, key=lambda sr: (-sr.score, sr.filename))
@@ -1,11 +1,19 @@
 from pathlib import Path
 
-from core.data import Embedding, EmbeddingModel, ImageEmbeddings, SearchResult
-from core.tag import read_all_metadata
-from core.tag.embeddings import compute_similarity, construct_embedding_from_text
+from core.data import GeoFilter, SearchResult, TimeFilter
+from core.tag import read_metadata_table
 
+from ._scoring import CorpusEmbeddings, ScoringMode, embed_queries, rank_scores
 
-def semantic_search(directory: Path, query: str, min_score: float) -> list[SearchResult]:
+
+def semantic_search(
+    directory: Path,
+    query: str,
+    min_score: float,
+    scoring_mode: ScoringMode = ScoringMode(),
+    time_filter: TimeFilter | None = None,
+    geo_filter: GeoFilter | None = None,
+) -> list[SearchResult]:
     """
     Search for images in a directory based on a text query.  Search is performed by computing similarity scores
     between embeddings:
@@ -17,58 +25,54 @@ def semantic_search(directory: Path, query: str, min_score: float) -> list[Searc
     :param directory: Path to the directory containing images.
     :param query: Text query to search for (comma or space-separated).
     :param min_score: Minimum score to be included as a result.
+    :param scoring_mode: How image embeddings are represented when scoring (truncated and/or quantized, trading
+                           accuracy for speed & memory).  Default is exact scoring.
+    :param time_filter: (optional) Only images taken at times matching this filter are considered.  Candidates are
+                          selected using the time index of the directory, before reading any other metadata.
+    :param geo_filter: (optional) Only images taken at locations matching this filter are considered, again selected
+                         using a persistent (geo) index before reading any other metadata.
     :return: List of SearchResult objects that match the query.
     """
+    return semantic_search_batch(directory, [query], min_score, scoring_mode, time_filter, geo_filter)[query]
 
-    # --- read all metadata -------------------------------
-    all_metadata = read_all_metadata(directory)
 
-    # --- compute query embedding -------------------------
+def semantic_search_batch(
+    directory: Path,
+    queries: list[str],
+    min_score: float,
+    scoring_mode: ScoringMode = ScoringMode(),
+    time_filter: TimeFilter | None = None,
+    geo_filter: GeoFilter | None = None,
+) -> dict[str, list[SearchResult]]:
+    """
+    Same as semantic_search, but for multiple queries at once.  Metadata is read only once, all query embeddings are
+    computed in one batched call and all queries are scored against all images using a single matrix-matrix product
+    (per embedding model).
 
-    # determine all embedding models used in the metadata
-    all_embedding_models = set()
-    for metadata in all_metadata:
-        if metadata.embeddings is not None:
-            all_embedding_models.add(metadata.embeddings.txt.model)
-            all_embedding_models.add(metadata.embeddings.img.model)
+    :param directory: Path to the directory containing images.
+    :param queries: List of text queries to search for.
+    :param min_score: Minimum score to be included as a result.
+    :param scoring_mode: How image embeddings are represented when scoring, see semantic_search.
+    :param time_filter: (optional) Only images taken at times matching this filter are considered.
+    :param geo_filter: (optional) Only images taken at locations matching this filter are considered.
+    :return: dict mapping each query to a list of SearchResult objects that match the query.
+    """
 
-    # compute embeddings for the query for all encountered models (usually just one)
-    query_embeddings_dict = {
-        embedding_model: construct_embedding_from_text(query, embedding_model, is_query=True)
-        for embedding_model in all_embedding_models
-    }
+    # --- read all metadata -------------------------------
+    corpus = CorpusEmbeddings.from_table(read_metadata_table(directory, time_filter, geo_filter)).with_scoring_mode(
+        scoring_mode
+    )
+
+    # --- compute query embeddings ------------------------
 
     # check if any embeddings were found
-    if not query_embeddings_dict:
+    if not corpus.embedding_models:
         print("No embeddings found in metadata of images in this folder.")
-        return []
-
-    # --- compute scores for each image -------------------
-    results: list[SearchResult] = []  # (filename, score)-tuples
-    for metadata in all_metadata:
-        score, score_src = _compute_image_score(
-            img_embeddings=metadata.embeddings, query_embeddings=query_embeddings_dict
-        )
-        if score >= min_score:
-            results.append(SearchResult(filename=metadata.filename, score=score, score_src=score_src))
-
-    # --- sort & return -----------------------------------
-    results = sorted(results, key=lambda sr: (-sr.score, sr.filename))
-    return results
+        return {query: [] for query in queries}
 
+    # compute embeddings for the queries for all encountered models (usually just one)
+    query_embeddings = embed_queries(queries, corpus.embedding_models)
 
-def _compute_image_score(
-    img_embeddings: ImageEmbeddings,
-    query_embeddings: dict[EmbeddingModel, Embedding],
-) -> tuple[float, str]:
-    """
-    Compute the score for an image based on its embeddings and the query embeddings + returns string indicating which
-    embeddings was closest.
-    :param img_embeddings: ImageEmbeddings of the image.
-    :param query_embeddings: Dictionary of query embeddings keyed by embedding model.
-    :return: Overall similarity score.
-    """
-    img_score = (compute_similarity(img_embeddings.img, query_embeddings[img_embeddings.img.model]), "img")
-    txt_score = (compute_similarity(img_embeddings.txt, query_embeddings[img_embeddings.txt.model]), "txt")
-
-    return max(img_score, txt_score)
+    # --- compute scores & rank ---------------------------
+    scores, is_txt = corpus.score(query_embeddings)
+    return {query: rank_scores(corpus.filenames, scores[i], is_txt[i], min_score) for i, query in enumerate(queries)}
@@ -0,0 +1,95 @@
+from pathlib import Path
+
+import numpy as np
+
+from core.data import EmbeddingModel, ImageEmbeddings, SearchResult
+from core.tag import get_metadata_path, read_metadata
+from core.tag.embeddings import normalize_rows
+
+from ._scoring import ScoringMode
+from ._streaming_search import score_embedding_index
+
+
+def similar_images(
+    directory: Path, filename: str, min_score: float, scoring_mode: ScoringMode = ScoringMode()
+) -> list[SearchResult]:
+    """
+    Search for images similar to an already-tagged image ('query by example').  The stored image & text embeddings
+    of the example are used as queries, such that no embedding model needs to be loaded.  Each image gets the highest
+    score of both queries, with scores computed as in semantic_search.  The example itself is not included.
+
+    Images are scored straight from the on-disk embedding index of the directory (see streaming_semantic_search_batch),
+    such that no metadata (other than that of the example) needs to be read if the index is up to date.
+
+    :param directory: Path to the directory containing tagged images.
+    :param filename: Filename of the example image (relative to directory).
+    :param min_score: Minimum score to be included as a result.
+    :param scoring_mode: Only truncation of embeddings (dim) is supported;  embeddings are always scored as float32.
+    :return: List of SearchResult objects that are similar to the example.
+    """
+    query_embeddings = get_example_query_embeddings(directory / filename)
+    if query_embeddings is None:
+        return []
+
+    return [
+        result
+        for result in rank_example_scores(directory, query_embeddings, min_score, scoring_mode)
+        if result.filename != Path(filename).name
+    ]
+
+
+def get_example_query_embeddings(image_path: Path) -> dict[EmbeddingModel, np.ndarray] | None:
+    """
+    Return query embeddings based on the stored embeddings of a tagged image, as a dict mapping each model to a
+    (q, d)-matrix with 1 row per stored embedding of that model.  Returns None if no embeddings are available.
+    """
+    metadata = read_metadata(get_metadata_path(image_path))
+    if (metadata is None) or (metadata.embeddings is None):
+        print(f"No embeddings found in metadata of '{image_path}'; make sure it is tagged with embeddings.")
+        return None
+    return _to_query_embeddings(metadata.embeddings)
+
+
+def rank_example_scores(
+    directory: Path,
+    query_embeddings: dict[EmbeddingModel, np.ndarray],
+    min_score: float,
+    scoring_mode: ScoringMode = ScoringMode(),
+) -> list[SearchResult]:
+    """
+    Score the embedding index of the directory against all example queries & rank images based on their best score
+    over all queries.
+    """
+
+    # same number of queries for each model, by repeating the first one (which does not change the best score)
+    n_queries = max(len(queries) for queries in query_embeddings.values())
+    padded_query_embeddings = {
+        model: np.concatenate([queries, np.repeat(queries[:1], n_queries - len(queries), axis=0)])
+        for model, queries in query_embeddings.items()
+    }
+    results_by_query = score_embedding_index(
+        directory,
+        lambda embedding_models: {
+            model: padded_query_embeddings[model] for model in embedding_models if model in padded_query_embeddings
+        },
+        n_queries,
+        min_score,
+        scoring_mode=scoring_mode,
+    )
+
+    # best result per image;  on ties, the result of the first query is kept (as np.argmax would)
+    best_results: dict[str, SearchResult] = dict()
+    for results in results_by_query or []:
+        for result in results:
+            if (result.filename not in best_results) or (result.score > best_results[result.filename].score):
+                best_results[result.filename] = result
+    return sorted(best_results.values(), key=lambda sr: (-sr.score, sr.filename))
+
+
+def _to_query_embeddings(embeddings: ImageEmbeddings) -> dict[EmbeddingModel, np.ndarray]:
+    values_per_model = dict()
+    for embedding in [embeddings.img, embeddings.txt]:
+        if embedding is None:
+            continue  # no text embedding yet (embeddings-only mode)
+        values_per_model.setdefault(embedding.model, []).append(embedding.values)
+    return {model: normalize_rows(np.array(values, dtype=np.float32)) for model, values in values_per_model.items()}
@@ -0,0 +1,215 @@
+"""
+Out-of-core variant of semantic search, for directories whose embeddings don't fit in memory:  embeddings are scored
+straight from the on-disk embedding index (see core.tag.get_embedding_index), in fixed-size chunks that are read by a
+background thread while the previous chunk is scored.  Per query, only results with a score above the running
+threshold (min_score, raised to the score of the max_results-th best result so far) are kept, such that memory use
+does not depend on the number of images.
+"""
+
+from __future__ import annotations
+
+import heapq
+import queue
+import threading
+from pathlib import Path
+from typing import Callable, Iterator
+
+import numpy as np
+
+from core.config import STREAMING_SEARCH_CHUNK_MB
+from core.data import EmbeddingModel, GeoFilter, SearchResult, TimeFilter
+from core.tag import EmbeddingBlock, get_embedding_index, select_filenames
+from core.tag.embeddings import normalize_rows
+
+from ._scoring import ScoringMode, VectorQuantization, embed_queries
+
+
+# =================================================================================================
+#  Main functionality
+# =================================================================================================
+def streaming_semantic_search_batch(
+    directory: Path,
+    queries: list[str],
+    min_score: float,
+    max_results: int | None = None,
+    scoring_mode: ScoringMode = ScoringMode(),
+    time_filter: TimeFilter | None = None,
+    geo_filter: GeoFilter | None = None,
+) -> dict[str, list[SearchResult]]:
+    """
+    Same as semantic_search_batch(...), but scoring embeddings in chunks, straight from the on-disk embedding index,
+    instead of reading all of them into memory first.  Results are identical (up to ties at the max_results-th place).
+
+    :param directory: Path to the directory containing images.
+    :param queries: List of text queries to search for.
+    :param min_score: Minimum score to be included as a result.
+    :param max_results: (optional) Max number of results per query (the best ones).  Without it, memory use still
+                          grows with the number of results.
+    :param scoring_mode: Only truncation of embeddings (dim) is supported;  embeddings are always scored as float32.
+    :param time_filter: (optional) Only images taken at times matching this filter are considered.
+    :param geo_filter: (optional) Only images taken at locations matching this filter are considered.
+    :return: dict mapping each query to a list of SearchResult objects that match the query.
+    """
+    results = score_embedding_index(
+        directory,
+        lambda embedding_models: embed_queries(queries, embedding_models),
+        len(queries),
+        min_score,
+        max_results,
+        scoring_mode,
+        time_filter,
+        geo_filter,
+    )
+    if results is None:
+        print("No embeddings found in metadata of images in this folder.")
+        return {query: [] for query in queries}
+    return dict(zip(queries, results))
+
+
+def score_embedding_index(
+    directory: Path,
+    get_query_embeddings: Callable[[set[EmbeddingModel]], dict[EmbeddingModel, np.ndarray]],
+    n_queries: int,
+    min_score: float,
+    max_results: int | None = None,
+    scoring_mode: ScoringMode = ScoringMode(),
+    time_filter: TimeFilter | None = None,
+    geo_filter: GeoFilter | None = None,
+) -> list[list[SearchResult]] | None:
+    """
+    Score n_queries queries against the embedding index of the directory, see streaming_semantic_search_batch(...).
+    Query embeddings are only computed (using get_query_embeddings) for the embedding models present in the index;
+    images of models for which it returns no (q, d)-matrix are not scored (as in CorpusEmbeddings.score).
+    :return: list of ranked results per query, or None if the index contains no embeddings.
+    """
+    if scoring_mode.quantization != VectorQuantization.FLOAT32:
+        raise ValueError("Streaming search only supports float32 scoring (optionally with truncated embeddings).")
+
+    # --- select images & compute query embeddings --------
+    index = get_embedding_index(directory)
+    blocks = [block for block in index.blocks if (block.model is not None) and (len(block) > 0)]
+    if not blocks:
+        return None
+    selected = select_filenames(directory, time_filter, geo_filter)
+    selected = np.sort(np.array(selected, dtype=str)) if selected is not None else None
+    query_embeddings = get_query_embeddings({block.model for block in blocks})
+
+    # --- score chunk by chunk ----------------------------
+    top_results = [_TopResults(min_score, max_results) for _ in range(n_queries)]
+    for block in blocks:
+        if block.model not in query_embeddings:
+            continue
+        dim = min(scoring_mode.dim or block.dim, block.dim)
+        queries = query_embeddings[block.model]
+        if queries.shape[1] > dim:
+            queries = normalize_rows(queries[:, :dim])  # truncate queries the same way as the embeddings
+        rows_per_chunk = max(int(STREAMING_SEARCH_CHUNK_MB * 1e6) // (2 * 4 * dim), 1)  # img + txt, float32
+        for filenames, img, txt, has_txt, is_included in _prefetch_chunks(block, dim, rows_per_chunk):
+            if dim < block.dim:
+                img, txt = normalize_rows(img), normalize_rows(txt)  # all-zero rows remain all-zero
+            img_scores = queries @ img.T
+            txt_scores = np.where(has_txt, queries @ txt.T, -np.inf)
+            is_txt = txt_scores >= img_scores  # on ties, we report 'txt' as the source (as CorpusEmbeddings.score)
+            scores = np.where(is_txt, txt_scores, img_scores)
+            if selected is not None:
+                is_included &= _is_in_sorted(filenames, selected)
+            scores[:, ~is_included] = -np.inf
+            for i, results in enumerate(top_results):
+                results.add(scores[i], is_txt[i], filenames)
+
+    return [results.ranked() for results in top_results]
+
+
+# =================================================================================================
+#  Helpers
+# =================================================================================================
+class _TopResults:
+    """Running selection of the results of 1 query:  all results with score >= min_score, or the max_results best."""
+
+    def __init__(self, min_score: float, max_results: int | None):
+        self.threshold = min_score
+        self.max_results = max_results
+        self._heap: list[tuple[float, str, str]] = []  # (score, filename, score_src);  min-heap if max_results
+
+    def add(self, scores: np.ndarray, is_txt: np.ndarray, filenames: np.ndarray):
+        """Add results of a chunk:  scores, is_txt & filenames of its rows."""
+        candidates = np.flatnonzero(scores >= self.threshold)
+        if (self.max_results is not None) and (len(candidates) > self.max_results):
+            candidates = candidates[np.argpartition(-scores[candidates], self.max_results - 1)[: self.max_results]]
+        for j in candidates:
+            result = (float(scores[j]), str(filenames[j]), "txt" if is_txt[j] else "img")
+            if self.max_results is None:
+                self._heap.append(result)
+            elif len(self._heap) < self.max_results:
+                heapq.heappush(self._heap, result)
+            else:
+                heapq.heappushpop(self._heap, result)
+        if (self.max_results is not None) and (len(self._heap) == self.max_results):
+            self.threshold = max(self.threshold, self._heap[0][0])
+
+    def ranked(self) -> list[SearchResult]:
+        """Results sorted by descending score & filename, see rank_scores(...)."""
+        return [
+            SearchResult(filename=filename, score=score, score_src=score_src)
+            for score, filename, score_src in sorted(self._heap, key=lambda result: (-result[0], result[1]))
+        ]
+
+
+def _prefetch_chunks(
+    block: EmbeddingBlock, dim: int, rows_per_chunk: int
+) -> Iterator[tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Yield (filenames, img, txt, has_txt, is_included) for consecutive chunks of rows of the block (with embeddings
+    truncated to dim & is_included excluding deleted rows), copied into memory by a background thread that reads the
+    next chunk while the current one is processed.
+    """
+    chunks = queue.Queue(maxsize=1)  # at most 1 chunk read ahead
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        """Put item in the queue (waiting while it is full), unless stopped;  returns False if stopped."""
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def read_chunks():
+        try:
+            for start in range(0, len(block), rows_per_chunk):
+                rows = slice(start, start + rows_per_chunk)
+                filenames = np.array(block.filenames[rows])
+                is_included = ~block.is_deleted[rows] if block.is_deleted is not None else np.ones(len(filenames), bool)
+                chunk = (
+                    filenames,
+                    np.array(block.img[rows, :dim]),
+                    np.array(block.txt[rows, :dim]),
+                    np.array(block.has_txt[rows]),
+                    is_included,
+                )
+                if not put(chunk):
+                    return
+        except Exception as e:
+            put(e)
+            return
+        put(None)
+
+    reader = threading.Thread(target=read_chunks, daemon=True)
+    reader.start()
+    try:
+        while (chunk := chunks.get()) is not None:
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    finally:
+        stop.set()
+        reader.join()
+
+
+def _is_in_sorted(values: np.ndarray, sorted_values: np.ndarray) -> np.ndarray:
+    """Vectorized membership test of values in a sorted array, i.e. np.isin without sorting it again per chunk."""
+    if len(sorted_values) == 0:
+        return np.zeros(len(values), dtype=bool)
+    return sorted_values[np.minimum(np.searchsorted(sorted_values, values), len(sorted_values) - 1)] == values
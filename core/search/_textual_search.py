@@ -1,10 +1,16 @@
 from pathlib import Path
 
-from core.data import SearchData, SearchResult
-from core.tag import read_all_metadata
+from core.data import GeoFilter, SearchResult, TimeFilter
+from core.tag import read_metadata_table
 
 
-def textual_search(directory: Path, query: str, use_time_location_data: bool) -> list[SearchResult]:
+def textual_search(
+    directory: Path,
+    query: str,
+    use_time_location_data: bool,
+    time_filter: TimeFilter | None = None,
+    geo_filter: GeoFilter | None = None,
+) -> list[SearchResult]:
     """
     Search for images in a directory based on a text query. Text queries are treated as a set of individual words,
     each of which contribute to the importance of a search result. The more occurrences of a word in the image's tags +
@@ -16,42 +22,62 @@ def textual_search(directory: Path, query: str, use_time_location_data: bool) ->
     :param directory: Path to the directory containing images.
     :param query: Text query to search for (comma or space-separated).
     :param use_time_location_data: When false, extracted time & location data is ignored in the search.
+    :param time_filter: (optional) Only images taken at times matching this filter are considered.  Candidates are
+                          selected using the time index of the directory, before reading any other metadata.
+    :param geo_filter: (optional) Only images taken at locations matching this filter are considered, again selected
+                         using a persistent (geo) index before reading any other metadata.
     :return: List of SearchResult objects.
     """
+    return textual_search_batch(directory, [query], use_time_location_data, time_filter, geo_filter)[query]
 
-    # read all metadata
-    all_metadata = read_all_metadata(directory)
 
-    # search through all metadata files in the directory
-    results: list[SearchResult] = []  # (score, filename)-tuples
-    for metadata in all_metadata:
-        score = _get_score(metadata.search_data, query, use_time_location_data)
-        if score > 0:
-            results.append(SearchResult(filename=metadata.filename, score=score, score_src="txt"))
+def textual_search_batch(
+    directory: Path,
+    queries: list[str],
+    use_time_location_data: bool,
+    time_filter: TimeFilter | None = None,
+    geo_filter: GeoFilter | None = None,
+) -> dict[str, list[SearchResult]]:
+    """
+    Same as textual_search, but for multiple queries at once, such that metadata is read and converted into
+    searchable text only once.
+
+    :param directory: Path to the directory containing images.
+    :param queries: List of text queries to search for.
+    :param use_time_location_data: When false, extracted time & location data is ignored in the search.
+    :param time_filter: (optional) Only images taken at times matching this filter are considered.
+    :param geo_filter: (optional) Only images taken at locations matching this filter are considered.
+    :return: dict mapping each query to a list of SearchResult objects.
+    """
 
-    # sort results by score in descending order & alphabetically by filename
-    results = sorted(results, key=lambda sr: (-sr.score, sr.filename))
+    # read all metadata & convert to searchable text
+    table = read_metadata_table(directory, time_filter, geo_filter)
+    text_search_strings = table.text_search_strings(use_time_location_data)
+
+    results_by_query = dict()
+    for query in queries:
+        # search through all metadata files in the directory
+        results: list[SearchResult] = []  # (score, filename)-tuples
+        for filename, text_search_string in zip(table.filenames, text_search_strings):
+            score = compute_textual_score(text_search_string, query)
+            if score > 0:
+                results.append(SearchResult(filename=filename, score=score, score_src="txt"))
+
+        # sort results by score in descending order & alphabetically by filename
+        results_by_query[query] = sorted(results, key=lambda sr: (-sr.score, sr.filename))
 
     # return
-    return results
+    return results_by_query
 
 
-def _get_score(search_data: SearchData, query: str, use_time_location_data: bool) -> float:
+def compute_textual_score(text_search_string: str, query: str) -> float:
     """
-    Calculate an image score for a give query, starting from the image's SearchData.
-    :param search_data: SearchData object containing tags and description.
+    Calculate an image score for a given query, starting from the image's text search string.
+    :param text_search_string: lower-case concatenated string of all info to be text-searched.
     :param query: Text query to search for.
-    :param use_time_location_data: When false, extracted time & location data is ignored in the search.
     :return: Score as a float.
     """
 
-    # init
-    if not use_time_location_data:
-        search_data = search_data.model_copy(deep=True)
-        search_data.time = None
-        search_data.location = None
-    text_search_string = search_data.text_search_string().lower()  # concatenated string of all info to be text-searched
-
     # compute # of occurrences of each word in the query
     score = 0.0
     for word in set(query.lower().split()):
@@ -1,4 +1,18 @@
-from ._read_all_metadata import read_all_metadata, read_metadata
+from ._aggregates import MetadataAggregates, get_aggregates
+from ._benchmark_embeddings import benchmark_inference_profile, benchmark_text_only_model
+from ._embedding_index import EmbeddingBlock, EmbeddingIndex, get_embedding_index
+from ._enrich import enrich_images, select_images_to_enrich
+from ._find_duplicates import DuplicateCluster, find_duplicates
+from ._generation_options import GenerationOptions, get_generation_options, set_generation_options
+from ._geo_index import GeoIndex, get_geo_index, haversine_km
+from ._metadata_index import get_index_directory
+from ._metadata_table import EmbeddingColumn, MetadataTable, read_metadata_table, select_filenames
+from ._read_all_metadata import get_metadata_path, read_all_metadata, read_metadata
+from ._schedule import TagOrder, TagSchedule, order_images
 from ._show_stats import show_stats
 from ._show_tags import show_tags
-from ._tag_all_images import tag_all_images
+from ._tag_all_images import tag_all_images, tag_images
+from ._tag_cascade import refine_images, select_images_to_refine, tag_cascade
+from ._tag_catalog import tag_catalog
+from ._time_index import TimeIndex, get_time_index
+from ._watch import watch_directory
@@ -0,0 +1,154 @@
+"""
+Persisted aggregates over the metadata of a directory (tag counts, models, description lengths, extraction times),
+such that stats can be shown in constant time, i.e. without reading any metadata file.  Aggregates are stored in the
+metadata/_index subfolder and are updated each time a metadata file is written (see updating_aggregates), under a
+lock that is shared by all threads & processes tagging the directory.
+
+Changes made to the metadata folder by other means (e.g. deleting metadata files) are detected by comparing the
+modification time of the metadata folder with the one recorded by the last update, in which case the aggregates are
+rebuilt from scratch.  Files that are modified in place are not detected, so a rebuild can also be requested.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Iterator
+
+from core.data import ImageMetadata
+
+from ._metadata_index import get_index_directory, get_metadata_mtime_ns, index_lock
+
+_AGGREGATES_FILENAME = "aggregates.json"
+_AGGREGATES_LOCK_FILENAME = "aggregates.lock"
+_AGGREGATES_VERSION = 1
+
+
+# =================================================================================================
+#  Aggregates
+# =================================================================================================
+@dataclass
+class MetadataAggregates:
+    n_files: int = 0
+    models: dict[str, int] = field(default_factory=dict)  # model -> number of images ("" = no LLM run yet)
+    tiers: dict[str, int] = field(default_factory=dict)  # ModelTier value -> number of images ("" = no tier)
+    tag_counts: dict[str, int] = field(default_factory=dict)  # tag -> number of images
+    n_tags: int = 0
+    n_description_chars: int = 0
+    t_extract_sum: float = 0.0  # seconds
+    metadata_mtime_ns: int = 0  # mtime of the metadata folder right after the last update, to detect other changes
+
+    def add(self, data: dict, sign: int = 1):
+        """Add (sign=1) or remove (sign=-1) the contribution of 1 image, given its (json-decoded) metadata."""
+        search_data = data["search_data"]
+        tags = search_data.get("tags", [])
+        self.n_files += sign
+        _add_count(self.models, data["model"], sign)
+        _add_count(self.tiers, data.get("tier") or "", sign)
+        for tag in tags:
+            _add_count(self.tag_counts, tag, sign)
+        self.n_tags += sign * len(tags)
+        self.n_description_chars += sign * len(search_data.get("description", ""))
+        self.t_extract_sum += sign * float(data["t_extract"])
+
+
+def _add_count(counts: dict[str, int], key: str, delta: int):
+    count = counts.get(key, 0) + delta
+    if count > 0:
+        counts[key] = count
+    else:
+        counts.pop(key, None)
+
+
+# =================================================================================================
+#  Reading & updating
+# =================================================================================================
+def get_aggregates(image_directory: Path, rebuild: bool = False) -> MetadataAggregates:
+    """
+    Return the aggregates of the directory, which are only rebuilt (by reading all metadata files) if requested,
+    if they don't exist yet or if the metadata folder was changed by other means than updating_aggregates(...).
+    """
+    with index_lock(image_directory, _AGGREGATES_LOCK_FILENAME):
+        aggregates = None if rebuild else _load_aggregates(image_directory)
+        if aggregates is None:
+            aggregates = _rebuild_aggregates(image_directory)
+            _save_aggregates(image_directory, aggregates)
+        return aggregates
+
+
+@contextmanager
+def updating_aggregates(image_directory: Path) -> Iterator[_AggregatesUpdate]:
+    """
+    Context manager for writing metadata files of a directory while keeping its aggregates up to date, e.g.:
+
+        with updating_aggregates(image_directory) as update:
+            update.remove(metadata_path)  # contribution of the current file (if any) is removed
+            <write metadata_path>
+            update.add(metadata)
+
+    Concurrent updates (from other threads or processes) are blocked until the block is exited.
+    """
+    with index_lock(image_directory, _AGGREGATES_LOCK_FILENAME):
+        aggregates = _load_aggregates(image_directory) or _rebuild_aggregates(image_directory)
+        yield _AggregatesUpdate(aggregates)
+        _save_aggregates(image_directory, aggregates)
+
+
+class _AggregatesUpdate:
+    def __init__(self, aggregates: MetadataAggregates):
+        self._aggregates = aggregates
+
+    def remove(self, metadata_path: Path):
+        """Remove the contribution of the metadata file, if it exists (& is valid)."""
+        try:
+            self._aggregates.add(json.loads(metadata_path.read_text()), sign=-1)
+        except Exception:
+            pass  # nonexistent or invalid -> not counted by _rebuild_aggregates either
+
+    def add(self, metadata: ImageMetadata):
+        self._aggregates.add(metadata.model_dump(mode="json", exclude={"embeddings"}))
+
+
+# =================================================================================================
+#  Helpers
+# =================================================================================================
+def _rebuild_aggregates(image_directory: Path) -> MetadataAggregates:
+    aggregates = MetadataAggregates()
+    try:
+        with os.scandir(image_directory / "metadata") as entries:
+            for entry in entries:
+                if entry.name.endswith(".json") and entry.is_file():
+                    try:
+                        with open(entry.path, "r") as f:
+                            aggregates.add(json.load(f))
+                    except Exception as e:
+                        print(f"Error reading metadata for {entry.path}: {e}")
+    except FileNotFoundError:
+        pass
+    return aggregates
+
+
+def _load_aggregates(image_directory: Path) -> MetadataAggregates | None:
+    """Load persisted aggregates, returning None if they don't exist or are outdated."""
+    try:
+        data = json.loads((get_index_directory(image_directory) / _AGGREGATES_FILENAME).read_text())
+        if data.pop("version") != _AGGREGATES_VERSION:
+            return None
+        aggregates = MetadataAggregates(**data)
+    except Exception:
+        return None
+    if aggregates.metadata_mtime_ns != get_metadata_mtime_ns(image_directory):
+        return None  # metadata folder was changed by other means
+    return aggregates
+
+
+def _save_aggregates(image_directory: Path, aggregates: MetadataAggregates):
+    """Save atomically (the tmp file is written in the _index subfolder, so the metadata folder remains unchanged)."""
+    aggregates.metadata_mtime_ns = get_metadata_mtime_ns(image_directory)
+    index_directory = get_index_directory(image_directory)
+    tmp_path = index_directory / f"{_AGGREGATES_FILENAME}.{os.getpid()}.tmp"
+    tmp_path.write_text(json.dumps(dict(version=_AGGREGATES_VERSION, **asdict(aggregates))))
+    os.replace(tmp_path, index_directory / _AGGREGATES_FILENAME)
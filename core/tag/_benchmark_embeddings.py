@@ -0,0 +1,191 @@
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from core.catalog import is_image_file
+from core.config import TEXT_ONLY_MODEL_MIN_SIMILARITY
+from core.data import Embedding, EmbeddingModel
+
+from ._read_all_metadata import read_all_metadata
+from .embeddings import (
+    InferencePrecision,
+    InferenceProfile,
+    construct_embedding_from_image,
+    construct_embeddings_from_texts,
+    get_hugging_face_model,
+    get_inference_profile,
+    normalize_rows,
+    release_hugging_face_models,
+    set_inference_profile,
+)
+
+
+@dataclass
+class _BenchmarkRun:
+    t_load: float  # seconds
+    t_per_image: float  # seconds
+    t_per_text: float  # seconds
+    img_embeddings: list[Embedding]
+    txt_embeddings: list[Embedding]
+
+
+def benchmark_inference_profile(
+    image_directory: Path, profile: InferenceProfile, embedding_size: int = 2048, n_images: int = 20
+):
+    """
+    Compare throughput & accuracy of computing embeddings using the given inference profile vs the fp32 baseline
+    (using the same thread settings), based on a sample of images from the given directory.  Text embeddings are
+    computed for the textual descriptions of these images, if they were already tagged, or their filenames otherwise.
+    Models are loaded one after the other, so we never hold both in memory.
+
+    :param image_directory: Path to the directory containing images.
+    :param profile: InferenceProfile to be benchmarked.
+    :param embedding_size: Size of the embeddings to be computed.
+    :param n_images: Max number of images to use.
+    """
+
+    # --- prep --------------------------------------------
+    embedding_model = EmbeddingModel.from_embedding_size(embedding_size)
+    images = sorted(path for path in image_directory.iterdir() if is_image_file(path.name))[:n_images]
+    if not images:
+        print("No images found.")
+        return
+
+    descriptions = {
+        metadata.filename: metadata.search_data.textual_description() for metadata in read_all_metadata(image_directory)
+    }
+    texts = [descriptions.get(image.name) or image.name for image in images]
+
+    # --- run ---------------------------------------------
+    baseline_profile = InferenceProfile(
+        precision=InferencePrecision.FP32,
+        num_threads=profile.num_threads,
+        num_interop_threads=profile.num_interop_threads,
+    )
+    original_profile = get_inference_profile()
+    try:
+        print(f"Computing embeddings for {len(images)} images & texts using [{baseline_profile}]...")
+        baseline = _run(baseline_profile, embedding_model, images, texts)
+        print(f"Computing embeddings for {len(images)} images & texts using [{profile}]...")
+        candidate = _run(profile, embedding_model, images, texts)
+    finally:
+        set_inference_profile(original_profile)
+
+    # --- report ------------------------------------------
+    img_similarities = _similarities(baseline.img_embeddings, candidate.img_embeddings)
+    txt_similarities = _similarities(baseline.txt_embeddings, candidate.txt_embeddings)
+    print()
+    print(f"                        {'fp32':>10}  {profile.precision.value:>10}   speed-up")
+    print(f"  model load (sec)    : {baseline.t_load:10.2f}  {candidate.t_load:10.2f}")
+    print(
+        f"  images   (sec/img)  : {baseline.t_per_image:10.4f}  {candidate.t_per_image:10.4f}  "
+        + f"{baseline.t_per_image / candidate.t_per_image:8.2f}x"
+    )
+    print(
+        f"  texts    (sec/text) : {baseline.t_per_text:10.4f}  {candidate.t_per_text:10.4f}  "
+        + f"{baseline.t_per_text / candidate.t_per_text:8.2f}x"
+    )
+    print()
+    print("  cosine similarity vs fp32 baseline:")
+    print(f"     image embeddings : avg={np.mean(img_similarities):.4f}   min={np.min(img_similarities):.4f}")
+    print(f"     text embeddings  : avg={np.mean(txt_similarities):.4f}   min={np.min(txt_similarities):.4f}")
+    print(f"     text->image top-1 retrieval agreement: {_top1_agreement(baseline, candidate):.1%}")
+
+
+def benchmark_text_only_model(image_directory: Path, embedding_size: int = 2048, n_texts: int = 20):
+    """
+    Compare the lightweight text-only model (used for encoding search queries) against the full model, in terms of
+    load time, memory, throughput and similarity of the resulting query embeddings, using the textual descriptions
+    of tagged images in the given directory as queries.
+
+    :param image_directory: Path to the directory containing tagged images.
+    :param embedding_size: Size of the embeddings to be computed.
+    :param n_texts: Max number of texts to use.
+    """
+
+    # --- prep --------------------------------------------
+    embedding_model = EmbeddingModel.from_embedding_size(embedding_size)
+    texts = [metadata.search_data.textual_description() for metadata in read_all_metadata(image_directory)][:n_texts]
+    if not texts:
+        print("No tagged images found.")
+        return
+
+    # --- run ---------------------------------------------
+    results = dict()
+    for text_only in [False, True]:
+        print(
+            f"Computing embeddings for {len(texts)} queries using the {'text-only' if text_only else 'full'} model..."
+        )
+        release_hugging_face_models()
+        t_start = time.perf_counter()
+        hf_model = get_hugging_face_model(embedding_model, text_only=text_only)
+        t_load = time.perf_counter() - t_start
+        model_size = sum(param.numel() * param.element_size() for param in hf_model.parameters())
+
+        construct_embeddings_from_texts(texts[:1], embedding_model, is_query=True, text_only_model=text_only)
+        t_start = time.perf_counter()
+        embeddings = construct_embeddings_from_texts(texts, embedding_model, is_query=True, text_only_model=text_only)
+        t_per_text = (time.perf_counter() - t_start) / len(texts)
+
+        results[text_only] = (t_load, model_size, t_per_text, embeddings)
+    release_hugging_face_models()
+
+    # --- report ------------------------------------------
+    (t_load_full, size_full, t_full, embeddings_full) = results[False]
+    (t_load_text, size_text, t_text, embeddings_text) = results[True]
+    similarities = _similarities(embeddings_full, embeddings_text)
+    print()
+    print(f"                        {'full':>10}  {'text-only':>10}")
+    print(f"  model load (sec)    : {t_load_full:10.2f}  {t_load_text:10.2f}")
+    print(f"  model weights (GB)  : {size_full / 1e9:10.2f}  {size_text / 1e9:10.2f}")
+    print(f"  queries  (sec/text) : {t_full:10.4f}  {t_text:10.4f}")
+    print()
+    print(f"  cosine similarity vs full model: avg={np.mean(similarities):.5f}   min={np.min(similarities):.5f}")
+    if np.min(similarities) < TEXT_ONLY_MODEL_MIN_SIMILARITY:
+        print(
+            f"  WARNING: text-only model deviates from full model (min similarity < {TEXT_ONLY_MODEL_MIN_SIMILARITY})"
+        )
+
+
+def _run(
+    profile: InferenceProfile, embedding_model: EmbeddingModel, images: list[Path], texts: list[str]
+) -> _BenchmarkRun:
+    # load model (making sure any previously loaded model is released first)
+    set_inference_profile(profile)
+    release_hugging_face_models()
+    t_start = time.perf_counter()
+    get_hugging_face_model(embedding_model)
+    t_load = time.perf_counter() - t_start
+
+    # warm-up, so one-time initialization doesn't distort timings
+    construct_embeddings_from_texts(texts[:1], embedding_model, is_query=False)
+
+    # images
+    t_start = time.perf_counter()
+    img_embeddings = [construct_embedding_from_image(image, embedding_model) for image in images]
+    t_per_image = (time.perf_counter() - t_start) / len(images)
+
+    # texts
+    t_start = time.perf_counter()
+    txt_embeddings = construct_embeddings_from_texts(texts, embedding_model, is_query=False)
+    t_per_text = (time.perf_counter() - t_start) / len(texts)
+
+    return _BenchmarkRun(t_load, t_per_image, t_per_text, img_embeddings, txt_embeddings)
+
+
+def _to_matrix(embeddings: list[Embedding]) -> np.ndarray:
+    return normalize_rows(np.array([embedding.values for embedding in embeddings], dtype=np.float32))
+
+
+def _similarities(baseline: list[Embedding], candidate: list[Embedding]) -> np.ndarray:
+    """Cosine similarity between corresponding embeddings."""
+    return np.sum(_to_matrix(baseline) * _to_matrix(candidate), axis=1)
+
+
+def _top1_agreement(baseline: _BenchmarkRun, candidate: _BenchmarkRun) -> float:
+    """Fraction of texts for which the most similar image is the same for both runs."""
+    top1_baseline = np.argmax(_to_matrix(baseline.txt_embeddings) @ _to_matrix(baseline.img_embeddings).T, axis=1)
+    top1_candidate = np.argmax(_to_matrix(candidate.txt_embeddings) @ _to_matrix(candidate.img_embeddings).T, axis=1)
+    return float(np.mean(top1_baseline == top1_candidate))
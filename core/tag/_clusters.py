@@ -0,0 +1,25 @@
+import numpy as np
+
+
+def connected_components(n: int, i: np.ndarray, j: np.ndarray) -> list[list[int]]:
+    """
+    Group n items into connected components (using union-find), based on pairs (i[k], j[k]) of linked items.
+    :return: List of components with >= 2 items, each a sorted list of item indices, ordered by their first item.
+    """
+    parent = list(range(n))
+
+    def find(a: int) -> int:
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]  # path halving
+            a = parent[a]
+        return a
+
+    for a, b in zip(i.tolist(), j.tolist()):
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    members: dict[int, list[int]] = dict()
+    for a in range(n):
+        members.setdefault(find(a), []).append(a)
+    return [component for component in members.values() if len(component) > 1]
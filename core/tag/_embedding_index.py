@@ -0,0 +1,382 @@
+"""
+Persistent, on-disk index of the (row-normalized, float32) embeddings of all images in a directory, such that
+semantic search can stream over them in chunks (see core.search.streaming_semantic_search_batch) instead of holding
+all of them in memory.
+
+The index consists of immutable blocks, each holding the rows of 1 embedding model as raw float32 matrices (img & txt,
+with aligned rows) that are memory-mapped when searching, and a small manifest listing the blocks.  An update appends
+new & changed rows as new blocks and marks the rows they supersede as deleted (in a deletion mask per block, written
+anew with each generation of the manifest).  Blocks of the same model are merged log-structured (a block is merged
+into its predecessor once it holds at least half as many rows), such that rows are only rewritten O(log n) times.
+
+Whether an update is needed is determined by comparing the modification time of the metadata folder with the one
+recorded in the manifest (as for the aggregates, see _aggregates), so searching an up-to-date index does not touch any
+metadata file.  Only then are the metadata files listed & compared (as sorted arrays) with the indexed ones, reading
+only new or changed files.  Updates are serialized by a lock shared by all threads & processes;  the manifest is
+replaced atomically (such that concurrent readers always see a consistent generation), after which all block files it
+no longer references (including those left behind by interrupted updates) are removed.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import secrets
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+import numpy as np
+
+from core.data import EmbeddingModel
+
+from ._metadata_index import (
+    get_index_directory,
+    get_metadata_mtime_ns,
+    index_lock,
+    load_index_arrays,
+    save_index_arrays,
+)
+from ._metadata_table import parse_embedding_values
+
+_EMBEDDING_INDEX_FILENAME = "embeddings.npz"
+_EMBEDDING_INDEX_LOCK_FILENAME = "embeddings.lock"
+_BLOCK_FILENAME_PATTERN = re.compile(r"embeddings\.[0-9a-f]{8}\.")  # all files of blocks (& their deletion masks)
+_COPY_CHUNK_ROWS = 16_384  # number of rows copied at once when merging blocks
+
+
+# =================================================================================================
+#  Embedding index
+# =================================================================================================
+@dataclass
+class EmbeddingBlock:
+    """Embeddings of images whose image embedding was computed with the same model, memory-mapped."""
+
+    model: EmbeddingModel | None  # None for blocks listing images without embeddings
+    filenames: np.ndarray  # (m,) str
+    img: np.ndarray  # (m, d) float32;  row-normalized image embeddings
+    txt: np.ndarray  # (m, d) float32;  row-normalized text embeddings, all-zero rows for images without one
+    has_txt: np.ndarray  # (m,) bool
+    is_deleted: np.ndarray | None  # (m,) bool;  rows superseded by a later block or removed;  None if there are none
+
+    def __len__(self) -> int:
+        return len(self.filenames)
+
+    @property
+    def dim(self) -> int:
+        return self.img.shape[1]
+
+
+@dataclass
+class EmbeddingIndex:
+    generation: str  # random id of this version of the manifest
+    blocks: list[EmbeddingBlock]
+
+
+def get_embedding_index(image_directory: Path) -> EmbeddingIndex:
+    """Return the embedding index of the directory, updating (& persisting) it first if the metadata folder changed."""
+    try:
+        return _get_embedding_index(image_directory)
+    except FileNotFoundError:
+        return _get_embedding_index(image_directory)  # blocks were merged (& removed) concurrently -> retry
+
+
+def _get_embedding_index(image_directory: Path) -> EmbeddingIndex:
+    manifest = _load_manifest(image_directory)
+    if manifest.metadata_mtime_ns != get_metadata_mtime_ns(image_directory):
+        manifest = _update_embedding_index(image_directory)
+    index_directory = get_index_directory(image_directory)
+    return EmbeddingIndex(
+        generation=manifest.generation,
+        blocks=[_open_block(index_directory, entry) for entry in manifest.blocks],
+    )
+
+
+# =================================================================================================
+#  Manifest
+# =================================================================================================
+@dataclass
+class _BlockEntry:
+    block_id: str  # random id, used in the filenames of the block
+    model: str  # EmbeddingModel value;  "" for images without embeddings
+    dim: int
+    count: int  # number of rows, including deleted ones
+    deleted: str = ""  # filename of the deletion mask;  "" if no rows were deleted
+    n_deleted: int = 0  # only determined when updating
+
+    @property
+    def n_rows(self) -> int:
+        return self.count - self.n_deleted
+
+
+@dataclass
+class _Manifest:
+    generation: str = ""
+    metadata_mtime_ns: int = -1  # mtime of the metadata folder right before the last update listed it
+    blocks: tuple[_BlockEntry, ...] = ()
+
+
+def _load_manifest(image_directory: Path) -> _Manifest:
+    data = load_index_arrays(image_directory, _EMBEDDING_INDEX_FILENAME)
+    if data is None:
+        return _Manifest()
+    return _Manifest(
+        generation=str(data["generation"]),
+        metadata_mtime_ns=int(data["metadata_mtime_ns"]),
+        blocks=tuple(
+            _BlockEntry(block_id, model, dim, count, deleted)
+            for block_id, model, dim, count, deleted in zip(
+                data["block_ids"].tolist(),
+                data["models"].tolist(),
+                data["dims"].tolist(),
+                data["counts"].tolist(),
+                data["deleted"].tolist(),
+            )
+        ),
+    )
+
+
+def _save_manifest(image_directory: Path, manifest: _Manifest):
+    save_index_arrays(
+        image_directory,
+        _EMBEDDING_INDEX_FILENAME,
+        generation=np.array(manifest.generation),
+        metadata_mtime_ns=np.array(manifest.metadata_mtime_ns, dtype=np.int64),
+        block_ids=np.array([entry.block_id for entry in manifest.blocks], dtype=str),
+        models=np.array([entry.model for entry in manifest.blocks], dtype=str),
+        dims=np.array([entry.dim for entry in manifest.blocks], dtype=np.int64),
+        counts=np.array([entry.count for entry in manifest.blocks], dtype=np.int64),
+        deleted=np.array([entry.deleted for entry in manifest.blocks], dtype=str),
+    )
+
+
+def _open_block(index_directory: Path, entry: _BlockEntry) -> EmbeddingBlock:
+    prefix = index_directory / f"embeddings.{entry.block_id}"
+    if entry.dim > 0:
+        img = np.memmap(f"{prefix}.img.f32", dtype=np.float32, mode="r", shape=(entry.count, entry.dim))
+        txt = np.memmap(f"{prefix}.txt.f32", dtype=np.float32, mode="r", shape=(entry.count, entry.dim))
+    else:
+        img = txt = np.zeros((entry.count, 0), dtype=np.float32)  # empty files can't be memory-mapped
+    return EmbeddingBlock(
+        model=EmbeddingModel(entry.model) if entry.model else None,
+        filenames=np.load(f"{prefix}.filenames.npy", mmap_mode="r"),
+        img=img,
+        txt=txt,
+        has_txt=np.load(f"{prefix}.has_txt.npy", mmap_mode="r"),
+        is_deleted=np.load(index_directory / entry.deleted, mmap_mode="r") if entry.deleted else None,
+    )
+
+
+# =================================================================================================
+#  Updating
+# =================================================================================================
+def _update_embedding_index(image_directory: Path) -> _Manifest:
+    with index_lock(image_directory, _EMBEDDING_INDEX_LOCK_FILENAME):
+        manifest = _load_manifest(image_directory)
+        metadata_mtime_ns = get_metadata_mtime_ns(image_directory)  # before listing, such that later changes count
+        if manifest.metadata_mtime_ns == metadata_mtime_ns:
+            return manifest  # updated concurrently
+
+        index_directory = get_index_directory(image_directory)
+        generation = secrets.token_hex(4)
+        entries = [replace(entry) for entry in manifest.blocks]
+        deletion_masks = [_load_deletion_mask(index_directory, entry) for entry in entries]
+
+        # --- compare metadata files with indexed rows --------
+        filenames, stats = _list_metadata_files(image_directory)
+        indexed_filenames, indexed_stats, indexed_blocks, indexed_rows = _list_indexed_rows(
+            index_directory, entries, deletion_masks
+        )
+        pos, is_indexed = _lookup_sorted(indexed_filenames, filenames)
+        is_unchanged = is_indexed.copy()
+        is_unchanged[is_indexed] = np.all(indexed_stats[pos[is_indexed]] == stats[is_indexed], axis=1)
+        is_superseded = np.ones(len(indexed_filenames), dtype=bool)  # changed or removed
+        is_superseded[pos[is_unchanged]] = False
+
+        # --- mark superseded rows as deleted -----------------
+        for k in np.unique(indexed_blocks[is_superseded]).tolist():
+            deletion_masks[k][indexed_rows[is_superseded & (indexed_blocks == k)]] = True
+            entries[k].deleted = f"embeddings.{entries[k].block_id}.deleted.{generation}.npy"
+            entries[k].n_deleted = int(np.count_nonzero(deletion_masks[k]))
+            np.save(index_directory / entries[k].deleted, deletion_masks[k])
+
+        # --- append new & changed rows as new blocks ---------
+        writers: dict[str, _BlockWriter] = dict()
+        for filename, file_stats in zip(filenames[~is_unchanged].tolist(), stats[~is_unchanged]):
+            metadata_path = image_directory / "metadata" / f"{filename}.json"
+            try:
+                model, img, txt = _parse_embeddings(json.loads(metadata_path.read_text()))
+            except Exception as e:
+                print(f"Error reading metadata for {metadata_path}: {e}")
+                model, img, txt = "", None, None  # indexed without embeddings, re-read once it changes
+            if model not in writers:
+                writers[model] = _BlockWriter(index_directory, model, 0 if img is None else len(img))
+            writers[model].append_row(filename, file_stats, img, txt)
+        entries = [entry for entry in entries if entry.n_rows > 0] + [writer.close() for writer in writers.values()]
+
+        # --- merge blocks, replace manifest & remove unreferenced files
+        entries = _merge_blocks(index_directory, entries)
+        manifest = _Manifest(generation=generation, metadata_mtime_ns=metadata_mtime_ns, blocks=tuple(entries))
+        _save_manifest(image_directory, manifest)
+        _remove_unreferenced_files(index_directory, manifest)
+        return manifest
+
+
+class _BlockWriter:
+    """Writes the files of a new block, row by row or in chunks of rows."""
+
+    def __init__(self, index_directory: Path, model: str, dim: int):
+        self.entry = _BlockEntry(block_id=secrets.token_hex(4), model=model, dim=dim, count=0)
+        self._prefix = index_directory / f"embeddings.{self.entry.block_id}"
+        self._filenames: list[np.ndarray] = []
+        self._stats: list[np.ndarray] = []
+        self._has_txt: list[np.ndarray] = []
+        self._img_file = open(f"{self._prefix}.img.f32", "wb")
+        self._txt_file = open(f"{self._prefix}.txt.f32", "wb")
+
+    def append_row(self, filename: str, stats: np.ndarray, img: np.ndarray | None, txt: np.ndarray | None):
+        img = np.zeros(self.entry.dim, dtype=np.float32) if img is None else img
+        has_txt = txt is not None
+        txt = txt if has_txt else np.zeros(self.entry.dim, dtype=np.float32)
+        self.append_rows(np.array([filename]), stats[None, :], img[None, :], txt[None, :], np.array([has_txt]))
+
+    def append_rows(
+        self, filenames: np.ndarray, stats: np.ndarray, img: np.ndarray, txt: np.ndarray, has_txt: np.ndarray
+    ):
+        self._img_file.write(np.ascontiguousarray(img, dtype=np.float32).tobytes())
+        self._txt_file.write(np.ascontiguousarray(txt, dtype=np.float32).tobytes())
+        self._filenames.append(np.asarray(filenames, dtype=str))
+        self._stats.append(np.asarray(stats, dtype=np.int64).reshape(-1, 2))
+        self._has_txt.append(np.asarray(has_txt, dtype=bool))
+        self.entry.count += len(filenames)
+
+    def close(self) -> _BlockEntry:
+        self._img_file.close()
+        self._txt_file.close()
+        np.save(f"{self._prefix}.filenames.npy", np.concatenate(self._filenames or [np.zeros(0, dtype=str)]))
+        np.save(f"{self._prefix}.stats.npy", np.concatenate(self._stats or [np.zeros((0, 2), dtype=np.int64)]))
+        np.save(f"{self._prefix}.has_txt.npy", np.concatenate(self._has_txt or [np.zeros(0, dtype=bool)]))
+        return self.entry
+
+
+def _merge_blocks(index_directory: Path, entries: list[_BlockEntry]) -> list[_BlockEntry]:
+    """
+    Merge blocks of the same model, log-structured:  a block is merged into its predecessor once it holds at least
+    half as many (non-deleted) rows, and blocks of which more than half of the rows are deleted are rewritten.
+    """
+    merged_entries = []
+    for model in dict.fromkeys(entry.model for entry in entries):
+        stack: list[_BlockEntry] = []
+        for entry in [entry for entry in entries if entry.model == model]:
+            stack.append(entry)
+            while True:
+                if (len(stack) >= 2) and (2 * stack[-1].n_rows >= stack[-2].n_rows):
+                    to_merge = [stack.pop(-2), stack.pop()]
+                elif 2 * stack[-1].n_deleted > stack[-1].count:
+                    to_merge = [stack.pop()]
+                else:
+                    break
+                stack.append(_copy_blocks(index_directory, to_merge))
+        merged_entries += stack
+    return merged_entries
+
+
+def _copy_blocks(index_directory: Path, entries: list[_BlockEntry]) -> _BlockEntry:
+    """Copy all non-deleted rows of the blocks into a new block, in chunks of rows."""
+    writer = _BlockWriter(index_directory, entries[0].model, entries[0].dim)
+    for entry in entries:
+        block = _open_block(index_directory, entry)
+        stats = np.load(index_directory / f"embeddings.{entry.block_id}.stats.npy", mmap_mode="r")
+        for start in range(0, len(block), _COPY_CHUNK_ROWS):
+            rows = slice(start, start + _COPY_CHUNK_ROWS)
+            keep = ~block.is_deleted[rows] if block.is_deleted is not None else slice(None)
+            writer.append_rows(
+                block.filenames[rows][keep],
+                stats[rows][keep],
+                block.img[rows][keep],
+                block.txt[rows][keep],
+                block.has_txt[rows][keep],
+            )
+    return writer.close()
+
+
+def _remove_unreferenced_files(index_directory: Path, manifest: _Manifest):
+    referenced = {entry.deleted for entry in manifest.blocks}
+    for entry in manifest.blocks:
+        prefix = f"embeddings.{entry.block_id}"
+        referenced |= {f"{prefix}.{suffix}" for suffix in ["img.f32", "txt.f32", "filenames.npy", "stats.npy"]}
+        referenced.add(f"{prefix}.has_txt.npy")
+    for path in index_directory.iterdir():
+        if _BLOCK_FILENAME_PATTERN.match(path.name) and (path.name not in referenced):
+            path.unlink(missing_ok=True)
+
+
+# =================================================================================================
+#  Helpers
+# =================================================================================================
+def _list_metadata_files(image_directory: Path) -> tuple[np.ndarray, np.ndarray]:
+    """Return sorted (n,)-array of image filenames with a metadata file & (n, 2)-array with their (size, mtime_ns)."""
+    filenames, stats = [], []
+    try:
+        with os.scandir(image_directory / "metadata") as entries:
+            for entry in entries:
+                if entry.name.endswith(".json") and entry.is_file():
+                    stat = entry.stat()
+                    filenames.append(entry.name.removesuffix(".json"))
+                    stats.append((stat.st_size, stat.st_mtime_ns))
+    except FileNotFoundError:
+        pass
+    filenames, stats = np.array(filenames, dtype=str), np.array(stats, dtype=np.int64).reshape(-1, 2)
+    order = np.argsort(filenames)
+    return filenames[order], stats[order]
+
+
+def _list_indexed_rows(
+    index_directory: Path, entries: list[_BlockEntry], deletion_masks: list[np.ndarray]
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Return (filenames, stats, block index, row) of all non-deleted rows of the blocks, sorted by filename."""
+    filenames, stats, blocks, rows = [np.zeros(0, dtype=str)], [np.zeros((0, 2), dtype=np.int64)], [], []
+    for k, (entry, is_deleted) in enumerate(zip(entries, deletion_masks)):
+        prefix = index_directory / f"embeddings.{entry.block_id}"
+        block_rows = np.flatnonzero(~is_deleted)
+        filenames.append(np.load(f"{prefix}.filenames.npy", mmap_mode="r")[block_rows])
+        stats.append(np.load(f"{prefix}.stats.npy", mmap_mode="r")[block_rows])
+        blocks.append(np.full(len(block_rows), k))
+        rows.append(block_rows)
+    filenames, stats = np.concatenate(filenames), np.concatenate(stats)
+    blocks, rows = np.concatenate(blocks or [np.zeros(0, dtype=int)]), np.concatenate(rows or [np.zeros(0, dtype=int)])
+    order = np.argsort(filenames)
+    return filenames[order], stats[order], blocks[order], rows[order]
+
+
+def _load_deletion_mask(index_directory: Path, entry: _BlockEntry) -> np.ndarray:
+    if not entry.deleted:
+        return np.zeros(entry.count, dtype=bool)
+    is_deleted = np.load(index_directory / entry.deleted)
+    entry.n_deleted = int(np.count_nonzero(is_deleted))
+    return is_deleted
+
+
+def _lookup_sorted(sorted_values: np.ndarray, values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Return (positions, is_found) of values in the sorted array (positions are valid indices if it is non-empty)."""
+    if len(sorted_values) == 0:
+        return np.zeros(len(values), dtype=int), np.zeros(len(values), dtype=bool)
+    pos = np.minimum(np.searchsorted(sorted_values, values), len(sorted_values) - 1)
+    return pos, sorted_values[pos] == values
+
+
+def _parse_embeddings(data: dict) -> tuple[str, np.ndarray | None, np.ndarray | None]:
+    """Extract (model, img, txt) from the (json-decoded) contents of a metadata file, with row-normalized values."""
+    embeddings = data.get("embeddings") or dict()
+    img, txt = embeddings.get("img"), embeddings.get("txt")
+    if not img:
+        return "", None, None
+    model = EmbeddingModel(img["model"])
+    img_values = _normalize(parse_embedding_values(img["values"], model))
+    txt_values = _normalize(parse_embedding_values(txt["values"], model)) if txt and (txt["model"] == model) else None
+    return model.value, img_values, txt_values
+
+
+def _normalize(values: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(values)
+    return values / norm if norm > 0 else values
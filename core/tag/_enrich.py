@@ -0,0 +1,59 @@
+"""
+Lazy enrichment of images that were tagged in embeddings-only mode ('tag --mode embeddings-only'), i.e. for which only
+the image embedding (& EXIF info) was extracted.  The (slow) LLM extraction of description & tags and the text
+embedding are only computed for images that are actually needed, e.g. because they show up in search results or are
+explicitly requested, such that images that are never looked at never incur any LLM cost.
+"""
+
+import sys
+from pathlib import Path
+from typing import Iterable
+
+from tqdm import tqdm
+
+from core.data import ImageMetadata, ModelTier
+from core.models import ensure_model_exists, get_ollama_pool
+
+from ._metadata_table import read_metadata_table
+from ._read_all_metadata import get_metadata_path, read_metadata
+from ._tag_all_images import _map_concurrently
+from ._tag_image import enrich_image
+
+
+def enrich_images(image_paths: Iterable[Path], model: str) -> int:
+    """
+    Enrich the given images using the LLM (see enrich_image(...)), skipping images that are not tagged in
+    embeddings-only mode (i.e. that are not tagged at all or that are already enriched).  Images are enriched
+    concurrently if multiple Ollama endpoints are configured.
+
+    :param image_paths: Paths of the images to be enriched (possibly in different directories).
+    :param model: Name of the model to use.
+    :return: Number of images that were enriched.
+    """
+    pending: list[tuple[Path, ImageMetadata]] = []
+    for image_path in dict.fromkeys(image_paths):  # remove duplicates, preserving order
+        metadata = read_metadata(get_metadata_path(image_path))
+        if (metadata is not None) and (metadata.tier == ModelTier.EMBEDDINGS_ONLY):
+            pending.append((image_path, metadata))
+    if not pending:
+        return 0
+
+    ensure_model_exists(model)
+    for _ in tqdm(
+        _map_concurrently(
+            lambda item: enrich_image(item[0], get_metadata_path(item[0]), item[1], model),
+            pending,
+            max_workers=get_ollama_pool().concurrency,
+        ),
+        desc=f"Enriching {len(pending):_} image(s) using model '{model}'... ",
+        file=sys.stdout,
+        total=len(pending),
+    ):
+        pass
+    return len(pending)
+
+
+def select_images_to_enrich(image_directory: Path) -> list[Path]:
+    """Return all images in the directory that were tagged in embeddings-only mode & were not enriched yet."""
+    table = read_metadata_table(image_directory)
+    return [image_directory / filename for filename in table.filenames[table.tiers == ModelTier.EMBEDDINGS_ONLY.value]]
@@ -0,0 +1,91 @@
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from core.catalog import get_catalog
+from core.data import EmbeddingModel
+
+from ._clusters import connected_components
+from ._metadata_table import MetadataTable, read_metadata_table
+from .embeddings import compute_similar_pairs
+
+
+@dataclass
+class DuplicateCluster:
+    filenames: list[str]  # sorted
+    min_similarity: float  # lowest similarity of all pairs that caused images to end up in this cluster
+    max_similarity: float  # highest similarity of all pairs in this cluster
+
+
+def find_duplicates(
+    image_directory: Path, min_similarity: float, recursive: bool = False, block_size: int = 2048
+) -> list[DuplicateCluster]:
+    """
+    Find clusters of near-duplicate images, based on the cosine similarity of their image embeddings.  All pairs of
+    images are compared using a blocked matrix-matrix product, such that memory use remains bounded even for very
+    large collections.  Clusters are the connected components of the graph of all pairs with similarity
+    >= min_similarity, so two images can end up in the same cluster through a chain of near-duplicates.
+
+    :param image_directory: Path to the directory containing tagged images (or catalog root, if recursive).
+    :param min_similarity: Minimum cosine similarity for 2 images to be considered near-duplicates.
+    :param recursive: If True, treat image_directory as a catalog root & compare images across all its folders.
+    :param block_size: Number of images per block of the blocked all-pairs computation.
+    :return: List of DuplicateCluster objects, largest clusters first.
+    """
+
+    # --- collect image embeddings per model --------------
+    filenames_per_model: dict[EmbeddingModel, list[str]] = dict()
+    values_per_model: dict[EmbeddingModel, list[np.ndarray]] = dict()
+    for prefix, table in _read_tables(image_directory, recursive):
+        for model, column in table.img.items():
+            filenames_per_model.setdefault(model, []).extend(prefix + table.filenames[column.rows])
+            values_per_model.setdefault(model, []).append(column.values)
+
+    # --- find clusters -----------------------------------
+    # embeddings of different models are not comparable, so images are only compared within the same model
+    clusters = []
+    for model, filenames in filenames_per_model.items():
+        x = np.concatenate(values_per_model[model])
+        i, j, similarities = compute_similar_pairs(x, min_similarity, block_size)
+        clusters += _cluster_pairs(filenames, i, j, similarities)
+
+    return sorted(clusters, key=lambda cluster: (-len(cluster.filenames), cluster.filenames))
+
+
+# =================================================================================================
+#  Helpers
+# =================================================================================================
+def _read_tables(image_directory: Path, recursive: bool) -> list[tuple[str, MetadataTable]]:
+    """Returns (prefix, table)-tuples, with prefix+filename = filename relative to the catalog root if recursive."""
+    if not recursive:
+        return [("", read_metadata_table(image_directory))]
+    return [
+        ("" if shard == "." else f"{shard}/", read_metadata_table(image_directory / shard))
+        for shard in get_catalog(image_directory).shards
+    ]
+
+
+def _cluster_pairs(
+    filenames: list[str], i: np.ndarray, j: np.ndarray, similarities: np.ndarray
+) -> list[DuplicateCluster]:
+    """Group images into connected components, based on the given pairs."""
+    components = connected_components(len(filenames), i, j)
+
+    # min & max similarity per component
+    labels = np.zeros(len(filenames), dtype=np.int64)
+    for label, component in enumerate(components):
+        labels[component] = label
+    min_similarities = np.full(len(components), np.inf)
+    max_similarities = np.full(len(components), -np.inf)
+    np.minimum.at(min_similarities, labels[i], similarities)
+    np.maximum.at(max_similarities, labels[i], similarities)
+
+    return [
+        DuplicateCluster(
+            filenames=sorted(filenames[a] for a in component),
+            min_similarity=float(min_similarities[label]),
+            max_similarity=float(max_similarities[label]),
+        )
+        for label, component in enumerate(components)
+    ]
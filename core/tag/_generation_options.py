@@ -0,0 +1,43 @@
+from dataclasses import dataclass
+
+from core.config import LLM_MAX_TOKENS_DESCRIPTION, LLM_MAX_TOKENS_TAGS, LLM_STOP_AFTER_TAGS
+
+
+@dataclass(frozen=True)
+class GenerationOptions:
+    """
+    Settings of the (streamed) LLM requests used to extract search data from images.
+    """
+
+    max_tokens_description: int = (
+        LLM_MAX_TOKENS_DESCRIPTION  # token budget (num_predict) of descriptions;  0 = unbounded
+    )
+    max_tokens_tags: int = LLM_MAX_TOKENS_TAGS  # token budget (num_predict) of tags;  0 = unbounded
+    stop_after_tags: int = LLM_STOP_AFTER_TAGS  # stop generating once this many distinct tags were received;  0 = never
+    context_size: int | None = None  # context window size (num_ctx);  None = model default
+
+    def ollama_options(self, max_tokens: int) -> dict:
+        """Options of an Ollama request with the given token budget."""
+        options = dict(num_predict=max_tokens if max_tokens > 0 else -1)
+        if self.context_size:
+            options["num_ctx"] = self.context_size
+        return options
+
+    def __str__(self) -> str:
+        return (
+            f"max_tokens_description={self.max_tokens_description or 'unbounded'}, "
+            + f"max_tokens_tags={self.max_tokens_tags or 'unbounded'}, stop_after_tags={self.stop_after_tags or 'never'}, "
+            + f"context_size={self.context_size or 'default'}"
+        )
+
+
+_active_options = GenerationOptions()
+
+
+def get_generation_options() -> GenerationOptions:
+    return _active_options
+
+
+def set_generation_options(options: GenerationOptions):
+    global _active_options
+    _active_options = options
@@ -0,0 +1,211 @@
+"""
+Persistent spatial index of the location each image in a directory was taken, such that geo filters (radius and/or
+bounding box) can be evaluated without reading the metadata of any image.  Images are grouped in latitude bands of
+_BAND_DEG degrees and sorted by longitude within each band, such that candidates are found with binary search in only
+the bands overlapping the query, after which the exact (great-circle) distances are computed for the candidates only.
+See _metadata_index for how the index is stored & kept up to date, and _time_index for when it is updated.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from core.data import GeoFilter
+
+from ._metadata_index import (
+    get_metadata_mtime_ns,
+    index_lock,
+    load_index_arrays,
+    save_index_arrays,
+    update_index_entries,
+)
+
+EARTH_RADIUS_KM = 6371.0088  # mean earth radius
+
+_GEO_INDEX_FILENAME = "geo_index.npz"
+_GEO_INDEX_LOCK_FILENAME = "geo_index.lock"
+_BAND_DEG = 1.0  # height of latitude bands (~111 km)
+_NO_BAND = np.iinfo(np.int16).max  # band of images without location (sorted last)
+
+
+# =================================================================================================
+#  Geo index
+# =================================================================================================
+@dataclass
+class GeoIndex:
+    filenames: np.ndarray  # (n,) str;  image filenames, sorted by (band, lon)
+    bands: np.ndarray  # (n,) int16;  latitude band of each image, _NO_BAND if no location info
+    lat: np.ndarray  # (n,) float64;  NaN if no location info
+    lon: np.ndarray  # (n,) float64;  NaN if no location info
+    metadata_stats: np.ndarray  # (n, 2) int64;  (size, mtime_ns) of the metadata file, to detect changes
+    metadata_mtime_ns: int = -1  # mtime of the metadata folder right before the last update listed it
+
+    def select(self, geo_filter: GeoFilter) -> list[str]:
+        """Return filenames of all images matching the filter, nearest first if a radius is given."""
+        return self.filenames[self.select_rows(geo_filter)].tolist()
+
+    def select_rows(self, geo_filter: GeoFilter) -> np.ndarray:
+        """Return indices of all images matching the filter, nearest first if a radius is given."""
+
+        # --- candidates: binary search per latitude band -
+        (min_lat, max_lat), lon_ranges = _get_search_ranges(geo_filter)
+        candidates = []
+        for band in range(_get_band(min_lat), _get_band(max_lat) + 1):
+            i_band_start, i_band_end = np.searchsorted(self.bands, [band, band + 1])
+            band_lon = self.lon[i_band_start:i_band_end]
+            for min_lon, max_lon in lon_ranges:
+                i_start = np.searchsorted(band_lon, min_lon, side="left")
+                i_end = np.searchsorted(band_lon, max_lon, side="right")
+                candidates.append(np.arange(i_band_start + i_start, i_band_start + i_end))
+        rows = np.unique(np.concatenate(candidates)) if candidates else np.zeros(0, dtype=np.int64)
+
+        # --- exact checks on candidates ------------------
+        lat, lon = self.lat[rows], self.lon[rows]
+        is_match = (lat >= min_lat) & (lat <= max_lat)
+        if geo_filter.bbox is not None:
+            is_match &= _is_in_lon_range(lon, geo_filter.bbox[1], geo_filter.bbox[3])
+        if geo_filter.center is None:
+            return rows[is_match]
+
+        distances = haversine_km(geo_filter.center[0], geo_filter.center[1], lat, lon)
+        is_match &= distances <= geo_filter.radius_km
+        rows, distances = rows[is_match], distances[is_match]
+        return rows[np.argsort(distances, kind="stable")]
+
+
+def get_geo_index(image_directory: Path) -> GeoIndex:
+    """Return the geo index of the directory, updating (& persisting) it first if any metadata changed."""
+    index = _load_geo_index(image_directory)
+    if index.metadata_mtime_ns == get_metadata_mtime_ns(image_directory):
+        return index  # up to date, without listing the metadata folder
+
+    with index_lock(image_directory, _GEO_INDEX_LOCK_FILENAME):
+        index = _load_geo_index(image_directory)
+        metadata_mtime_ns = get_metadata_mtime_ns(image_directory)  # before listing, such that later changes count
+        if index.metadata_mtime_ns == metadata_mtime_ns:
+            return index  # updated concurrently
+
+        entries = update_index_entries(
+            image_directory,
+            indexed_filenames=index.filenames.tolist(),
+            indexed_stats=index.metadata_stats,
+            indexed_values=list(zip(index.lat.tolist(), index.lon.tolist())),
+            parse_values=_parse_lat_lon,
+        )
+        if entries is None:
+            index.metadata_mtime_ns = metadata_mtime_ns  # e.g. only temporary files were added & removed
+        else:
+            lat = np.array([values[0] if values else np.nan for _, values, _ in entries], dtype=np.float64)
+            lon = np.array([values[1] if values else np.nan for _, values, _ in entries], dtype=np.float64)
+            bands = np.where(np.isnan(lat) | np.isnan(lon), _NO_BAND, np.floor(np.nan_to_num(lat) / _BAND_DEG)).astype(
+                np.int16
+            )
+            order = np.lexsort((lon, bands))
+            index = GeoIndex(
+                filenames=np.array([entries[i][0] for i in order], dtype=str),
+                bands=bands[order],
+                lat=lat[order],
+                lon=lon[order],
+                metadata_stats=np.array([entries[i][2] for i in order], dtype=np.int64).reshape(-1, 2),
+                metadata_mtime_ns=metadata_mtime_ns,
+            )
+        save_index_arrays(
+            image_directory,
+            _GEO_INDEX_FILENAME,
+            filenames=index.filenames,
+            bands=index.bands,
+            lat=index.lat,
+            lon=index.lon,
+            metadata_stats=index.metadata_stats,
+            metadata_mtime_ns=np.array(index.metadata_mtime_ns, dtype=np.int64),
+        )
+        return index
+
+
+def haversine_km(lat1: float, lon1: float, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """Great-circle distance in km between (lat1, lon1) and each of the (lat2, lon2) points (all in degrees)."""
+    lat1, lon1, lat2, lon2 = np.radians(lat1), np.radians(lon1), np.radians(lat2), np.radians(lon2)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+# =================================================================================================
+#  Helpers
+# =================================================================================================
+def _get_band(lat: float) -> int:
+    return int(math.floor(lat / _BAND_DEG))
+
+
+def _get_search_ranges(geo_filter: GeoFilter) -> tuple[tuple[float, float], list[tuple[float, float]]]:
+    """
+    Returns ((min_lat, max_lat), [(min_lon, max_lon), ...]) such that all matching images are guaranteed to fall
+    inside the latitude range and at least 1 of the (non-wrapping) longitude ranges.
+    """
+    min_lat, max_lat, lon_ranges = -90.0, 90.0, [(-180.0, 180.0)]
+
+    if geo_filter.center is not None:
+        # bounding box of a circle on a sphere, see http://janmatuschek.de/LatitudeLongitudeBoundingCoordinates
+        center_lat, center_lon = geo_filter.center
+        angle = geo_filter.radius_km / EARTH_RADIUS_KM
+        min_lat, max_lat = center_lat - math.degrees(angle), center_lat + math.degrees(angle)
+        if (min_lat > -90.0) and (max_lat < 90.0):
+            delta_lon = math.degrees(math.asin(min(1.0, math.sin(angle) / math.cos(math.radians(center_lat)))))
+            lon_ranges = _split_lon_range(center_lon - delta_lon, center_lon + delta_lon)
+        min_lat, max_lat = max(min_lat, -90.0), min(max_lat, 90.0)  # pole inside circle -> all longitudes
+
+    if geo_filter.bbox is not None:
+        bbox_min_lat, bbox_min_lon, bbox_max_lat, bbox_max_lon = geo_filter.bbox
+        min_lat, max_lat = max(min_lat, bbox_min_lat), min(max_lat, bbox_max_lat)
+        if geo_filter.center is None:
+            lon_ranges = _split_lon_range(bbox_min_lon, bbox_max_lon + (360.0 if bbox_min_lon > bbox_max_lon else 0.0))
+
+    return (min_lat, max_lat), lon_ranges
+
+
+def _split_lon_range(min_lon: float, max_lon: float) -> list[tuple[float, float]]:
+    """Split longitude range [min_lon, max_lon] (possibly exceeding [-180, 180]) into non-wrapping ranges."""
+    if max_lon - min_lon >= 360.0:
+        return [(-180.0, 180.0)]
+    elif min_lon < -180.0:
+        return [(min_lon + 360.0, 180.0), (-180.0, max_lon)]
+    elif max_lon > 180.0:
+        return [(min_lon, 180.0), (-180.0, max_lon - 360.0)]
+    else:
+        return [(min_lon, max_lon)]
+
+
+def _is_in_lon_range(lon: np.ndarray, min_lon: float, max_lon: float) -> np.ndarray:
+    if min_lon <= max_lon:
+        return (lon >= min_lon) & (lon <= max_lon)
+    else:
+        return (lon >= min_lon) | (lon <= max_lon)  # crosses antimeridian
+
+
+def _parse_lat_lon(data: dict) -> tuple[float, float] | None:
+    location_data = data["search_data"].get("location") or dict()
+    lat, lon = location_data.get("lat"), location_data.get("lon")
+    return (float(lat), float(lon)) if (lat is not None) and (lon is not None) else None
+
+
+def _load_geo_index(image_directory: Path) -> GeoIndex:
+    data = load_index_arrays(image_directory, _GEO_INDEX_FILENAME)
+    if data is None:
+        return GeoIndex(
+            filenames=np.zeros(0, dtype=str),
+            bands=np.zeros(0, dtype=np.int16),
+            lat=np.zeros(0, dtype=np.float64),
+            lon=np.zeros(0, dtype=np.float64),
+            metadata_stats=np.zeros((0, 2), dtype=np.int64),
+        )
+    return GeoIndex(
+        filenames=data["filenames"],
+        bands=data["bands"],
+        lat=data["lat"],
+        lon=data["lon"],
+        metadata_stats=data["metadata_stats"],
+        metadata_mtime_ns=int(data["metadata_mtime_ns"]) if "metadata_mtime_ns" in data else -1,
+    )
@@ -0,0 +1,82 @@
+"""
+Minimal ctypes-based wrapper around Linux' inotify API, so we can get notified of new/changed files without polling
+and without requiring any additional dependencies.  On other platforms, InotifyWatcher.is_supported() returns False.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+from pathlib import Path
+
+# see 'man inotify'
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_ISDIR = 0x40000000
+IN_Q_OVERFLOW = 0x00004000
+
+_EVENT_STRUCT = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class InotifyWatcher:
+    """Watches a set of directories (non-recursively) for files that were written or moved into them."""
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._directories: dict[int, Path] = dict()  # watch descriptor -> directory
+
+    @staticmethod
+    def is_supported() -> bool:
+        return sys.platform.startswith("linux") and (ctypes.util.find_library("c") is not None)
+
+    def add_watch(self, directory: Path):
+        # IN_CREATE is needed for new sub-folders only:  a file being copied slowly triggers IN_CREATE long before it
+        # is complete, so for files we wait for IN_CLOSE_WRITE instead (see read_events).
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        wd = self._libc.inotify_add_watch(self._fd, str(directory).encode(), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+        self._directories[wd] = directory
+
+    def read_events(self, timeout: float | None) -> list[tuple[Path, str, bool]] | None:
+        """
+        Wait at most timeout seconds for events.
+        :return: list of (directory, name, is_dir)-tuples, or None if the kernel event queue overflowed, in which case
+                   the caller should assume everything might have changed.
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+
+        return _parse_events(os.read(self._fd, 64 * 1024), self._directories)
+
+    def close(self):
+        os.close(self._fd)
+
+
+# =================================================================================================
+#  Helpers
+# =================================================================================================
+def _parse_events(buffer: bytes, directories: dict[int, Path]) -> list[tuple[Path, str, bool]] | None:
+    """Parse a buffer of raw inotify events into (directory, name, is_dir)-tuples, see read_events."""
+    events = []
+    offset = 0
+    while offset < len(buffer):
+        wd, mask, _, name_len = _EVENT_STRUCT.unpack_from(buffer, offset)
+        offset += _EVENT_STRUCT.size
+        name = buffer[offset : offset + name_len].rstrip(b"\0").decode(errors="surrogateescape")
+        offset += name_len
+        if mask & IN_Q_OVERFLOW:
+            return None
+        is_dir = bool(mask & IN_ISDIR)
+        if (mask & IN_CREATE) and not is_dir:
+            continue  # files are only reported once fully written (IN_CLOSE_WRITE) or moved in (IN_MOVED_TO)
+        if wd in directories and name:
+            events.append((directories[wd], name, is_dir))
+    return events
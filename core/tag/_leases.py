@@ -0,0 +1,142 @@
+"""
+Lease files, such that multiple tagging processes (possibly on different machines sharing a network file system) can
+cooperatively tag the same directory, with each image being tagged by only 1 of them.  A worker claims an image by
+atomically creating a lease file for it (by hard-linking a temporary file holding its worker id, which fails if the
+lease exists, like O_CREAT | O_EXCL, but never exposes an empty lease file), keeps its leases alive by periodically
+refreshing their modification time (heartbeat) and removes them when done.  Leases of crashed workers are no longer
+refreshed & are reclaimed by other workers once they expire.
+
+NOTE: expiry is based on comparing file modification times with the local clock, so LEASE_EXPIRY_SEC should be well
+      above the clock skew between machines (& the heartbeat interval).
+"""
+
+import os
+import socket
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from core.config import LEASE_EXPIRY_SEC, LEASE_HEARTBEAT_SEC
+
+LEASES_DIRNAME = "_leases"
+
+
+class LeaseManager:
+    """Claims images of 1 directory for exclusive tagging by this worker.  Use as context manager."""
+
+    def __init__(
+        self, image_directory: Path, expiry_sec: float = LEASE_EXPIRY_SEC, heartbeat_sec: float = LEASE_HEARTBEAT_SEC
+    ):
+        self.lease_directory = image_directory / "metadata" / LEASES_DIRNAME
+        self.expiry_sec = expiry_sec
+        self.heartbeat_sec = heartbeat_sec
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.n_reclaimed = 0  # number of expired leases of other workers that were reclaimed
+
+        self._held: set[str] = set()  # filenames of images we hold a lease for
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat_thread = threading.Thread(target=self._heartbeat, daemon=True)
+
+    def __enter__(self) -> "LeaseManager":
+        self.lease_directory.mkdir(parents=True, exist_ok=True)
+        self._heartbeat_thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._stop.set()
+        self._heartbeat_thread.join()
+        with self._lock:
+            held = list(self._held)
+        for filename in held:
+            self._release(filename)
+
+    # -------------------------------------------------------------------------
+    #  Claiming
+    # -------------------------------------------------------------------------
+    def try_acquire(self, image_path: Path) -> bool:
+        """Try to claim the image;  returns False if it is claimed by another (live) worker."""
+        filename = image_path.name
+        lease_path = self._lease_path(filename)
+        tmp_path = lease_path.with_name(f"{lease_path.name}.{self._unique_id()}.tmp")
+        tmp_path.write_text(self.worker_id)
+        try:
+            for _ in range(2):  # 2nd attempt only after reclaiming an expired lease
+                try:
+                    os.link(tmp_path, lease_path)  # atomic & fails if the lease exists
+                except FileExistsError:
+                    if self._try_reclaim(lease_path):
+                        continue
+                    return False
+                with self._lock:
+                    self._held.add(filename)
+                return True
+            return False
+        finally:
+            tmp_path.unlink()
+
+    def is_held(self, image_path: Path) -> bool:
+        """Returns True if we still hold the lease (i.e. it was not reclaimed by another worker after expiring)."""
+        try:
+            return self._lease_path(image_path.name).read_text() == self.worker_id
+        except FileNotFoundError:
+            return False
+
+    def release(self, image_path: Path):
+        self._release(image_path.name)
+
+    # -------------------------------------------------------------------------
+    #  Helpers
+    # -------------------------------------------------------------------------
+    def _lease_path(self, filename: str) -> Path:
+        return self.lease_directory / f"{filename}.lease"
+
+    def _unique_id(self) -> str:
+        """Id of this worker & thread, usable in filenames."""
+        return f"{self.worker_id.replace(':', '_')}_{threading.get_ident()}"
+
+    def _release(self, filename: str):
+        with self._lock:
+            self._held.discard(filename)
+        lease_path = self._lease_path(filename)
+        try:
+            if lease_path.read_text() == self.worker_id:  # don't remove leases that were reclaimed by others
+                lease_path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _try_reclaim(self, lease_path: Path) -> bool:
+        """
+        Remove the lease if it expired & return True if a new attempt to acquire it makes sense.  The lease is first
+        renamed to a name unique to this worker (which succeeds for only 1 worker) and only removed if the renamed lease
+        is still expired, i.e. if it was not re-created by a concurrently reclaiming worker in the meantime.
+        """
+        try:
+            if time.time() - lease_path.stat().st_mtime < self.expiry_sec:
+                return False
+            reclaimed_path = lease_path.with_name(f"{lease_path.name}.{self._unique_id()}.reclaimed")
+            os.rename(lease_path, reclaimed_path)
+            if time.time() - reclaimed_path.stat().st_mtime < self.expiry_sec:
+                try:
+                    os.link(reclaimed_path, lease_path)  # fresh lease of another worker -> put it back
+                except FileExistsError:
+                    pass
+                reclaimed_path.unlink()
+                return False
+            reclaimed_path.unlink()
+            self.n_reclaimed += 1
+        except FileNotFoundError:
+            pass  # released or reclaimed concurrently -> simply try again
+        return True
+
+    def _heartbeat(self):
+        """Keep all held leases alive, until stopped."""
+        while not self._stop.wait(self.heartbeat_sec):
+            with self._lock:
+                held = list(self._held)
+            for filename in held:
+                try:
+                    os.utime(self._lease_path(filename))
+                except FileNotFoundError:
+                    pass  # released concurrently (or reclaimed, which is detected by is_held)
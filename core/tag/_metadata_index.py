@@ -0,0 +1,134 @@
+"""
+Shared functionality of persistent indexes over the metadata of a directory (time index, geo index, ...).  Indexes are
+stored in the metadata/_index subfolder and are brought up to date incrementally, by only re-reading metadata files
+whose size or modification time changed since the index was last saved.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # not available on Windows -> only threads within this process are synchronized
+
+INDEX_DIRNAME = "_index"
+
+
+def get_index_directory(image_directory: Path) -> Path:
+    """Folder with persistent indexes of a directory (excluded from metadata/*.json by construction)."""
+    return image_directory / "metadata" / INDEX_DIRNAME
+
+
+def update_index_entries(
+    image_directory: Path,
+    indexed_filenames: list[str],
+    indexed_stats: np.ndarray,
+    indexed_values: list[tuple],
+    parse_values: Callable[[dict], tuple],
+) -> list[tuple[str, tuple, tuple[int, int]]] | None:
+    """
+    Compare an index with the current metadata files of a directory and, if anything changed, return up-to-date
+    (filename, values, stats)-tuples for all metadata files, only re-reading the files that changed.
+
+    :param image_directory: The directory containing the images (& metadata subfolder).
+    :param indexed_filenames: Image filenames currently in the index.
+    :param indexed_stats: (n, 2)-array with (size, mtime_ns) of the metadata files, as currently in the index.
+    :param indexed_values: Indexed values per image, as currently in the index.
+    :param parse_values: Function extracting the values to be indexed from the (json-decoded) metadata of an image.
+                           Should raise an exception on invalid metadata.
+    :return: None if the index is up-to-date, list of (filename, values, stats)-tuples otherwise.
+    """
+    indexed = {
+        filename: (stats, values)
+        for filename, stats, values in zip(indexed_filenames, map(tuple, indexed_stats.tolist()), indexed_values)
+    }
+    current_stats = _scan_metadata_files(image_directory)
+    if {filename: stats for filename, (stats, _) in indexed.items()} == current_stats:
+        return None
+
+    entries = []
+    for filename, stats in current_stats.items():
+        if (filename in indexed) and (indexed[filename][0] == stats):
+            entries.append((filename, indexed[filename][1], stats))
+        else:
+            metadata_path = image_directory / "metadata" / f"{filename}.json"
+            try:
+                entries.append((filename, parse_values(json.loads(metadata_path.read_text())), stats))
+            except Exception as e:
+                print(f"Error reading metadata for {metadata_path}: {e}")
+                entries.append((filename, None, stats))  # invalid -> indexed as missing, re-read once it changes
+    return entries
+
+
+def load_index_arrays(image_directory: Path, index_filename: str) -> dict[str, np.ndarray] | None:
+    """Load all arrays of a persisted index, or None if it does not exist (or cannot be read)."""
+    try:
+        with np.load(get_index_directory(image_directory) / index_filename, allow_pickle=False) as data:
+            return {key: data[key] for key in data.files}
+    except Exception:
+        return None
+
+
+def save_index_arrays(image_directory: Path, index_filename: str, **arrays: np.ndarray):
+    """Save atomically, such that concurrent readers never see a partially written index."""
+    index_directory = get_index_directory(image_directory)
+    index_directory.mkdir(parents=True, exist_ok=True)
+    tmp_path = index_directory / f"{index_filename}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, index_directory / index_filename)
+
+
+@contextmanager
+def index_lock(image_directory: Path, lock_filename: str) -> Iterator[None]:
+    """Lock on an index of a directory, shared by all threads & processes updating it."""
+    with _thread_locks_lock:
+        thread_lock = _thread_locks.setdefault((image_directory.resolve(), lock_filename), threading.Lock())
+    with thread_lock:
+        index_directory = get_index_directory(image_directory)
+        index_directory.mkdir(parents=True, exist_ok=True)
+        with open(index_directory / lock_filename, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)  # released when the file is closed
+            yield
+
+
+_thread_locks: dict[tuple[Path, str], threading.Lock] = dict()
+_thread_locks_lock = threading.Lock()
+
+
+def get_metadata_mtime_ns(image_directory: Path) -> int:
+    """
+    Modification time of the metadata folder, which changes whenever a metadata file is written (atomically, i.e. by
+    renaming a temporary file) or removed, but not when writing the index folder below it.
+    """
+    try:
+        return os.stat(image_directory / "metadata").st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+# =================================================================================================
+#  Helpers
+# =================================================================================================
+def _scan_metadata_files(image_directory: Path) -> dict[str, tuple[int, int]]:
+    """Returns dict mapping image filename -> (size, mtime_ns) of its metadata file."""
+    stats = dict()
+    try:
+        with os.scandir(image_directory / "metadata") as entries:
+            for entry in entries:
+                if entry.name.endswith(".json") and entry.is_file():
+                    stat = entry.stat()
+                    stats[entry.name.removesuffix(".json")] = (stat.st_size, stat.st_mtime_ns)
+    except FileNotFoundError:
+        pass
+    return stats
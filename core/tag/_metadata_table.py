@@ -0,0 +1,208 @@
+"""
+Compact, columnar in-memory representation of the metadata of all images in a directory, for use by search & stats
+commands.  Instead of a tree of pydantic objects per image (with embeddings as lists of boxed Python floats), each
+field is stored as 1 array over all images, with embeddings as contiguous float32 matrices.  Full ImageMetadata
+objects can still be materialized on demand, for individual images.
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from core.data import EmbeddingModel, GeoFilter, ImageMetadata, LocationInfo, TimeFilter, TimeInfo
+
+from ._geo_index import get_geo_index
+from ._read_all_metadata import get_metadata_path, read_metadata
+from ._time_index import get_time_index
+
+
+# =================================================================================================
+#  Data classes
+# =================================================================================================
+@dataclass
+class EmbeddingColumn:
+    """Embeddings of a subset of the images of a table, all of the same model."""
+
+    rows: np.ndarray  # (m,)-array with indices of the images (in the table) the rows of 'values' correspond to
+    values: np.ndarray  # (m, d)-matrix with float32 embeddings, as stored (i.e. not necessarily normalized)
+
+
+@dataclass
+class MetadataTable:
+    """Metadata of n images, stored column-wise.  Missing values are NaN (floats) or NaT (timestamps)."""
+
+    directory: Path
+    filenames: np.ndarray  # (n,) str
+    models: np.ndarray  # (n,) str;  multi-modal LLM used to extract search data
+    tiers: np.ndarray  # (n,) str;  ModelTier value that produced the search data, "" if none
+    t_extract: np.ndarray  # (n,) float64;  seconds
+    descriptions: np.ndarray  # (n,) str
+    tag_offsets: np.ndarray  # (n+1,) int64;  tags of image i are tag_values[tag_offsets[i]:tag_offsets[i+1]]
+    tag_values: np.ndarray  # (n_tags,) str
+    time_location_texts: np.ndarray  # (n,) str;  searchable text of time & location info, see text_search_strings
+    timestamps: np.ndarray  # (n,) datetime64[s]
+    lat: np.ndarray  # (n,) float64
+    lon: np.ndarray  # (n,) float64
+    img: dict[EmbeddingModel, EmbeddingColumn]
+    txt: dict[EmbeddingModel, EmbeddingColumn]
+
+    def __len__(self) -> int:
+        return len(self.filenames)
+
+    def tags(self, i: int) -> list[str]:
+        return self.tag_values[self.tag_offsets[i] : self.tag_offsets[i + 1]].tolist()
+
+    def text_search_strings(self, use_time_location_data: bool) -> list[str]:
+        """
+        Lower-case string per image of all info that is to be text-searched, identical to
+        SearchData.text_search_string(), optionally ignoring time & location info.
+        """
+        return [
+            (
+                f"{self.descriptions[i]} {' '.join(self.tags(i))}"
+                + (self.time_location_texts[i] if use_time_location_data else "")
+            ).lower()
+            for i in range(len(self))
+        ]
+
+    def get_metadata(self, i: int) -> ImageMetadata | None:
+        """Materialize full ImageMetadata object of the i-th image (read again from disk)."""
+        return read_metadata(get_metadata_path(self.directory / self.filenames[i]))
+
+
+# =================================================================================================
+#  Reading
+# =================================================================================================
+def read_metadata_table(
+    image_directory: Path, time_filter: TimeFilter | None = None, geo_filter: GeoFilter | None = None
+) -> MetadataTable:
+    """
+    Reads all metadata files in the specified directory into a MetadataTable, without constructing pydantic objects
+    for the (bulky) embeddings.  Invalid files are reported & skipped, as in read_all_metadata(...).
+
+    :param image_directory: The directory containing the images (& metadata subfolder).
+    :param time_filter: (optional) If provided, only metadata of images matching the filter is read, as determined
+                          using the time index of the directory, i.e. without reading any other metadata files.
+    :param geo_filter: (optional) If provided, only metadata of images matching the filter is read, as determined
+                         using the geo index of the directory.
+    """
+    filenames = select_filenames(image_directory, time_filter, geo_filter)
+    if filenames is not None:
+        files = [get_metadata_path(image_directory / filename) for filename in filenames]
+    else:
+        files = (image_directory / "metadata").glob("*.json")
+
+    rows = []
+    for file in files:
+        try:
+            rows.append(_parse_row(json.loads(file.read_text())))
+        except Exception as e:
+            print(f"Error reading metadata for {file}: {e}")
+
+    # --- embeddings --------------------------------------
+    img_rows, img_values = dict(), dict()
+    txt_rows, txt_values = dict(), dict()
+    for i, row in enumerate(rows):
+        for (model, values), column_rows, column_values in [
+            (row["img"], img_rows, img_values),
+            (row["txt"], txt_rows, txt_values),
+        ]:
+            if model is not None:
+                column_rows.setdefault(model, []).append(i)
+                column_values.setdefault(model, []).append(values)
+
+    # --- construct table ---------------------------------
+    tag_counts = [len(row["tags"]) for row in rows]
+    return MetadataTable(
+        directory=image_directory,
+        filenames=np.array([row["filename"] for row in rows], dtype=object),
+        models=np.array([row["model"] for row in rows], dtype=object),
+        tiers=np.array([row["tier"] for row in rows], dtype=object),
+        t_extract=np.array([row["t_extract"] for row in rows], dtype=np.float64),
+        descriptions=np.array([row["description"] for row in rows], dtype=object),
+        tag_offsets=np.concatenate([[0], np.cumsum(tag_counts, dtype=np.int64)]).astype(np.int64),
+        tag_values=np.array([tag for row in rows for tag in row["tags"]], dtype=object),
+        time_location_texts=np.array([row["time_location_text"] for row in rows], dtype=object),
+        timestamps=np.array([row["timestamp"] for row in rows], dtype="datetime64[s]"),
+        lat=np.array([row["lat"] for row in rows], dtype=np.float64),
+        lon=np.array([row["lon"] for row in rows], dtype=np.float64),
+        img={model: _to_column(img_rows[model], img_values[model]) for model in img_rows},
+        txt={model: _to_column(txt_rows[model], txt_values[model]) for model in txt_rows},
+    )
+
+
+def select_filenames(
+    image_directory: Path, time_filter: TimeFilter | None, geo_filter: GeoFilter | None
+) -> list[str] | None:
+    """Filenames of images matching all active filters (using the persistent indexes), None if no filter is active."""
+    selections = []
+    if (time_filter is not None) and time_filter.is_active:
+        selections.append(get_time_index(image_directory).select(time_filter))
+    if (geo_filter is not None) and geo_filter.is_active:
+        selections.append(get_geo_index(image_directory).select(geo_filter))
+    if not selections:
+        return None
+    other_selections = [set(selection) for selection in selections[1:]]
+    return [filename for filename in selections[0] if all(filename in other for other in other_selections)]
+
+
+def _parse_row(data: dict) -> dict:
+    """Extract all fields of a MetadataTable from the (json-decoded) contents of a metadata file."""
+    search_data = data["search_data"]
+
+    # time & location (small, so parsed with pydantic, to reuse their text_search_string logic)
+    time_info = TimeInfo.model_validate(search_data["time"]) if search_data.get("time") else None
+    location_info = LocationInfo.model_validate(search_data["location"]) if search_data.get("location") else None
+    time_location_text = ""
+    if time_info:
+        time_location_text += f" {time_info.text_search_string()}"
+    if location_info:
+        time_location_text += f" {location_info.text_search_string()}"
+
+    # embeddings
+    embeddings = data.get("embeddings") or dict()
+    img, txt = embeddings.get("img"), embeddings.get("txt")
+
+    return dict(
+        filename=data["filename"],
+        model=data["model"],
+        tier=data.get("tier") or "",
+        t_extract=float(data["t_extract"]),
+        description=search_data.get("description", ""),
+        tags=search_data.get("tags", []),
+        time_location_text=time_location_text,
+        timestamp=np.datetime64(time_info.dt.replace(tzinfo=None), "s") if time_info else np.datetime64("NaT"),
+        lat=location_info.lat if location_info and (location_info.lat is not None) else np.nan,
+        lon=location_info.lon if location_info and (location_info.lon is not None) else np.nan,
+        img=_parse_embedding(img),
+        txt=_parse_embedding(txt),
+    )
+
+
+def parse_embedding_values(values: str | list[float], model: EmbeddingModel) -> np.ndarray:
+    """
+    Convert the stored values of an embedding (a list, or the compact comma-separated serialization, see Embedding)
+    into a float32 array, raising a ValueError on any invalid value or if the number of values does not match the
+    embedding size of the model, instead of silently truncating.
+    """
+    if isinstance(values, str):
+        values = values.split(",")
+    values = np.array(values, dtype=np.float32)
+    if values.shape != (model.embedding_size,):
+        raise ValueError(f"Embedding has {values.size} values instead of {model.embedding_size} for model {model}.")
+    return values
+
+
+def _parse_embedding(embedding: dict | None) -> tuple[EmbeddingModel | None, np.ndarray | None]:
+    if not embedding:
+        return None, None
+    model = EmbeddingModel(embedding["model"])
+    return model, parse_embedding_values(embedding["values"], model)
+
+
+def _to_column(rows: list[int], values: list[np.ndarray]) -> EmbeddingColumn:
+    return EmbeddingColumn(rows=np.array(rows, dtype=np.int64), values=np.stack(values))
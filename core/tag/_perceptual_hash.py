@@ -0,0 +1,61 @@
+"""
+Perceptual hashing (dHash) of images, used to detect near-identical images (burst shots, edited copies, ...) before
+tagging, such that the expensive LLM extraction only needs to run once per group of near-identical images.
+"""
+
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from ._clusters import connected_components
+
+_HASH_SIZE = 8  # hashes have _HASH_SIZE**2 = 64 bits
+
+
+def compute_dhash(image_path: Path) -> int | None:
+    """
+    Compute the 64-bit difference hash of an image: the image is reduced to a 9x8 grayscale thumbnail and each bit
+    indicates whether a pixel is brighter than its right neighbour.  Returns None if the image cannot be read.
+    """
+    try:
+        with Image.open(image_path) as image:
+            image.draft("L", (8 * _HASH_SIZE, 8 * _HASH_SIZE))  # let JPEG decoder downscale while decoding (fast)
+            pixels = np.asarray(
+                image.convert("L").resize((_HASH_SIZE + 1, _HASH_SIZE), Image.Resampling.BILINEAR), dtype=np.int16
+            )
+    except Exception as e:
+        print(f"Could not compute perceptual hash of '{image_path}': {e}")
+        return None
+
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def group_near_identical_images(images: list[Path], max_distance: int) -> list[list[Path]]:
+    """
+    Group images whose perceptual hashes differ in at most max_distance bits (directly, or through a chain of
+    near-identical images).  Images that could not be hashed end up in a group of their own.
+
+    :param images: List of image paths.
+    :param max_distance: Maximum hamming distance (out of 64 bits) between hashes of near-identical images.
+    :return: List of groups (each a sorted list of image paths), covering all images.
+    """
+    hashes = [compute_dhash(image) for image in images]
+    hashed = [k for k, h in enumerate(hashes) if h is not None]
+    values = np.array([hashes[k] for k in hashed], dtype=np.uint64)
+
+    # all pairs with hamming distance <= max_distance (i < j), 1 row of the distance matrix at a time
+    all_i, all_j = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+    for i in range(len(values) - 1):
+        distances = np.bitwise_count(values[i + 1 :] ^ values[i])
+        j = np.flatnonzero(distances <= max_distance) + i + 1
+        all_i.append(np.full(len(j), i, dtype=np.int64))
+        all_j.append(j)
+    components = connected_components(len(values), np.concatenate(all_i), np.concatenate(all_j))
+
+    # map back to images
+    grouped = {hashed[k] for component in components for k in component}
+    groups = [[images[hashed[k]] for k in component] for component in components]
+    groups += [[image] for k, image in enumerate(images) if k not in grouped]
+    return sorted((sorted(group) for group in groups), key=lambda group: group[0])
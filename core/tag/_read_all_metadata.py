@@ -28,6 +28,11 @@ def read_all_metadata(image_directory: Path) -> list[ImageMetadata]:
     return metadata_list
 
 
+def get_metadata_path(image_path: Path) -> Path:
+    """Return the path of the metadata file corresponding to the given image file."""
+    return image_path.parent / "metadata" / f"{image_path.name}.json"
+
+
 def read_metadata(metadata_path: Path) -> ImageMetadata | None:
     """
     Load image metadata from a JSON file.
@@ -0,0 +1,181 @@
+"""
+Scheduling of (long) tagging runs: in which order pending images are tagged (TagOrder) & when to stop starting new
+ones (deadline), such that runs with a limited time budget (e.g. nightly maintenance windows) always make the most
+valuable progress first.  Since tagged images are skipped by the next run, each run continues where the previous one
+stopped.  The state needed to order pending images (EXIF dates, random seed) is checkpointed in the metadata/_index
+folder, such that it does not need to be recomputed by every run.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import fnmatch
+import hashlib
+import os
+import secrets
+import sys
+import time
+from dataclasses import dataclass
+from enum import StrEnum
+from pathlib import Path
+from typing import Iterable, Iterator, TypeVar
+
+import numpy as np
+from tqdm import tqdm
+
+from ._metadata_index import load_index_arrays, save_index_arrays
+from .exif import read_exif_concurrently
+
+T = TypeVar("T")
+
+_SCHEDULE_CHECKPOINT_FILENAME = "schedule.npz"
+
+
+# =================================================================================================
+#  Schedule
+# =================================================================================================
+class TagOrder(StrEnum):
+    DIRECTORY = "directory"  # directory order;  pending images are streamed, so tagging starts right away
+    NEWEST = "newest"  # newest EXIF date first, images without date last
+    RANDOM = "random"  # random order (stable across runs), such that each run tags a uniform random sample
+
+
+@dataclass(frozen=True)
+class TagSchedule:
+    """Order in which pending images are tagged & time budget of a tagging run;  the default tags all images."""
+
+    order: TagOrder = TagOrder.DIRECTORY
+    deadline: float | None = None  # time.time() after which no new images are started;  None = no time limit
+    folder_weights: tuple[tuple[str, float], ...] = ()  # (pattern, weight) pairs, see folder_weight(...)
+
+    @property
+    def is_expired(self) -> bool:
+        return (self.deadline is not None) and (time.time() >= self.deadline)
+
+    def folder_weight(self, folder: str) -> float:
+        """
+        Weight of a folder (catalog shard, relative to the catalog root): that of the first pattern (fnmatch) that
+        matches, or 1 if none does.  Folders with higher weights are tagged first & get a proportionally larger share
+        of the time budget;  folders with weight 0 are skipped.
+        """
+        for pattern, weight in self.folder_weights:
+            if fnmatch.fnmatch(folder, pattern):
+                return weight
+        return 1.0
+
+    def with_deadline(self, deadline: float | None) -> TagSchedule:
+        return dataclasses.replace(self, deadline=deadline)
+
+
+class DeadlineGuard:
+    """Passes through items until the deadline passes, remembering whether any items were left out."""
+
+    def __init__(self, deadline: float | None):
+        self.deadline = deadline
+        self.expired = False
+
+    def __call__(self, items: Iterable[T]) -> Iterator[T]:
+        for item in items:
+            if (self.deadline is not None) and (time.time() >= self.deadline):
+                self.expired = True
+                return
+            yield item
+
+
+# =================================================================================================
+#  Ordering
+# =================================================================================================
+def order_images(images_path: Path, images: Iterable[Path], order: TagOrder) -> Iterable[Path]:
+    """
+    Return the (pending) images of a directory in the order in which they should be tagged.  Except for directory
+    order, this requires all images up front.
+    """
+    if order == TagOrder.DIRECTORY:
+        return images
+
+    images = list(images)
+    checkpoint = _load_checkpoint(images_path)
+    if order == TagOrder.RANDOM:
+        # rank = hash of (seed, filename), such that the order of images is stable across runs, also when new images
+        # are added, while each directory gets its own (persisted) random order
+        seed = checkpoint["seed"] if checkpoint else secrets.token_hex(8)
+        if not checkpoint:
+            _save_checkpoint(
+                images_path, seed, [], np.zeros((0, 2), dtype=np.int64), np.zeros(0, dtype="datetime64[s]")
+            )
+        return sorted(images, key=lambda image: _random_rank(seed, image.name))
+
+    # newest first;  EXIF dates are only read for images that are not in the checkpoint (or that changed)
+    seed = checkpoint["seed"] if checkpoint else secrets.token_hex(8)
+    known = checkpoint["timestamps_by_file"] if checkpoint else dict()
+    stats = np.array([_get_file_stats(image) for image in images], dtype=np.int64).reshape(-1, 2)
+    timestamps = np.full(len(images), np.datetime64("NaT"), dtype="datetime64[s]")
+    to_read = []
+    for k, image in enumerate(images):
+        cached = known.get(image.name)
+        if (cached is not None) and (cached[0] == tuple(stats[k])):
+            timestamps[k] = cached[1]
+        else:
+            to_read.append(k)
+    for k, exif_data in zip(
+        to_read,
+        tqdm(
+            read_exif_concurrently([images[k] for k in to_read]),
+            desc="Reading EXIF dates of pending images... ",
+            file=sys.stdout,
+            total=len(to_read),
+            disable=not to_read,
+        ),
+    ):
+        if exif_data.dt is not None:
+            timestamps[k] = np.datetime64(exif_data.dt.replace(tzinfo=None), "s")
+    if to_read or (len(known) != len(images)):
+        _save_checkpoint(images_path, seed, [image.name for image in images], stats, timestamps)
+
+    has_no_time = np.isnat(timestamps)
+    seconds = np.where(has_no_time, 0, timestamps.astype(np.int64))
+    names = np.array([image.name for image in images], dtype=str)
+    rows = np.lexsort((names, -seconds, has_no_time))
+    return [images[k] for k in rows]
+
+
+def _random_rank(seed: str, filename: str) -> bytes:
+    return hashlib.blake2b(f"{seed}:{filename}".encode("utf-8"), digest_size=8).digest()
+
+
+def _get_file_stats(image_path: Path) -> tuple[int, int]:
+    try:
+        stat = os.stat(image_path)
+        return stat.st_size, stat.st_mtime_ns
+    except OSError:
+        return -1, -1
+
+
+# =================================================================================================
+#  Checkpoint
+# =================================================================================================
+def _load_checkpoint(images_path: Path) -> dict | None:
+    """Returns dict with 'seed' & 'timestamps_by_file' (filename -> ((size, mtime_ns), timestamp)), if available."""
+    data = load_index_arrays(images_path, _SCHEDULE_CHECKPOINT_FILENAME)
+    if data is None:
+        return None
+    return dict(
+        seed=str(data["seed"]),
+        timestamps_by_file={
+            filename: (tuple(stats), timestamp)
+            for filename, stats, timestamp in zip(
+                data["filenames"].tolist(), data["stats"].tolist(), data["timestamps"]
+            )
+        },
+    )
+
+
+def _save_checkpoint(images_path: Path, seed: str, filenames: list[str], stats: np.ndarray, timestamps: np.ndarray):
+    save_index_arrays(
+        images_path,
+        _SCHEDULE_CHECKPOINT_FILENAME,
+        seed=np.array(seed),
+        filenames=np.array(filenames, dtype=str),
+        stats=stats,
+        timestamps=timestamps,
+    )
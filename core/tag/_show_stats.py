@@ -1,26 +1,29 @@
 from pathlib import Path
 
-from ._read_all_metadata import read_all_metadata
+from core.data import ModelTier
 
+from ._aggregates import get_aggregates
 
-def show_stats(image_directory: Path):
-    # read all metadata
-    all_metadata = read_all_metadata(image_directory)
+
+def show_stats(image_directory: Path, rebuild: bool = False):
+    # read persisted aggregates (rebuilt from all metadata only if requested or outdated)
+    aggregates = get_aggregates(image_directory, rebuild)
 
     # extract stats
-    n_files = len(all_metadata)
-    models = sorted({metadata.model for metadata in all_metadata})
-    n_unique_tags = len({tag for metadata in all_metadata for tag in metadata.search_data.tags})
-    n_tags_per_img = sum(len(metadata.search_data.tags) for metadata in all_metadata) / n_files if n_files > 0 else 0
-    n_desc_chars_per_img = (
-        sum(len(metadata.search_data.description) for metadata in all_metadata) / n_files if n_files > 0 else 0
-    )
-    t_extract = sum(metadata.t_extract for metadata in all_metadata) / n_files if n_files > 0 else 0
+    n_files = aggregates.n_files
+    models = sorted(set(aggregates.models) - {""})
+    n_embeddings_only = aggregates.tiers.get(ModelTier.EMBEDDINGS_ONLY.value, 0)
+    n_unique_tags = len(aggregates.tag_counts)
+    n_tags_per_img = aggregates.n_tags / n_files if n_files > 0 else 0
+    n_desc_chars_per_img = aggregates.n_description_chars / n_files if n_files > 0 else 0
+    t_extract = aggregates.t_extract_sum / n_files if n_files > 0 else 0
 
     # show stats
     print(f"  files          : {n_files:_}")
     if n_files:
         print(f"  model(s)       : {', '.join(models) if models else 'NA'}")
+        if n_embeddings_only:
+            print(f"  not enriched   : {n_embeddings_only:_} (embeddings-only, see 'enrich')")
         print(f"  descriptions   : {n_desc_chars_per_img:7.2f} chars/img")
         print(f"  tags           : {n_tags_per_img:7.2f}  tags/img    [{n_unique_tags:_} unique]")
         print(f"  extraction     : {t_extract:7.2f}   sec/img")
@@ -1,22 +1,15 @@
-from collections import defaultdict
+import heapq
 from pathlib import Path
 
-from ._read_all_metadata import read_all_metadata
+from ._aggregates import get_aggregates
 
 
-def show_tags(image_directory: Path, n: int = 10):
-    # read all metadata
-    all_metadata = read_all_metadata(image_directory)
+def show_tags(image_directory: Path, n: int = 10, rebuild: bool = False):
+    # read persisted tag counts (rebuilt from all metadata only if requested or outdated)
+    tag_counts = get_aggregates(image_directory, rebuild).tag_counts
 
-    # count tags
-    tag_count = defaultdict(int)
-    for metadata in all_metadata:
-        for tag in metadata.search_data.tags:
-            tag_count[tag] += 1
-
-    # sort tags & show
-    sorted_tags = sorted(tag_count.items(), key=lambda x: (-x[1], x[0]))
-    sorted_tags = sorted_tags[:n]
+    # select top n tags & show
+    sorted_tags = heapq.nsmallest(n, tag_counts.items(), key=lambda x: (-x[1], x[0]))
     if sorted_tags:
         max_tag_len = max(len(tag) for tag, _ in sorted_tags)
         for i, (tag, count) in enumerate(sorted_tags, start=1):
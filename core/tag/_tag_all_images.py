@@ -1,13 +1,26 @@
+import os
 import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Literal
+from typing import Callable, Iterable, Iterator, Literal, TypeVar
 
 from tqdm import tqdm
 
-from core.config import SUPPORTED_IMAGE_EXTENSIONS
-from core.models import ensure_model_exists
+from core.catalog import is_image_file
+from core.config import DEDUP_MAX_HASH_DISTANCE
+from core.data import GenerationStats, ModelTier
+from core.models import ensure_model_exists, get_ollama_pool
 
-from ._tag_image import tag_image
+from ._leases import LeaseManager
+from ._perceptual_hash import group_near_identical_images
+from ._read_all_metadata import get_metadata_path
+from ._schedule import DeadlineGuard, TagSchedule, order_images
+from ._tag_image import embed_image, tag_image, tag_image_like_sibling
+from .exif import prefetch_exif, read_exif, report_exif_failures
+
+T = TypeVar("T")
+R = TypeVar("R")
 
 
 def tag_all_images(
@@ -16,24 +29,242 @@ def tag_all_images(
     geolookup: Literal["off", "offline", "online"],
     embedding_size: int,
     overwrite: bool,
-):
+    dedup: bool = False,
+    cooperative: bool = False,
+    tier: ModelTier | None = None,
+    embeddings_only: bool = False,
+    schedule: TagSchedule = TagSchedule(),
+) -> bool:
+    """
+    Tag all images in a directory.  Without dedup (& in directory order), pending images are discovered in a single
+    streaming pass over the directory (diffed against a single listing of the metadata folder), such that tagging
+    starts on the first pending image right away, even for huge directories on slow (network) storage.
+
+    The schedule determines in which order pending images are tagged and until when new images are started, such
+    that a run with a limited time budget tags the most valuable images first.  Since the next run skips all images
+    that were tagged, it resumes where the previous one stopped.
+
+    If multiple Ollama endpoints are configured (see core.models.set_ollama_endpoints), images are tagged concurrently,
+    as many at a time as the endpoints' combined weights.
+
+    With cooperative=True, multiple workers (processes, possibly on different machines sharing the directory over a
+    network file system) can tag the same directory simultaneously, each image being claimed by 1 worker using lease
+    files (see LeaseManager).
+
+    :param images_path: Path to the directory containing images.
+    :param model: Name of the model to use for tagging.
+    :param geolookup: How to resolve GPS coordinates into address/city info, see tag_image(...).
+    :param embedding_size: Size of the embeddings to be extracted.  0 means no embeddings are extracted.
+    :param overwrite: If True, also tag images that were already tagged before.
+    :param dedup: If True, group near-identical images (using perceptual hashes) & only run LLM extraction & image
+                    embedding once per group, reusing results for the other images of the group.
+    :param cooperative: If True, claim images using lease files before tagging them, such that other workers tagging
+                          the same directory skip them.  Can't be combined with overwrite.
+    :param tier: (optional) Tier of the model cascade the model belongs to, see tag_cascade(...).
+    :param embeddings_only: If True, only extract time & location and the image embedding, without running the LLM
+                              (which is deferred until images are enriched, see enrich_images(...)).  Model & tier are
+                              ignored in that case.
+    :param schedule: Order in which pending images are tagged & deadline after which no new images are started.
+    :return: True if all pending images were tagged, False if the deadline was reached first.
+    """
+    if cooperative and overwrite:
+        raise ValueError("Cooperative tagging can't be combined with overwriting previously generated tags.")
+    if embeddings_only and (embedding_size == 0):
+        raise ValueError("Embeddings-only tagging requires an embedding size > 0.")
+
     # ensure model exists
-    ensure_model_exists(model)
-
-    # collect all image files
-    images = []
-    for extension in SUPPORTED_IMAGE_EXTENSIONS:
-        images += list(images_path.glob(f"*{extension}"))
-    images = sorted(images)
-
-    # tag one by one
-    for image in tqdm(
-        images,
-        desc=f"Tagging {len(images):_} image(s)... ",
-        file=sys.stdout,
-        total=len(images),
-    ):
-        image_path = Path(image)
-        metadata_path = image_path.parent / "metadata" / f"{image_path.parts[-1]}.json"
-        if overwrite or not metadata_path.exists():
-            tag_image(image_path, metadata_path, model, geolookup, embedding_size)
+    if embeddings_only:
+        tier = ModelTier.EMBEDDINGS_ONLY
+    else:
+        ensure_model_exists(model)
+
+    # discover & tag images that need tagging
+    pending_images = order_images(images_path, _iter_pending_images(images_path, overwrite), schedule.order)
+    return tag_images(
+        images_path, pending_images, model, geolookup, embedding_size, dedup, cooperative, tier, schedule.deadline
+    )
+
+
+def tag_images(
+    images_path: Path,
+    images: Iterable[Path],
+    model: str,
+    geolookup: Literal["off", "offline", "online"],
+    embedding_size: int,
+    dedup: bool = False,
+    cooperative: bool = False,
+    tier: ModelTier | None = None,
+    deadline: float | None = None,
+) -> bool:
+    """
+    Tag the given images of a directory (regardless of whether they were tagged before, unless cooperative=True),
+    in the given order, see tag_all_images(...) for details & the other parameters.  Without dedup, images can be
+    streamed.
+
+    :param images_path: Path to the directory containing the images.
+    :param images: Images (in images_path) to be tagged.
+    :param tier: (optional) Tier of the model cascade the model belongs to;  with tier EMBEDDINGS_ONLY, the LLM is not
+                   run (see embed_image(...)).
+    :param deadline: (optional) time.time() after which no new images are started (those in progress are completed).
+    :return: True if all images were tagged, False if the deadline was reached first.
+    """
+
+    # read EXIF data ahead of tagging (in background threads)
+    images = prefetch_exif(images)
+
+    # group near-identical images;  first image of each group is tagged, the others reuse its results
+    if dedup:
+        images = list(images)  # grouping needs all images up front
+        rank = {image: k for k, image in enumerate(images)}
+        groups = group_near_identical_images(sorted(images), DEDUP_MAX_HASH_DISTANCE)
+        groups.sort(key=lambda group: min(rank[image] for image in group))  # keep the order of the images
+        desc = f"Tagging {len(images):_} image(s) in {len(groups):_} group(s)... "
+    else:
+        groups = ([image] for image in images)  # streamed, i.e. total unknown up front
+        desc = "Tagging pending image(s)... "
+
+    # tag group by group (concurrently, if the Ollama endpoints allow so)
+    leases = LeaseManager(images_path) if cooperative else None
+
+    def tag_group(group: list[Path]) -> tuple[int, float, int, GenerationStats | None, list[tuple[Path, str]]]:
+        """
+        Tag all images of the group & return (# of siblings, extraction time saved by reusing results, # of images
+        skipped because they were claimed or tagged by other workers, LLM generation stats, (image, error) tuples of
+        images whose EXIF data could not be parsed).
+        """
+        n_images = len(group)
+        if leases is not None:
+            group = [image_path for image_path in group if _claim(image_path, leases)]
+        try:
+            t_group_reused, generation_stats = 0.0, None
+            if group:
+                if tier == ModelTier.EMBEDDINGS_ONLY:
+                    group_metadata = embed_image(group[0], get_metadata_path(group[0]), geolookup, embedding_size)
+                else:
+                    group_metadata = tag_image(
+                        group[0], get_metadata_path(group[0]), model, geolookup, embedding_size, tier
+                    )
+                for image_path in group[1:]:
+                    metadata = tag_image_like_sibling(
+                        image_path, get_metadata_path(image_path), group_metadata, geolookup
+                    )
+                    t_group_reused += group_metadata.t_extract - metadata.t_extract
+                generation_stats = group_metadata.generation_stats
+            exif_failures = [(image_path, read_exif(image_path).error) for image_path in group]  # cached
+            exif_failures = [(image_path, error) for image_path, error in exif_failures if error is not None]
+            return max(len(group) - 1, 0), t_group_reused, n_images - len(group), generation_stats, exif_failures
+        finally:
+            if leases is not None:
+                for image_path in group:
+                    if not leases.is_held(image_path):
+                        print(f"Lease on '{image_path.name}' expired while tagging; it may have been tagged twice.")
+                    leases.release(image_path)
+
+    t_reused, n_siblings, n_skipped = 0.0, 0, 0
+    total_generation_stats, n_generated = GenerationStats(), 0
+    exif_failures = []
+    deadline_guard = DeadlineGuard(deadline)
+    with leases if leases is not None else nullcontext():
+        for n_group_siblings, t_group_reused, n_group_skipped, generation_stats, group_exif_failures in tqdm(
+            _map_concurrently(tag_group, deadline_guard(groups), max_workers=get_ollama_pool().concurrency),
+            desc=desc,
+            file=sys.stdout,
+            total=len(groups) if dedup else None,
+        ):
+            n_siblings += n_group_siblings
+            t_reused += t_group_reused
+            n_skipped += n_group_skipped
+            exif_failures.extend(group_exif_failures)
+            if generation_stats is not None:
+                n_generated += 1
+                total_generation_stats = _add_generation_stats(total_generation_stats, generation_stats)
+
+    # report savings & EXIF failures
+    if n_generated:
+        print(
+            f"LLM generation: {total_generation_stats.n_tokens:_} token(s) for {n_generated:_} image(s) "
+            + f"({total_generation_stats.n_tokens / n_generated:.0f} tokens/img, "
+            + f"{total_generation_stats.t_generate:.1f} sec);  early termination saved up to "
+            + f"{total_generation_stats.n_tokens_saved:_} token(s), ~{total_generation_stats.t_saved:.1f} sec."
+        )
+    if dedup and images:
+        print(
+            f"Near-identical images: {n_siblings:_} of {len(images):_} image(s) reused search data of a sibling "
+            + f"({len(groups):_} LLM extraction(s) instead of {len(images):_}, ~{t_reused:.1f} sec of extraction saved)."
+        )
+    if leases is not None:
+        print(
+            f"Cooperative tagging: skipped {n_skipped:_} image(s) claimed or tagged by other workers, "
+            + f"reclaimed {leases.n_reclaimed:_} expired lease(s)."
+        )
+    report_exif_failures(exif_failures)
+    if deadline_guard.expired:
+        print("Time budget exhausted;  stopped starting new images (re-run to resume).")
+    return not deadline_guard.expired
+
+
+# =================================================================================================
+#  Helpers
+# =================================================================================================
+def _iter_pending_images(images_path: Path, overwrite: bool) -> Iterator[Path]:
+    """
+    Yield all images in the directory that need tagging, in directory order, using a single os.scandir pass (with
+    case-insensitive extension matching).  Images are considered tagged if their metadata file appears in a single
+    listing of the metadata folder, taken up front, so no per-image stat calls are needed.
+    """
+    tagged = set() if overwrite else _list_metadata_files(images_path)
+    with os.scandir(images_path) as entries:
+        for entry in entries:
+            if is_image_file(entry.name) and (f"{entry.name}.json" not in tagged) and entry.is_file():
+                yield Path(entry.path)
+
+
+def _claim(image_path: Path, leases: LeaseManager) -> bool:
+    """Claim image for tagging;  returns False if claimed by another worker or if it got tagged in the meantime."""
+    if not leases.try_acquire(image_path):
+        return False
+    elif get_metadata_path(image_path).exists():
+        leases.release(image_path)  # tagged by another worker after we listed the metadata folder
+        return False
+    return True
+
+
+def _add_generation_stats(a: GenerationStats, b: GenerationStats) -> GenerationStats:
+    return GenerationStats(
+        n_tokens=a.n_tokens + b.n_tokens,
+        t_generate=a.t_generate + b.t_generate,
+        n_tokens_saved=a.n_tokens_saved + b.n_tokens_saved,
+        t_saved=a.t_saved + b.t_saved,
+    )
+
+
+def _list_metadata_files(images_path: Path) -> set[str]:
+    try:
+        with os.scandir(images_path / "metadata") as entries:
+            return {entry.name for entry in entries}
+    except FileNotFoundError:
+        return set()
+
+
+def _map_concurrently(fun: Callable[[T], R], items: Iterable[T], max_workers: int) -> Iterator[R]:
+    """
+    Yield fun(item) for all items, in order of completion, using max_workers threads.  Items are consumed lazily,
+    with at most 2*max_workers of them submitted at any time, such that streamed items are processed right away.
+    """
+    if max_workers <= 1:
+        yield from map(fun, items)
+        return
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        pending = set()
+        for item in items:
+            pending.add(executor.submit(fun, item))
+            if len(pending) >= 2 * max_workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                yield from (future.result() for future in done)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            yield from (future.result() for future in done)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
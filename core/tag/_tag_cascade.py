@@ -0,0 +1,107 @@
+from pathlib import Path
+from typing import Literal
+
+import numpy as np
+
+from core.config import CASCADE_REFINE_MIN_DESCRIPTION_WORDS, CASCADE_REFINE_MIN_TAGS
+from core.data import ModelTier
+from core.models import ensure_model_exists
+
+from ._metadata_table import read_metadata_table
+from ._schedule import TagSchedule
+from ._tag_all_images import tag_all_images, tag_images
+
+
+def tag_cascade(
+    images_path: Path,
+    fast_model: str,
+    model: str,
+    geolookup: Literal["off", "offline", "online"],
+    embedding_size: int,
+    overwrite: bool,
+    dedup: bool = False,
+    refine: Literal["all", "weak", "off"] = "weak",
+    cooperative: bool = False,
+    schedule: TagSchedule = TagSchedule(),
+) -> bool:
+    """
+    Tag all images in a directory using a cascade of 2 models:
+      - fast pass: all pending images are tagged with fast_model, such that the entire collection becomes searchable
+                     quickly
+      - refinement: images tagged by fast_model are re-tagged with (the stronger) model, weakest results first, such
+                     that interrupting this pass still leaves a consistent & fully searchable collection
+
+    Since refinement only considers images tagged by fast_model, re-running resumes where it left off.  The tier that
+    produced the results of each image is recorded in its metadata.
+
+    :param images_path: Path to the directory containing images.
+    :param fast_model: Name of the (fast) model used for the first pass.
+    :param model: Name of the (stronger) model used for refinement.
+    :param refine: Which images to refine:
+                     - all: all images tagged by fast_model
+                     - weak: only images with fewer tags or shorter descriptions than requested in the prompts
+                     - off: none (fast pass only)
+    :param cooperative: If True, the fast pass is executed cooperatively with other workers, see tag_all_images(...).
+                          Refinement is not, so this requires refine='off'.
+    :param schedule: Order of the fast pass & deadline of both passes.
+    :return: True if both passes completed, False if the deadline was reached first.
+    See tag_all_images(...) for the other parameters.
+    """
+    if cooperative and (refine != "off"):
+        raise ValueError("Cooperative cascade tagging is only supported without refinement.")
+    completed = tag_all_images(
+        images_path,
+        fast_model,
+        geolookup,
+        embedding_size,
+        overwrite,
+        dedup,
+        cooperative,
+        tier=ModelTier.FAST,
+        schedule=schedule,
+    )
+    return completed and refine_images(
+        images_path, fast_model, model, geolookup, embedding_size, dedup, refine, schedule.deadline
+    )
+
+
+def refine_images(
+    images_path: Path,
+    fast_model: str,
+    model: str,
+    geolookup: Literal["off", "offline", "online"],
+    embedding_size: int,
+    dedup: bool = False,
+    refine: Literal["all", "weak", "off"] = "weak",
+    deadline: float | None = None,
+) -> bool:
+    """
+    Refinement pass of tag_cascade(...), see there for details.  Returns True if all selected images were refined,
+    False if the deadline (time.time()) was reached first.
+    """
+    images = select_images_to_refine(images_path, fast_model, refine)
+    if not images:
+        return True
+
+    ensure_model_exists(model)
+    print(f"Refining {len(images):_} image(s) tagged by '{fast_model}' using model '{model}'...")
+    return tag_images(
+        images_path, images, model, geolookup, embedding_size, dedup, tier=ModelTier.REFINED, deadline=deadline
+    )
+
+
+def select_images_to_refine(images_path: Path, fast_model: str, refine: Literal["all", "weak", "off"]) -> list[Path]:
+    """Return images tagged by fast_model that should be refined, with the weakest results (fewest tags) first."""
+    if refine == "off":
+        return []
+
+    table = read_metadata_table(images_path)
+    n_tags = np.diff(table.tag_offsets)
+    n_words = np.array([len(description.split()) for description in table.descriptions], dtype=np.int64)
+    is_selected = table.models == fast_model
+    if refine == "weak":
+        is_selected &= (n_tags < CASCADE_REFINE_MIN_TAGS) | (n_words < CASCADE_REFINE_MIN_DESCRIPTION_WORDS)
+
+    rows = np.flatnonzero(is_selected)
+    rows = rows[np.lexsort((n_words[rows], n_tags[rows]))]
+    return [images_path / filename for filename in table.filenames[rows]]
@@ -0,0 +1,111 @@
+import time
+from pathlib import Path
+from typing import Callable, Literal
+
+from core.catalog import update_catalog
+from core.data import ModelTier
+
+from ._schedule import TagSchedule
+from ._tag_all_images import tag_all_images
+from ._tag_cascade import refine_images
+
+
+def tag_catalog(
+    root: Path,
+    model: str,
+    geolookup: Literal["off", "offline", "online"],
+    embedding_size: int,
+    overwrite: bool,
+    dedup: bool = False,
+    cooperative: bool = False,
+    fast_model: str | None = None,
+    refine: Literal["all", "weak", "off"] = "weak",
+    embeddings_only: bool = False,
+    schedule: TagSchedule = TagSchedule(),
+) -> bool:
+    """
+    Recursively discover all image folders below root and tag each of them as a separate shard, i.e. with metadata
+    stored in a metadata subfolder per image folder.  The discovered shards are persisted in the catalog manifest, such
+    that searches don't need to re-scan the directory tree.  See tag_all_images(...) for the other parameters.
+
+    If fast_model is provided, a model cascade is used (see tag_cascade(...)), with the fast pass first completed for
+    all shards, such that the entire catalog becomes searchable before any refinement starts.  With
+    embeddings_only=True, the LLM is not run at all (see enrich_images(...)).
+
+    Shards are tagged in order of descending folder weight (see TagSchedule.folder_weight), with the time budget (if
+    any) divided over the shards proportionally to their weights.  Time left unused by shards that completed early is
+    redistributed over the remaining shards, after which shards that ran out of time get another turn.
+
+    :return: True if all shards were tagged completely, False if the deadline was reached first.
+    """
+    if (fast_model is not None) and cooperative and (refine != "off"):
+        raise ValueError("Cooperative cascade tagging is only supported without refinement.")
+    catalog = update_catalog(root)
+    print(f"Found {len(catalog.shards):_} image folder(s) in catalog '{root}'.")
+
+    shards = sorted(
+        (shard for shard in catalog.shards if schedule.folder_weight(shard) > 0),
+        key=lambda shard: -schedule.folder_weight(shard),
+    )
+    if len(shards) < len(catalog.shards):
+        print(f"Skipping {len(catalog.shards) - len(shards):_} image folder(s) with weight 0.")
+
+    first_pass_model, tier = (model, None) if fast_model is None else (fast_model, ModelTier.FAST)
+    completed = _tag_shards(
+        shards,
+        schedule,
+        lambda shard, shard_schedule: tag_all_images(
+            root / shard,
+            first_pass_model,
+            geolookup,
+            embedding_size,
+            overwrite,
+            dedup,
+            cooperative,
+            tier,
+            embeddings_only,
+            shard_schedule,
+        ),
+    )
+
+    if (fast_model is not None) and completed:
+        completed = _tag_shards(
+            shards,
+            schedule,
+            lambda shard, shard_schedule: refine_images(
+                root / shard, fast_model, model, geolookup, embedding_size, dedup, refine, shard_schedule.deadline
+            ),
+            label="refinement",
+        )
+    return completed
+
+
+def _tag_shards(
+    shards: list[str], schedule: TagSchedule, tag_shard: Callable[[str, TagSchedule], bool], label: str = ""
+) -> bool:
+    """
+    Call tag_shard(shard, shard_schedule) for all shards, in the given order, with each shard getting a share of the
+    remaining time proportional to its weight;  returns True if all shards completed.
+    """
+    incomplete = []
+    for i, shard in enumerate(shards, start=1):
+        if schedule.is_expired:
+            incomplete.extend(shards[i - 1 :])
+            break
+        print(f"[{i}/{len(shards)}] {shard}" + (f" ({label})" if label else ""))
+        shard_schedule = schedule
+        if schedule.deadline is not None:
+            weights = [schedule.folder_weight(other_shard) for other_shard in shards[i - 1 :]]
+            shard_share = weights[0] / sum(weights)
+            shard_schedule = schedule.with_deadline(time.time() + (schedule.deadline - time.time()) * shard_share)
+        if not tag_shard(shard, shard_schedule):
+            incomplete.append(shard)
+
+    # 2nd turn for shards that ran out of their share of time, using all time that is left
+    n_completed = 0
+    for i, shard in enumerate(incomplete, start=1):
+        if schedule.is_expired:
+            break
+        print(f"[{i}/{len(incomplete)}] {shard} ({label + ', ' if label else ''}continued)")
+        n_completed += tag_shard(shard, schedule)
+    return n_completed == len(incomplete)
@@ -1,17 +1,43 @@
+import os
+import threading
 import time
 from pathlib import Path
 from typing import Literal
 
-import ollama
-
-from core.data import EmbeddingModel, ImageEmbeddings, ImageMetadata, SearchData
+from core.cache import artifact_key, compute_file_hash, get_artifact_cache, get_or_compute
+from core.data import (
+    Embedding,
+    EmbeddingModel,
+    GenerationStats,
+    ImageEmbeddings,
+    ImageMetadata,
+    ModelTier,
+    SearchData,
+)
+from core.models import StreamedChat, get_ollama_pool
 
+from ._aggregates import updating_aggregates
+from ._generation_options import GenerationOptions, get_generation_options
 from .embeddings import (
     construct_embedding_from_image,
     construct_embedding_from_search_data,
+    get_inference_profile,
 )
 from .exif import extract_time_and_location
 
+_DESCRIPTION_PROMPT = (
+    "Describe the image in at least 50 words.  "
+    + "Focus on factual elements and make sure to include all text you see in the image as well."
+)
+_TAGS_PROMPT = (
+    "Describe what you see in this image by providing individual single-word tags.  "
+    + "Provide at least 10 tags as a comma-separated list."
+)
+
+# LLM extraction may run for multiple images concurrently (see tag_all_images), but embeddings are computed locally by
+# a single (lazily loaded) model, so those are computed one image at a time.
+_embedding_lock = threading.Lock()
+
 
 # =================================================================================================
 #  Main tagging functionality
@@ -22,7 +48,8 @@ def tag_image(
     model: str,
     geolookup: Literal["off", "offline", "online"],
     embedding_size: int,
-):
+    tier: ModelTier | None = None,
+) -> ImageMetadata:
     """
     Tag single image and save metadata.  'Tag' is used in a broad sense here, meaning that we extract
     all relevant metadata for future search actions, including, tags, description, and potentially other properties
@@ -35,26 +62,31 @@ def tag_image(
                        - offline: use offline reverse geocoding (requires reverse_geocode package)
                        - online: use online reverse geocoding using Nominatim (requires internet connection)
     :param embedding_size: Size of the embeddings to be extracted.  0 means no embeddings are extracted.
+    :param tier: (optional) Tier of the model cascade the model belongs to, recorded in the metadata.
+    :return: ImageMetadata object that was saved.
+
+    LLM outputs & embeddings are looked up in the global artifact cache (see core.cache) first, keyed by the content
+    of the image, such that copies of previously tagged images (in other folders or under other names) are not
+    processed again.  LLM responses are streamed & bounded as configured by the process-wide GenerationOptions (see
+    set_generation_options), with the number of generated tokens being recorded in the metadata.
     """
 
     # --- extract search data -----------------------------
     t_start = time.time_ns()
+    image_hash = compute_file_hash(image_path) if get_artifact_cache() else ""
     time_info, location_info = extract_time_and_location(image_path, geolookup)  # extract time & location from EXIF
-    search_data = SearchData(
-        description=_extract_description(image_path, model),
-        tags=_extract_tags(image_path, model),
-        time=time_info,
-        location=location_info,
-    )
+    description, tags, generation_stats = _extract_description_and_tags(image_path, image_hash, model)
+    search_data = SearchData(description=description, tags=tags, time=time_info, location=location_info)
     t_extract = (time.time_ns() - t_start) / 1e9  # elapsed time in  seconds
 
     # --- construct embeddings ----------------------------
     if embedding_size > 0:
         embedding_model = EmbeddingModel.from_embedding_size(embedding_size)
-        embeddings = ImageEmbeddings(
-            img=construct_embedding_from_image(image_path, embedding_model),
-            txt=construct_embedding_from_search_data(search_data, embedding_model),
-        )
+        with _embedding_lock:
+            embeddings = ImageEmbeddings(
+                img=_construct_cached_embedding_from_image(image_path, image_hash, embedding_model),
+                txt=_construct_cached_embedding_from_search_data(search_data, embedding_model),
+            )
     else:
         embeddings = None
 
@@ -65,36 +97,266 @@ def tag_image(
         t_extract=t_extract,
         search_data=search_data,
         embeddings=embeddings,
+        tier=tier,
+        generation_stats=generation_stats,
     )
 
     # --- save metadata -----------------------------------
+    _save_metadata(metadata, metadata_path)
+    return metadata
+
+
+def embed_image(
+    image_path: Path,
+    metadata_path: Path,
+    geolookup: Literal["off", "offline", "online"],
+    embedding_size: int,
+) -> ImageMetadata:
+    """
+    Fast alternative to tag_image(...), only extracting time & location (EXIF) and the image embedding, which
+    suffices for semantic search.  The (slow) LLM extraction of description & tags and the text embedding are
+    deferred until the image is enriched (see enrich_image(...)), which might never be needed.
+
+    :param image_path: Path to the image file to be tagged.
+    :param metadata_path: Path to the metadata file where the extracted metadata will be saved.
+    :param geolookup: How to resolve GPS coordinates into address/city info, see tag_image(...).
+    :param embedding_size: Size of the image embedding to be extracted (> 0).
+    :return: ImageMetadata object that was saved.
+    """
+
+    # --- extract search data & image embedding -----------
+    t_start = time.time_ns()
+    image_hash = compute_file_hash(image_path) if get_artifact_cache() else ""
+    time_info, location_info = extract_time_and_location(image_path, geolookup)
+    embedding_model = EmbeddingModel.from_embedding_size(embedding_size)
+    with _embedding_lock:
+        img_embedding = _construct_cached_embedding_from_image(image_path, image_hash, embedding_model)
+    t_extract = (time.time_ns() - t_start) / 1e9  # elapsed time in  seconds
+
+    # --- construct & save metadata -----------------------
+    metadata = ImageMetadata(
+        filename=str(image_path.parts[-1]),
+        model="",
+        t_extract=t_extract,
+        search_data=SearchData(time=time_info, location=location_info),
+        embeddings=ImageEmbeddings(img=img_embedding),
+        tier=ModelTier.EMBEDDINGS_ONLY,
+    )
+    _save_metadata(metadata, metadata_path)
+    return metadata
+
+
+def enrich_image(image_path: Path, metadata_path: Path, metadata: ImageMetadata, model: str) -> ImageMetadata:
+    """
+    Complete the metadata of an image that was tagged by embed_image(...), by extracting description & tags using
+    the LLM and computing the text embedding (of the same embedding model as the image embedding).  Time & location
+    info and the image embedding are reused as-is.
+
+    :param image_path: Path to the image file to be enriched.
+    :param metadata_path: Path to the metadata file where the enriched metadata will be saved.
+    :param metadata: Current (embeddings-only) metadata of the image.
+    :param model: Name of the model to use.
+    :return: ImageMetadata object that was saved.
+    """
+
+    # --- extract search data -----------------------------
+    t_start = time.time_ns()
+    image_hash = compute_file_hash(image_path) if get_artifact_cache() else ""
+    description, tags, generation_stats = _extract_description_and_tags(image_path, image_hash, model)
+    search_data = metadata.search_data.model_copy(update=dict(description=description, tags=tags))
+    t_extract = (time.time_ns() - t_start) / 1e9  # elapsed time in  seconds
+
+    # --- construct embeddings ----------------------------
+    embeddings = metadata.embeddings
+    if embeddings is not None:
+        with _embedding_lock:
+            embeddings = ImageEmbeddings(
+                img=embeddings.img,
+                txt=_construct_cached_embedding_from_search_data(search_data, embeddings.img.model),
+            )
+
+    # --- construct & save metadata -----------------------
+    metadata = ImageMetadata(
+        filename=str(image_path.parts[-1]),
+        model=model,
+        t_extract=metadata.t_extract + t_extract,
+        search_data=search_data,
+        embeddings=embeddings,
+        generation_stats=generation_stats,
+    )
+    _save_metadata(metadata, metadata_path)
+    return metadata
+
+
+def tag_image_like_sibling(
+    image_path: Path,
+    metadata_path: Path,
+    sibling_metadata: ImageMetadata,
+    geolookup: Literal["off", "offline", "online"],
+) -> ImageMetadata:
+    """
+    Tag an image that is near-identical to an already tagged sibling image (e.g. burst shot or edited copy), by
+    reusing the sibling's LLM-extracted description & tags and image embedding.  Only per-file EXIF time & location
+    are extracted again; the text embedding is only recomputed if these differ from the sibling's.
+
+    :param image_path: Path to the image file to be tagged.
+    :param metadata_path: Path to the metadata file where the extracted metadata will be saved.
+    :param sibling_metadata: ImageMetadata of the near-identical sibling image.
+    :param geolookup: How to resolve GPS coordinates into address/city info, see tag_image(...).
+    :return: ImageMetadata object that was saved.
+    """
+
+    # --- extract search data -----------------------------
+    t_start = time.time_ns()
+    time_info, location_info = extract_time_and_location(image_path, geolookup)
+    search_data = sibling_metadata.search_data.model_copy(update=dict(time=time_info, location=location_info))
+    t_extract = (time.time_ns() - t_start) / 1e9  # elapsed time in  seconds
+
+    # --- construct embeddings ----------------------------
+    embeddings = sibling_metadata.embeddings
+    if (embeddings is not None) and (embeddings.txt is not None) and (search_data != sibling_metadata.search_data):
+        with _embedding_lock:
+            embeddings = ImageEmbeddings(
+                img=embeddings.img,
+                txt=_construct_cached_embedding_from_search_data(search_data, embeddings.txt.model),
+            )
+
+    # --- construct & save metadata -----------------------
+    metadata = ImageMetadata(
+        filename=str(image_path.parts[-1]),
+        model=sibling_metadata.model,
+        t_extract=t_extract,
+        search_data=search_data,
+        embeddings=embeddings,
+        sibling_filename=sibling_metadata.filename,
+        tier=sibling_metadata.tier,
+    )
+    _save_metadata(metadata, metadata_path)
+    return metadata
+
+
+def _extract_description_and_tags(
+    image_path: Path, image_hash: str, model: str
+) -> tuple[str, list[str], GenerationStats | None]:
+    """
+    Extract (description, tags, generation stats) of an image using the LLM, using the artifact cache if enabled (in
+    which case image_hash should be the hash of the image).  Generation stats are None if both were cached.
+    """
+    options = get_generation_options()
+    responses: list[tuple[StreamedChat, int]] = []  # (response, token budget) of all LLM requests that were made
+    description = get_or_compute(
+        artifact_key(
+            "description",
+            image_hash,
+            model,
+            _DESCRIPTION_PROMPT,
+            str(options.max_tokens_description),
+            str(options.context_size),
+        ),
+        lambda: _extract_description(image_path, model, options, responses),
+    )
+    tags = get_or_compute(
+        artifact_key(
+            "tags",
+            image_hash,
+            model,
+            _TAGS_PROMPT,
+            str(options.max_tokens_tags),
+            str(options.stop_after_tags),
+            str(options.context_size),
+        ),
+        lambda: _extract_tags(image_path, model, options, responses),
+    )
+    return description, tags, _get_generation_stats(responses)
+
+
+def _construct_cached_embedding_from_image(
+    image_path: Path, image_hash: str, embedding_model: EmbeddingModel
+) -> Embedding:
+    """construct_embedding_from_image(...), using the artifact cache, keyed by the image content."""
+    precision = get_inference_profile().precision.value  # (slightly) affects embedding values
+    return get_or_compute(
+        artifact_key("img_embedding", image_hash, embedding_model.value, precision),
+        lambda: construct_embedding_from_image(image_path, embedding_model),
+        Embedding.model_dump,
+        Embedding.model_validate,
+    )
+
+
+def _construct_cached_embedding_from_search_data(search_data: SearchData, embedding_model: EmbeddingModel) -> Embedding:
+    """construct_embedding_from_search_data(...), using the artifact cache, keyed by the text being embedded."""
+    return get_or_compute(
+        artifact_key(
+            "txt_embedding",
+            search_data.textual_description(),
+            embedding_model.value,
+            get_inference_profile().precision.value,
+        ),
+        lambda: construct_embedding_from_search_data(search_data, embedding_model),
+        Embedding.model_dump,
+        Embedding.model_validate,
+    )
+
+
+def _get_generation_stats(responses: list[tuple[StreamedChat, int]]) -> GenerationStats | None:
+    """
+    Aggregate stats of all LLM requests made for an image.  Requests that were stopped early are assumed to have
+    otherwise used their entire token budget, so savings are an upper bound (& unknown for unbounded requests).
+    """
+    if not responses:
+        return None
+    n_tokens_saved = [
+        max(budget - response.n_tokens, 0) if (response.stopped_early and budget > 0) else 0
+        for response, budget in responses
+    ]
+    return GenerationStats(
+        n_tokens=sum(response.n_tokens for response, _ in responses),
+        t_generate=sum(response.t_generate for response, _ in responses),
+        n_tokens_saved=sum(n_tokens_saved),
+        t_saved=sum(n * response.t_per_token for n, (response, _) in zip(n_tokens_saved, responses)),
+    )
+
+
+def _save_metadata(metadata: ImageMetadata, metadata_path: Path):
+    """
+    Save atomically, such that readers (& other workers) never see a partially written metadata file, while updating
+    the persisted aggregates of the directory (see updating_aggregates(...)).
+    """
     metadata_path.parent.mkdir(parents=True, exist_ok=True)  # ensure parent directory exists
-    with metadata_path.open("w") as metadata_file:
-        json_str = metadata.model_dump_json(indent=4)
-        metadata_file.write(json_str)
+    json_str = metadata.model_dump_json(indent=4)
+    tmp_path = metadata_path.with_name(f".{metadata_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with updating_aggregates(metadata_path.parent.parent) as update:
+        update.remove(metadata_path)
+        with tmp_path.open("w") as metadata_file:
+            metadata_file.write(json_str)
+        os.replace(tmp_path, metadata_path)
+        update.add(metadata)
 
 
 # =================================================================================================
 #  Extract DESCRIPTION
 # =================================================================================================
-def _extract_description(image_path: Path, model: str) -> str:
-    """Extract description from an image."""
+def _extract_description(
+    image_path: Path, model: str, options: GenerationOptions, responses: list[tuple[StreamedChat, int]]
+) -> str:
+    """Extract description from an image, appending the (response, token budget) of the LLM request to responses."""
 
     # trigger multi-modal LLM
-    response = ollama.chat(
+    response = get_ollama_pool().chat_stream(
         model=model,
         messages=[
             {
                 "role": "user",
-                "content": "Describe the image in at least 50 words.  Focus on factual elements and make sure to include all text you see in the image as well.",
+                "content": _DESCRIPTION_PROMPT,
                 "images": [str(image_path.absolute())],
             }
         ],
+        options=options.ollama_options(options.max_tokens_description),
     )
+    responses.append((response, options.max_tokens_description))
 
     # clean up and return
-    description: str = response["message"]["content"]
-    description = _clean_description(description)
+    description = _clean_description(response.content)
     return description
 
 
@@ -106,23 +368,43 @@ def _clean_description(description: str) -> str:
 # =================================================================================================
 #  Extract TAGS
 # =================================================================================================
-def _extract_tags(image_path: Path, model: str) -> list[str]:
-    """Extract tags from an image."""
+def _extract_tags(
+    image_path: Path, model: str, options: GenerationOptions, responses: list[tuple[StreamedChat, int]]
+) -> list[str]:
+    """
+    Extract tags from an image, appending the (response, token budget) of the LLM request to responses.  Generation
+    is stopped as soon as options.stop_after_tags distinct tags were received.
+    """
 
     # trigger multi-modal LLM
-    response = ollama.chat(
+    response = get_ollama_pool().chat_stream(
+        should_stop=(lambda tags_str: _has_enough_tags(tags_str, options.stop_after_tags))
+        if options.stop_after_tags > 0
+        else None,
         model=model,
         messages=[
             {
                 "role": "user",
-                "content": "Describe what you see in this image by providing individual single-word tags.  Provide at least 10 tags as a comma-separated list.",
+                "content": _TAGS_PROMPT,
                 "images": [str(image_path.absolute())],
             }
         ],
+        options=options.ollama_options(options.max_tokens_tags),
     )
+    responses.append((response, options.max_tokens_tags))
 
     # clean up and return
-    tags_str: str = response["message"]["content"]
+    return _parse_tags(response.content)
+
+
+def _has_enough_tags(tags_str: str, n_tags: int) -> bool:
+    """True if the (partial) LLM response contains at least n_tags distinct tags, ignoring a trailing partial word."""
+    i_last_separator = max(tags_str.rfind(separator) for separator in " ,\n")
+    return len(_parse_tags(tags_str[: i_last_separator + 1])) >= n_tags
+
+
+def _parse_tags(tags_str: str) -> list[str]:
+    """Parse the (comma-separated) tags of an LLM response into a sorted list of distinct, cleaned tags."""
     tags_str = tags_str.replace("\n", " ")
     tags_str = tags_str.replace(",", " ")
     tags = [_clean_tag(t) for t in tags_str.split(" ")]  # split and remove trailing/leading whitespace
@@ -0,0 +1,133 @@
+"""
+Persistent, sorted index of the time each image in a directory was taken, such that time filters can be evaluated
+using binary search, before reading (let alone scoring) the metadata of any image.  See _metadata_index for how the
+index is stored & kept up to date.  As for the embedding index, the metadata folder is only listed if its modification
+time differs from the one recorded in the index, and updates are serialized by a lock shared by all threads & processes.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from core.data import TimeFilter, TimeInfo
+
+from ._metadata_index import (
+    get_metadata_mtime_ns,
+    index_lock,
+    load_index_arrays,
+    save_index_arrays,
+    update_index_entries,
+)
+
+_TIME_INDEX_FILENAME = "time_index.npz"
+_TIME_INDEX_LOCK_FILENAME = "time_index.lock"
+
+
+# =================================================================================================
+#  Time index
+# =================================================================================================
+@dataclass
+class TimeIndex:
+    filenames: np.ndarray  # (n,) str;  image filenames, sorted by timestamp
+    timestamps: np.ndarray  # (n,) datetime64[s];  sorted, with NaT (no time info) last
+    metadata_stats: np.ndarray  # (n, 2) int64;  (size, mtime_ns) of the metadata file, to detect changes
+    metadata_mtime_ns: int = -1  # mtime of the metadata folder right before the last update listed it
+
+    def select(self, time_filter: TimeFilter) -> list[str]:
+        """Return filenames of all images matching the filter, in chronological order."""
+        n_valid = int(np.count_nonzero(~np.isnat(self.timestamps)))
+        valid_timestamps = self.timestamps[:n_valid]
+
+        # date range -> binary search
+        i_start = (
+            0 if time_filter.start is None else np.searchsorted(valid_timestamps, _to_datetime64(time_filter.start))
+        )
+        i_end = (
+            n_valid if time_filter.end is None else np.searchsorted(valid_timestamps, _to_datetime64(time_filter.end))
+        )
+        timestamps = valid_timestamps[i_start:i_end]
+
+        # weekdays & months -> vectorized, on remaining candidates only
+        is_match = np.ones(len(timestamps), dtype=bool)
+        if time_filter.weekdays is not None:
+            weekdays = (timestamps.astype("datetime64[D]").astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+            is_match &= np.isin(weekdays, list(time_filter.weekdays))
+        if time_filter.months is not None:
+            months = timestamps.astype("datetime64[M]").astype(np.int64) % 12 + 1
+            is_match &= np.isin(months, list(time_filter.months))
+
+        return self.filenames[i_start:i_end][is_match].tolist()
+
+
+def get_time_index(image_directory: Path) -> TimeIndex:
+    """Return the time index of the directory, updating (& persisting) it first if any metadata changed."""
+    index = _load_time_index(image_directory)
+    if index.metadata_mtime_ns == get_metadata_mtime_ns(image_directory):
+        return index  # up to date, without listing the metadata folder
+
+    with index_lock(image_directory, _TIME_INDEX_LOCK_FILENAME):
+        index = _load_time_index(image_directory)
+        metadata_mtime_ns = get_metadata_mtime_ns(image_directory)  # before listing, such that later changes count
+        if index.metadata_mtime_ns == metadata_mtime_ns:
+            return index  # updated concurrently
+
+        entries = update_index_entries(
+            image_directory,
+            indexed_filenames=index.filenames.tolist(),
+            indexed_stats=index.metadata_stats,
+            indexed_values=[(timestamp,) for timestamp in index.timestamps],
+            parse_values=_parse_timestamp,
+        )
+        if entries is None:
+            index.metadata_mtime_ns = metadata_mtime_ns  # e.g. only temporary files were added & removed
+        else:
+            timestamps = np.array(
+                [values[0] if values else np.datetime64("NaT") for _, values, _ in entries], dtype="datetime64[s]"
+            )
+            order = np.argsort(timestamps, kind="stable")
+            index = TimeIndex(
+                filenames=np.array([entries[i][0] for i in order], dtype=str),
+                timestamps=timestamps[order],
+                metadata_stats=np.array([entries[i][2] for i in order], dtype=np.int64).reshape(-1, 2),
+                metadata_mtime_ns=metadata_mtime_ns,
+            )
+        save_index_arrays(
+            image_directory,
+            _TIME_INDEX_FILENAME,
+            filenames=index.filenames,
+            timestamps=index.timestamps,
+            metadata_stats=index.metadata_stats,
+            metadata_mtime_ns=np.array(index.metadata_mtime_ns, dtype=np.int64),
+        )
+        return index
+
+
+# =================================================================================================
+#  Helpers
+# =================================================================================================
+def _to_datetime64(dt) -> np.datetime64:
+    return np.datetime64(dt.replace(tzinfo=None), "s")
+
+
+def _parse_timestamp(data: dict) -> tuple[np.datetime64]:
+    time_data = data["search_data"].get("time")
+    return (_to_datetime64(TimeInfo.model_validate(time_data).dt) if time_data else np.datetime64("NaT"),)
+
+
+def _load_time_index(image_directory: Path) -> TimeIndex:
+    data = load_index_arrays(image_directory, _TIME_INDEX_FILENAME)
+    if data is None:
+        return TimeIndex(
+            filenames=np.zeros(0, dtype=str),
+            timestamps=np.zeros(0, dtype="datetime64[s]"),
+            metadata_stats=np.zeros((0, 2), dtype=np.int64),
+        )
+    return TimeIndex(
+        filenames=data["filenames"],
+        timestamps=data["timestamps"].astype("datetime64[s]"),
+        metadata_stats=data["metadata_stats"],
+        metadata_mtime_ns=int(data["metadata_mtime_ns"]) if "metadata_mtime_ns" in data else -1,
+    )
@@ -0,0 +1,254 @@
+import os
+import sys
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Literal
+
+from tqdm import tqdm
+
+from core.catalog import discover_image_directories, get_catalog, is_excluded_directory, is_image_file, update_catalog
+from core.config import WATCH_DEBOUNCE_SEC, WATCH_POLL_INTERVAL_SEC
+from core.models import ensure_model_exists
+
+from ._embedding_index import get_embedding_index
+from ._geo_index import get_geo_index
+from ._inotify import InotifyWatcher
+from ._read_all_metadata import get_metadata_path
+from ._tag_image import tag_image
+from ._time_index import get_time_index
+
+
+# =================================================================================================
+#  Main functionality
+# =================================================================================================
+def watch_directory(
+    directory: Path,
+    model: str,
+    geolookup: Literal["off", "offline", "online"],
+    embedding_size: int,
+    recursive: bool,
+    debounce: float = WATCH_DEBOUNCE_SEC,
+    poll_interval: float = WATCH_POLL_INTERVAL_SEC,
+):
+    """
+    Continuously monitor a directory (or an entire catalog if recursive=True) and tag new or changed images as they
+    appear.  Changes are detected using inotify where available, falling back to periodic polling otherwise.  Bursts
+    of changes are debounced, after which only the affected directories are inspected, so the cost of each update is
+    independent of the size of the collection.  The persistent search indexes of each directory in which images were
+    tagged are brought up to date right away, such that searches do not have to do so.  Runs until interrupted.
+
+    :param directory: Path of the directory (or catalog root) to be watched.
+    :param model: Name of the model to use for tagging.
+    :param geolookup: How to resolve GPS coordinates into address/city info, see tag_image(...).
+    :param embedding_size: Size of the embeddings to be extracted.  0 means no embeddings are extracted.
+    :param recursive: If True, watch all folders below directory & keep the catalog manifest up to date.
+    :param debounce: Only start tagging after no new changes were seen for this many seconds.
+    :param poll_interval: Interval (in seconds) between scans, when falling back to polling.
+    """
+
+    # --- init --------------------------------------------
+    ensure_model_exists(model)
+    directories = discover_image_directories(directory, include_empty=True) if recursive else [directory]
+    known_shards = set(get_catalog(directory).shard_paths(directory)) if recursive else set()
+    change_source = _create_change_source(directory, directories, recursive, poll_interval)
+
+    def tag_changed_directories(changed_directories: set[Path]):
+        new_shards = []
+        for changed_directory in sorted(changed_directories):
+            n_tagged = _tag_pending_images(changed_directory, model, geolookup, embedding_size)
+            if n_tagged > 0:
+                _update_search_indexes(changed_directory, embedding_size)
+            if recursive and (n_tagged > 0) and (changed_directory not in known_shards):
+                new_shards.append(changed_directory)
+                known_shards.add(changed_directory)
+        if new_shards:
+            update_catalog(directory, new_shards=new_shards)
+            print(f"Added {len(new_shards)} new image folder(s) to the catalog.")
+
+    # --- main loop ---------------------------------------
+    try:
+        # catch up with anything that changed while we were not watching
+        tag_changed_directories(set(directories))
+        print(f"Watching {len(directories):_} folder(s) for new images [{change_source.name}]... (Ctrl+C to stop)")
+
+        while True:
+            # block until something changes, then keep collecting changes until things have settled down
+            changed_directories = change_source.wait(timeout=None)
+            t_first_change = time.monotonic()
+            while time.monotonic() - t_first_change < 10 * debounce:
+                more_changed_directories = change_source.wait(timeout=debounce)
+                if not more_changed_directories:
+                    break
+                changed_directories |= more_changed_directories
+
+            tag_changed_directories(changed_directories)
+    finally:
+        change_source.close()
+
+
+# =================================================================================================
+#  Helpers
+# =================================================================================================
+def _tag_pending_images(
+    directory: Path, model: str, geolookup: Literal["off", "offline", "online"], embedding_size: int
+) -> int:
+    """
+    Tag all images in directory without metadata or that changed after their metadata was written.  Images that can't
+    be tagged (e.g. truncated or unreadable files) are reported & skipped;  as they still have no (up-to-date)
+    metadata, they are retried on the next change in the directory.
+    :return: number of images that were tagged successfully.
+    """
+    pending_images = _find_pending_images(directory)
+    if not pending_images:
+        return 0
+
+    n_tagged = 0
+    for image_path in tqdm(
+        pending_images,
+        desc=f"Tagging {len(pending_images):_} new/changed image(s) in '{directory}'... ",
+        file=sys.stdout,
+        total=len(pending_images),
+    ):
+        try:
+            tag_image(image_path, get_metadata_path(image_path), model, geolookup, embedding_size)
+            n_tagged += 1
+        except Exception as e:
+            print(f"Error tagging image {image_path} (will be retried on the next change): {e}")
+    return n_tagged
+
+
+def _update_search_indexes(directory: Path, embedding_size: int):
+    """Bring the persistent time, geo & embedding indexes of the directory up to date (incrementally)."""
+    try:
+        get_time_index(directory)
+        get_geo_index(directory)
+        if embedding_size > 0:
+            get_embedding_index(directory)
+    except Exception as e:
+        print(f"Error updating search indexes of '{directory}' (will be updated on the next search): {e}")
+
+
+def _find_pending_images(directory: Path) -> list[Path]:
+    """Compare 1 listing of the directory with 1 listing of its metadata folder to determine what needs tagging."""
+    metadata_mtimes = {
+        filename: mtime for filename, (_, mtime) in _snapshot(directory / "metadata", image_files_only=False).items()
+    }
+    return sorted(
+        directory / filename
+        for filename, (_, mtime) in _snapshot(directory).items()
+        if metadata_mtimes.get(f"{filename}.json", -1) < mtime
+    )
+
+
+def _snapshot(directory: Path, image_files_only: bool = True) -> dict[str, tuple[int, int]]:
+    """Returns dict mapping filename -> (size, mtime_ns) for all (image) files in the directory."""
+    snapshot = dict()
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_file() and ((not image_files_only) or is_image_file(entry.name)):
+                    stat = entry.stat()
+                    snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+    except FileNotFoundError:
+        pass
+    return snapshot
+
+
+# =================================================================================================
+#  Change detection
+# =================================================================================================
+def _create_change_source(
+    root: Path, directories: list[Path], recursive: bool, poll_interval: float
+) -> "_ChangeSource":
+    if InotifyWatcher.is_supported():
+        try:
+            return _InotifyChangeSource(directories, recursive)
+        except OSError as e:
+            print(f"Could not set up inotify ({e}); falling back to polling.")
+    return _PollingChangeSource(root, directories, recursive, poll_interval)
+
+
+class _ChangeSource(ABC):
+    name: str
+
+    @abstractmethod
+    def wait(self, timeout: float | None) -> set[Path]:
+        """Wait at most timeout seconds (indefinitely if None) for changes & return the set of changed directories."""
+        raise NotImplementedError()
+
+    def close(self):
+        pass
+
+
+class _InotifyChangeSource(_ChangeSource):
+    name = "inotify"
+
+    def __init__(self, directories: list[Path], recursive: bool):
+        self._recursive = recursive
+        self._directories: set[Path] = set()
+        self._watcher = InotifyWatcher()
+        try:
+            for directory in directories:
+                self._add_directory(directory)
+        except OSError:
+            self._watcher.close()  # e.g. when running out of inotify watches
+            raise
+
+    def wait(self, timeout: float | None) -> set[Path]:
+        events = self._watcher.read_events(timeout)
+        if events is None:
+            return set(self._directories)  # event queue overflow -> everything might have changed
+
+        changed_directories = set()
+        for directory, name, is_dir in events:
+            if is_dir:
+                if self._recursive and not is_excluded_directory(name):
+                    # new (or moved-in) folder: watch it & everything below it, and inspect it right away,
+                    # since files might have been created before the watch was in place.
+                    for new_directory in discover_image_directories(directory / name, include_empty=True):
+                        self._add_directory(new_directory)
+                        changed_directories.add(new_directory)
+            elif is_image_file(name):
+                changed_directories.add(directory)
+        return changed_directories
+
+    def close(self):
+        self._watcher.close()
+
+    def _add_directory(self, directory: Path):
+        if directory not in self._directories:
+            self._watcher.add_watch(directory)
+            self._directories.add(directory)
+
+
+class _PollingChangeSource(_ChangeSource):
+    name = "polling"
+
+    def __init__(self, root: Path, directories: list[Path], recursive: bool, poll_interval: float):
+        self._root = root
+        self._recursive = recursive
+        self._poll_interval = poll_interval
+        self._snapshots = {directory: _snapshot(directory) for directory in directories}
+
+    def wait(self, timeout: float | None) -> set[Path]:
+        while True:
+            time.sleep(self._poll_interval if timeout is None else timeout)
+            changed_directories = self._poll()
+            if changed_directories or (timeout is not None):
+                return changed_directories
+
+    def _poll(self) -> set[Path]:
+        # determine directories to inspect, including new ones when recursive
+        directories = set(self._snapshots)
+        if self._recursive:
+            directories |= set(discover_image_directories(self._root, include_empty=True))
+
+        # compare snapshots
+        changed_directories = set()
+        for directory in directories:
+            snapshot = _snapshot(directory)
+            if snapshot != self._snapshots.get(directory, dict()):
+                changed_directories.add(directory)
+            self._snapshots[directory] = snapshot
+        return changed_directories
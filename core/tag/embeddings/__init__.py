@@ -8,7 +8,15 @@ Model Documentation:
     - https://arxiv.org/pdf/2506.18902
 """
 
-from ._compare import SimilarityMetric, compute_similarity
+from ._compare import (
+    SimilarityMetric,
+    compute_cosine_similarity_matrix,
+    compute_similar_pairs,
+    compute_similarity,
+    normalize_rows,
+)
 from ._from_image import construct_embedding_from_image
 from ._from_search_data import construct_embedding_from_search_data
-from ._from_text import construct_embedding_from_text
+from ._from_text import construct_embedding_from_text, construct_embeddings_from_texts
+from ._hugging_face import get_hugging_face_model, release_hugging_face_models
+from ._inference_profile import InferencePrecision, InferenceProfile, get_inference_profile, set_inference_profile
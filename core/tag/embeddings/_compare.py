@@ -35,6 +35,54 @@ def compute_cosine_similarity(e1: np.ndarray, e2: np.ndarray) -> float:
     return float(np.dot(e1_norm, e2_norm))
 
 
+def compute_cosine_similarity_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Compute all cosine similarities between the rows of 2 matrices, using a single matrix-matrix product.
+    :param a: (n, d)-matrix with n embeddings of dimension d.
+    :param b: (m, d)-matrix with m embeddings of dimension d.
+    :return: (n, m)-matrix with cosine similarities.
+    """
+    return normalize_rows(a) @ normalize_rows(b).T
+
+
+def compute_similar_pairs(
+    x: np.ndarray, min_similarity: float, block_size: int = 2048
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Find all pairs of rows of x with cosine similarity >= min_similarity.  The (n, n) similarity matrix is never
+    materialized; instead it is computed block by block (upper triangle only), such that memory use is bounded by
+    a (block_size, block_size)-matrix, on top of (a normalized float32 copy of) x itself.
+
+    :param x: (n, d)-matrix with n embeddings of dimension d.
+    :param min_similarity: Minimum cosine similarity for a pair to be returned.
+    :param block_size: Number of rows per block.
+    :return: tuple of 3 (p,)-arrays (i, j, similarity) for all p pairs found, with i < j.
+    """
+    x = normalize_rows(np.asarray(x, dtype=np.float32))
+    all_i, all_j, all_similarities = [], [], []
+    for start_i in range(0, x.shape[0], block_size):
+        block_i = x[start_i : start_i + block_size]
+        for start_j in range(start_i, x.shape[0], block_size):
+            similarities = block_i @ x[start_j : start_j + block_size].T
+            is_match = similarities >= min_similarity
+            if start_j == start_i:
+                is_match &= np.triu(np.ones_like(is_match), k=1)  # diagonal block: only pairs with i < j
+            i, j = np.nonzero(is_match)
+            all_i.append(i + start_i)
+            all_j.append(j + start_j)
+            all_similarities.append(similarities[i, j])
+
+    if not all_i:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    return np.concatenate(all_i), np.concatenate(all_j), np.concatenate(all_similarities)
+
+
+def normalize_rows(x: np.ndarray) -> np.ndarray:
+    """Scale all rows of x to unit L2-norm (all-zero rows are left untouched)."""
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return x / np.where(norms == 0, 1, norms)
+
+
 def compute_euclidean_distance(e1: np.ndarray, e2: np.ndarray) -> float:
     return float(np.linalg.norm(e1 - e2))
 
@@ -2,7 +2,7 @@ from pathlib import Path
 
 from core.data import Embedding, EmbeddingModel
 
-from ._hugging_face import get_hugging_face_model
+from ._hugging_face import get_hugging_face_model, inference_mode
 
 
 def construct_embedding_from_image(image_path: Path, embedding_model: EmbeddingModel) -> Embedding:
@@ -14,7 +14,10 @@ def construct_embedding_from_image(image_path: Path, embedding_model: EmbeddingM
     n = embedding_model.embedding_size
 
     # construct embedding with dimension 'n'
-    return Embedding(
-        model=embedding_model,
-        values=list(hf_model.encode_image(str(image_path.absolute()), truncate_dim=n, task="retrieval")),
-    )
+    with inference_mode():
+        return Embedding(
+            model=embedding_model,
+            values=list(
+                map(float, hf_model.encode_image(str(image_path.absolute()), truncate_dim=n, task="retrieval"))
+            ),
+        )
@@ -1,26 +1,36 @@
 from core.data import Embedding, EmbeddingModel
 
-from ._hugging_face import get_hugging_face_model
+from ._hugging_face import get_hugging_face_model, inference_mode
 
 
 def construct_embedding_from_text(text: str, embedding_model: EmbeddingModel, is_query: bool) -> Embedding:
     """
     Constructs an embedding from a given text using the specified embedding model.
     """
+    return construct_embeddings_from_texts([text], embedding_model, is_query)[0]
+
+
+def construct_embeddings_from_texts(
+    texts: list[str], embedding_model: EmbeddingModel, is_query: bool, text_only_model: bool = False
+) -> list[Embedding]:
+    """
+    Constructs embeddings for a list of texts using the specified embedding model, in a single batched call
+    to the model.  If text_only_model=True, a lighter, text-only version of the model is used, which is preferable
+    when we don't need image embeddings in the same process (e.g. when searching).
+    """
 
     # get model and embedding size
-    hf_model = get_hugging_face_model(embedding_model)
+    hf_model = get_hugging_face_model(embedding_model, text_only=text_only_model)
     n = embedding_model.embedding_size
 
-    # construct embedding with dimension 'n'
-    return Embedding(
-        model=embedding_model,
-        values=list(
-            hf_model.encode_text(
-                text,
+    # construct embeddings with dimension 'n'
+    with inference_mode():
+        return [
+            Embedding(model=embedding_model, values=list(map(float, values)))  # float(), also for bf16 tensors
+            for values in hf_model.encode_text(
+                texts,
                 truncate_dim=n,
                 task="retrieval",
                 prompt_name="query" if is_query else "passage",
             )
-        ),
-    )
+        ]
@@ -1,17 +1,32 @@
+"""
+Loading & caching of Hugging Face embedding models.  torch & transformers are only imported when a model is actually
+needed, such that functionality that only works with stored embeddings (e.g. query-by-example search) starts fast.
+"""
+
+import gc
 import os
+import time
+from contextlib import AbstractContextManager
 from functools import lru_cache
 
-import torch
-from transformers import AutoConfig, AutoModel
-from transformers.utils.logging import disable_progress_bar, set_verbosity_error
-
 from core.data import EmbeddingModel
 
+from ._inference_profile import InferencePrecision, InferenceProfile, get_inference_profile
+from ._model_snapshot import create_snapshot, get_snapshot_directory
 from ._tqdm_override import *
 
 
-def get_hugging_face_model(embedding_model: EmbeddingModel):
+def get_hugging_face_model(embedding_model: EmbeddingModel, text_only: bool = False):
+    """
+    Return the (cached) Hugging Face model for the given embedding model.
+
+    :param embedding_model: EmbeddingModel for which we need the Hugging Face model.
+    :param text_only: If True, a lighter model is returned, that can only be used for encode_text(...), e.g. for
+                        encoding search queries.
+    """
     # reduce console clutter upon first load
+    from transformers.utils.logging import disable_progress_bar, set_verbosity_error
+
     set_verbosity_error()
     disable_progress_bar()
     os.environ["TRANSFORMERS_NO_TQDM"] = "1"
@@ -19,33 +34,179 @@ def get_hugging_face_model(embedding_model: EmbeddingModel):
     # return appropriate model
     match embedding_model.hugging_face_model_id:
         case "jinaai/jina-embeddings-v4":
-            return get_jina_embeddings_v4_model()
+            if text_only:
+                return get_jina_embeddings_v4_text_model(get_inference_profile())
+            else:
+                return get_jina_embeddings_v4_model(get_inference_profile())
         case _:
             raise ValueError(f"Unsupported Hugging Face model ID: {embedding_model.hugging_face_model_id}")
 
 
+def release_hugging_face_models():
+    """Release all cached models, e.g. before loading the same model with a different inference profile."""
+    get_jina_embeddings_v4_model.cache_clear()
+    get_jina_embeddings_v4_text_model.cache_clear()
+    gc.collect()
+
+
+def inference_mode() -> AbstractContextManager:
+    """Context manager to wrap model calls in, disabling autograd tracking & version counting."""
+    import torch
+
+    return torch.inference_mode()
+
+
+# =================================================================================================
+#  Jina Embeddings v4
+# =================================================================================================
 @lru_cache(maxsize=1)
-def get_jina_embeddings_v4_model():
-    model_id = "jinaai/jina-embeddings-v4"
+def get_jina_embeddings_v4_model(profile: InferenceProfile = InferenceProfile()):
+    import torch
+
+    device = _get_device()
+    if device == "cpu":
+        model = _load_jina_embeddings_v4(device, torch_dtype=_get_cpu_torch_dtype(profile))
+        model = _apply_cpu_inference_profile(model, profile)
+    else:
+        model = _load_jina_embeddings_v4(device)
+    return model
+
+
+@lru_cache(maxsize=1)
+def get_jina_embeddings_v4_text_model(profile: InferenceProfile = InferenceProfile()):
+    """
+    Lightweight version of the jina-embeddings-v4 model, for text-only use (e.g. encoding search queries):
+      - weights are loaded directly in reduced precision (bf16 on cuda, fp16 on mps), halving memory use vs. fp32;
+        on cpu, they are loaded in the precision of the inference profile instead (fp32 for int8, which is quantized
+        after loading), the same way as for the full model
+      - weights are loaded with low_cpu_mem_usage, avoiding a second (randomly initialized) copy of the model
+      - the vision tower is released right after loading, since it is never used for text embeddings
+
+    Text embeddings are produced by exactly the same (language model + adapter) weights as with the full model,
+    so results match those of the full model, up to the precision in which they are computed.
+    """
+    import torch
+
+    device = _get_device()
+    match device:
+        case "cpu":
+            torch_dtype = _get_cpu_torch_dtype(profile)
+        case "mps":
+            torch_dtype = torch.float16
+        case _:
+            torch_dtype = torch.bfloat16
+    model = _load_jina_embeddings_v4(device, torch_dtype=torch_dtype, low_cpu_mem_usage=True)
+    _release_vision_modules(model)
+    if device == "cpu":
+        model = _apply_cpu_inference_profile(model, profile)
+    return model
+
+
+def _get_device() -> str:
+    import torch
+
     if torch.cuda.is_available():
+        return "cuda"
+    elif torch.backends.mps.is_available():
+        return "mps"
+    else:
+        return "cpu"
+
+
+def _get_cpu_torch_dtype(profile: InferenceProfile):
+    """dtype to load weights in on cpu:  directly that of the profile (int8 is quantized after loading in fp32)."""
+    import torch
+
+    return torch.bfloat16 if profile.precision == InferencePrecision.BF16 else torch.float32
+
+
+def _load_jina_embeddings_v4(device: str, **kwargs):
+    """
+    Load the model, from its warm-start snapshot if available (see _model_snapshot.py), otherwise from the Hugging Face
+    hub (cache), after which a snapshot is created for the next time.
+    """
+    from transformers import AutoConfig, AutoModel
+
+    model_id = "jinaai/jina-embeddings-v4"
+    t_start = time.perf_counter()
+    snapshot_directory = get_snapshot_directory(model_id, kwargs.get("torch_dtype"))
+    warm_start = (snapshot_directory is not None) and snapshot_directory.is_dir()
+    if warm_start:
+        # snapshot only needs local files & its weights are memory-mapped (already in the right dtype)
+        model_path, kwargs = str(snapshot_directory), dict(kwargs, local_files_only=True, low_cpu_mem_usage=True)
+    else:
+        model_path = model_id
+
+    if device == "cuda":
         # CUDA available, we can use flash attention
         model = AutoModel.from_pretrained(
-            model_id,
+            model_path,
             trust_remote_code=True,
+            **kwargs,
         )
-        model.to("cuda")
-        return model
     else:
         # CUDA not available, we can't use flash attention,
         # so we fall back to SDPA (scaled dot product attention), which we need to configure
         # in two different places to avoid errors.
-        config = AutoConfig.from_pretrained(model_id, trust_remote_code=True)
+        config = AutoConfig.from_pretrained(
+            model_path, trust_remote_code=True, local_files_only=kwargs.get("local_files_only", False)
+        )
         config._attn_implementation = "sdpa"
         config.text_config._attn_implementation = "sdpa"
         model = AutoModel.from_pretrained(
-            model_id,
+            model_path,
             trust_remote_code=True,
             config=config,
+            **kwargs,
         )
-        model.to("mps" if torch.backends.mps.is_available() else "cpu")
-        return model
+    model.to(device)
+    print(
+        f"Loaded embedding model '{model_id}' in {time.perf_counter() - t_start:.1f} sec "
+        + ("(warm start)." if warm_start else "(cold start).")
+    )
+
+    # create warm-start snapshot for the next time
+    if not warm_start:
+        try:
+            snapshot_directory = get_snapshot_directory(model_id, kwargs.get("torch_dtype"))
+            if snapshot_directory is not None:
+                create_snapshot(model_id, snapshot_directory, kwargs.get("torch_dtype"))
+        except Exception as e:
+            print(f"Could not create warm-start snapshot of '{model_id}': {e}")
+    return model
+
+
+def _release_vision_modules(model):
+    """Release the vision tower of a (Qwen2.5-VL-based) model, which is only used when encoding images."""
+    vision_modules = [name for name, _ in model.named_modules() if name.split(".")[-1] == "visual"]
+    for name in vision_modules:
+        parent_name, _, attr_name = name.rpartition(".")
+        setattr(model.get_submodule(parent_name), attr_name, None)
+    gc.collect()
+
+
+def _apply_cpu_inference_profile(model, profile: InferenceProfile):
+    """Configure torch threading & convert model to the precision of the profile."""
+    import torch
+
+    # --- threads -----------------------------------------
+    if profile.num_threads:
+        torch.set_num_threads(profile.num_threads)
+    if profile.num_interop_threads:
+        try:
+            torch.set_num_interop_threads(profile.num_interop_threads)
+        except RuntimeError:
+            # can only be set once & before any inter-op parallel work was started
+            print(f"Could not set # of inter-op threads; using {torch.get_num_interop_threads()}.")
+
+    # --- precision ---------------------------------------
+    model.eval()
+    match profile.precision:
+        case InferencePrecision.FP32:
+            return model
+        case InferencePrecision.BF16:
+            return model.to(torch.bfloat16)
+        case InferencePrecision.INT8:
+            return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        case _:
+            raise ValueError(f"Unsupported inference precision: {profile.precision}")
@@ -0,0 +1,159 @@
+"""
+Warm-start snapshots of Hugging Face models:  a local copy of the model repository (remote code, config, processor &
+adapter files), with the weights already converted to the dtype they are loaded in.  Loading from a snapshot needs no
+hub access (remote code & config are resolved from local files) and memory-maps the safetensors weights, which need no
+dtype conversion, so no intermediate (e.g. fp32) copy of the model is materialized.
+
+Snapshots are created right after the first (cold) load of a model & are specific to the hub revision that was
+loaded, so a model update on the hub results in a new snapshot, after which those of older revisions are removed.
+Snapshots take as much disk space as the model in the snapshot dtype, so they are skipped if there is not enough free
+space, and can be disabled altogether (see MODEL_SNAPSHOTS_ENABLED).
+"""
+
+import json
+import os
+import shutil
+import struct
+from pathlib import Path
+
+from core.config import MODEL_SNAPSHOT_DIR, MODEL_SNAPSHOTS_ENABLED
+
+_FREE_SPACE_MARGIN = 1.1  # only create a snapshot if there is 10% more free disk space than its (estimated) size
+
+
+def get_snapshot_directory(model_id: str, torch_dtype=None) -> Path | None:
+    """
+    Return the directory of the snapshot of the locally cached revision of the model, in the given dtype (None = that
+    of the checkpoint), or None if the model is not in the local hub cache (yet) or snapshots are disabled.  The
+    directory might not exist yet.
+    """
+    if not MODEL_SNAPSHOTS_ENABLED:
+        return None
+
+    from huggingface_hub import snapshot_download
+    from huggingface_hub.errors import LocalEntryNotFoundError
+
+    try:
+        hub_directory = Path(snapshot_download(model_id, local_files_only=True))
+    except LocalEntryNotFoundError:
+        return None
+    revision = hub_directory.name  # hub cache layout: .../snapshots/<commit hash>
+    return MODEL_SNAPSHOT_DIR / f"{_snapshot_prefix(model_id)}--{revision[:12]}--{_dtype_name(torch_dtype)}"
+
+
+def create_snapshot(model_id: str, snapshot_directory: Path, torch_dtype=None):
+    """
+    Create the snapshot of the locally cached revision of the model (see get_snapshot_directory), converting all
+    weights of the base model to torch_dtype.  The snapshot is written to a temporary directory first & then renamed,
+    such that (concurrent) loaders never see a partially written snapshot.
+    """
+    from huggingface_hub import snapshot_download
+    from safetensors import safe_open
+    from safetensors.torch import save_file
+
+    hub_directory = Path(snapshot_download(model_id, local_files_only=True))
+
+    # check disk space
+    snapshot_directory.parent.mkdir(parents=True, exist_ok=True)
+    size = _estimate_snapshot_size(hub_directory, torch_dtype)
+    free = shutil.disk_usage(snapshot_directory.parent).free
+    if free < _FREE_SPACE_MARGIN * size:
+        print(
+            f"Not creating warm-start snapshot of '{model_id}': needs {size / 1e9:.1f}GB, "
+            + f"but only {free / 1e9:.1f}GB free in '{snapshot_directory.parent}'."
+        )
+        return
+    print(
+        f"Creating warm-start snapshot of '{model_id}' ({size / 1e9:.1f}GB) in '{snapshot_directory}'... "
+        + "(disable with IMAGE_SEARCH_MODEL_SNAPSHOTS=0)"
+    )
+
+    tmp_directory = snapshot_directory.with_name(f".{snapshot_directory.name}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp_directory, ignore_errors=True)
+
+    # copy all files, except the weights of the base model, which are converted
+    shutil.copytree(hub_directory, tmp_directory, ignore=shutil.ignore_patterns("*.safetensors"))
+    for weights_path in hub_directory.rglob("*.safetensors"):
+        snapshot_weights_path = tmp_directory / weights_path.relative_to(hub_directory)
+        if (torch_dtype is None) or (weights_path.parent != hub_directory):
+            shutil.copyfile(weights_path, snapshot_weights_path)  # checkpoint dtype, or adapters (kept as-is)
+            continue
+        with safe_open(weights_path, framework="pt") as weights:  # 1 shard at a time, to bound memory use
+            tensors = {name: _to_dtype(weights.get_tensor(name), torch_dtype) for name in weights.keys()}
+            save_file(tensors, snapshot_weights_path, metadata=weights.metadata())
+
+    # record the dtype in the config, such that it is also used when loading without explicit torch_dtype
+    if torch_dtype is not None:
+        config_path = tmp_directory / "config.json"
+        config = json.loads(config_path.read_text())
+        config["torch_dtype"] = _dtype_name(torch_dtype)
+        config_path.write_text(json.dumps(config, indent=2))
+
+    try:
+        os.rename(tmp_directory, snapshot_directory)
+    except OSError:
+        shutil.rmtree(tmp_directory, ignore_errors=True)  # created concurrently by another process
+        return
+    _remove_stale_snapshots(model_id, snapshot_directory)
+
+
+def _remove_stale_snapshots(model_id: str, snapshot_directory: Path):
+    """
+    Remove snapshots of other (i.e. older) revisions of the model than that of snapshot_directory, in any dtype.
+    Snapshots of the same revision in other dtypes are kept, since they are in use (e.g. full model vs text-only).
+    """
+    prefix = _snapshot_prefix(model_id)
+    revision = snapshot_directory.name.removeprefix(f"{prefix}--").split("--")[0]
+    for directory in MODEL_SNAPSHOT_DIR.glob(f"{prefix}--*"):
+        if directory.is_dir() and not directory.name.startswith(f"{prefix}--{revision}--"):
+            print(f"Removing warm-start snapshot of previous revision: '{directory}'.")
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def _estimate_snapshot_size(hub_directory: Path, torch_dtype=None) -> int:
+    """Size (in bytes) of the snapshot of the hub directory, with floating point weights of the base model converted."""
+    size = 0
+    for path in hub_directory.rglob("*"):
+        if not path.is_file():
+            continue
+        if (torch_dtype is None) or (path.suffix != ".safetensors") or (path.parent != hub_directory):
+            size += path.stat().st_size
+        else:
+            size += _converted_safetensors_size(path, torch_dtype)
+    return size
+
+
+def _converted_safetensors_size(path: Path, torch_dtype) -> int:
+    """Size of the tensors in a safetensors file after converting floating point ones, based on its header only."""
+    import torch
+
+    with open(path, "rb") as f:
+        (header_size,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_size))
+
+    size = 8 + header_size
+    item_size = torch.empty(0, dtype=torch_dtype).element_size()
+    for name, info in header.items():
+        if name == "__metadata__":
+            continue
+        begin, end = info["data_offsets"]
+        if info["dtype"] in ("F64", "F32", "F16", "BF16"):
+            n_items = 1
+            for dim in info["shape"]:
+                n_items *= dim
+            size += n_items * item_size
+        else:
+            size += end - begin
+    return size
+
+
+def _snapshot_prefix(model_id: str) -> str:
+    return model_id.replace("/", "--")
+
+
+def _to_dtype(tensor, torch_dtype):
+    return tensor.to(torch_dtype) if tensor.is_floating_point() else tensor
+
+
+def _dtype_name(torch_dtype) -> str:
+    return "auto" if torch_dtype is None else str(torch_dtype).removeprefix("torch.")
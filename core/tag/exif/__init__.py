@@ -1 +1,2 @@
 from ._exif import extract_time_and_location
+from ._exif_reader import ExifData, prefetch_exif, read_exif, read_exif_concurrently, report_exif_failures
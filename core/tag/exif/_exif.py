@@ -2,15 +2,15 @@
 General functions for extracting EXIF data from images and resolving this into huma-readable text.
 """
 
-from datetime import datetime
 from pathlib import Path
 from typing import Literal
 
 import reverse_geocode
-from exif import Image
 
+from core.cache import artifact_key, get_artifact_cache
 from core.data import LocationInfo, TimeInfo
 
+from ._exif_reader import read_exif
 from ._geocode import reverse_geocode_offline, reverse_geocode_online
 
 
@@ -18,56 +18,42 @@ def extract_time_and_location(
     image_path: Path, geolookup: Literal["off", "offline", "online"]
 ) -> tuple[TimeInfo | None, LocationInfo | None]:
     """
-    Returns the time and location of the image as a tuple of TimeInfo and LocationInfo.
+    Returns the time and location of the image as a tuple of TimeInfo and LocationInfo, see read_exif(...).
     """
-    time_info: TimeInfo | None = None
-    location_info: LocationInfo | None = None
-    try:
-        with open(image_path, "rb") as image_file:
-            img = Image(image_file)
-
-        if img.has_exif:
-            # Extract datetime
-            dt_str = (
-                img.get("datetime", None) or img.get("datetime_original", None) or img.get("datetime_digitized", None)
-            )
-            if dt_str:
-                time_info = TimeInfo(dt=datetime.strptime(dt_str, "%Y:%m:%d %H:%M:%S"))
+    exif_data = read_exif(image_path)
 
-            # Extract GPS coordinates & reverse geocode if needed
-            lat, lon = get_lon_lat_as_float(img)
-            if (lat is not None) and (lon is not None) and (geolookup != "off"):
-                if geolookup == "offline":
-                    location_info = reverse_geocode_offline(lat, lon)
-                else:
-                    location_info = reverse_geocode_online(lat, lon)
-            else:
-                location_info = LocationInfo(lat=lat, lon=lon)
+    # Extract datetime
+    time_info = TimeInfo(dt=exif_data.dt) if exif_data.dt is not None else None
 
-    except Exception:
-        pass
+    # Extract GPS coordinates & reverse geocode if needed
+    location_info: LocationInfo | None = None
+    if (exif_data.lat is not None) and (exif_data.lon is not None):
+        if geolookup != "off":
+            location_info = _reverse_geocode_cached(exif_data.lat, exif_data.lon, geolookup)
+        else:
+            location_info = LocationInfo(lat=exif_data.lat, lon=exif_data.lon)
 
     # return the datetime and latitude/longitude as a tuple
     return time_info, location_info
 
 
-def get_lon_lat_as_float(img: Image) -> tuple[float, float]:
-    lat_deg, lat_min, lat_sec = img.get("gps_latitude", None)
-    lat_ref = img.get("gps_latitude_ref", "N")
-    lon_deg, lon_min, lon_sec = img.get("gps_longitude", None)
-    lon_ref = img.get("gps_longitude_ref", "E")
-
-    # convert (degrees, minutes, seconds) to decimal degrees
-    lat = lat_deg + (lat_min / 60) + (lat_sec / 3600)
-    if lat_ref == "S":
-        lat = -lat
+def _reverse_geocode_cached(lat: float, lon: float, geolookup: Literal["offline", "online"]) -> LocationInfo:
+    """Reverse geocode using the global artifact cache.  Failed lookups (returning only lat/lon) are not cached."""
+    cache = get_artifact_cache()
+    key = artifact_key("geocode", geolookup, f"{lat:.6f}", f"{lon:.6f}")
+    if cache is not None:
+        cached_location = cache.get(key)
+        if cached_location is not None:
+            return LocationInfo.model_validate(cached_location)
 
-    # convert (degrees, minutes, seconds) to decimal degrees
-    lon = lon_deg + (lon_min / 60) + (lon_sec / 3600)
-    if lon_ref == "W":
-        lon = -lon
+    if geolookup == "offline":
+        location_info = reverse_geocode_offline(lat, lon)
+    else:
+        location_info = reverse_geocode_online(lat, lon)
 
-    return lat, lon
+    if (cache is not None) and location_info.country:
+        cache.put(key, location_info.model_dump())
+    return location_info
 
 
 def resolve_coordinates(lat: float, lon: float) -> tuple[str, str, str]:
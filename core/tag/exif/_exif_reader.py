@@ -0,0 +1,224 @@
+"""
+Header-only EXIF reader:  only the APP1 segment of JPEG files (which precedes the image data) is read & parsed, instead
+of the entire file, which matters for large images on slow (network) storage.  Results are cached in memory, keyed by
+(path, size, modification time), and can be read for many images at once using a thread pool, such that storage
+latency is hidden.  Images whose EXIF data can't be parsed are not silently ignored, but reported (see ExifData.error).
+"""
+
+from __future__ import annotations
+
+import os
+import struct
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator
+
+from core.config import EXIF_CACHE_MAX_ENTRIES, EXIF_READ_WORKERS
+
+# TIFF tags (see EXIF 2.3 specification)
+_TAG_DATETIME = 0x0132
+_TAG_EXIF_IFD = 0x8769
+_TAG_GPS_IFD = 0x8825
+_TAG_DATETIME_ORIGINAL = 0x9003
+_TAG_DATETIME_DIGITIZED = 0x9004
+_TAG_GPS_LATITUDE_REF = 0x0001
+_TAG_GPS_LATITUDE = 0x0002
+_TAG_GPS_LONGITUDE_REF = 0x0003
+_TAG_GPS_LONGITUDE = 0x0004
+
+# TIFF field type -> (struct format, size in bytes)
+_TIFF_TYPES = {
+    1: ("B", 1),
+    2: ("s", 1),
+    3: ("H", 2),
+    4: ("I", 4),
+    5: ("II", 8),
+    7: ("s", 1),
+    9: ("i", 4),
+    10: ("ii", 8),
+    13: ("I", 4),
+}
+
+
+# =================================================================================================
+#  Reading
+# =================================================================================================
+@dataclass(frozen=True)
+class ExifData:
+    dt: datetime | None = None  # time the image was taken
+    lat: float | None = None  # GPS coordinates (decimal degrees)
+    lon: float | None = None
+    error: str | None = None  # why the EXIF data could not be parsed;  None if it was parsed or if there is none
+
+
+def read_exif(image_path: Path) -> ExifData:
+    """Return the EXIF data of an image, reading only its header & using the in-memory cache if possible."""
+    try:
+        stat = os.stat(image_path)
+    except OSError as e:
+        return ExifData(error=str(e))
+
+    key = (str(image_path), stat.st_size, stat.st_mtime_ns)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    exif_data = _read_exif_uncached(image_path)
+
+    with _cache_lock:
+        _cache[key] = exif_data
+        while len(_cache) > EXIF_CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)  # least-recently used
+    return exif_data
+
+
+def read_exif_concurrently(image_paths: list[Path], max_workers: int = EXIF_READ_WORKERS) -> Iterator[ExifData]:
+    """Yield the EXIF data of all images (in the given order), reading them using max_workers threads."""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        yield from executor.map(read_exif, image_paths)
+
+
+def prefetch_exif(image_paths: Iterable[Path], max_workers: int = EXIF_READ_WORKERS) -> Iterator[Path]:
+    """
+    Pass through the (possibly streamed) images, while reading the EXIF data of the next ones (up to 4*max_workers
+    ahead) into the cache in the background, such that read_exif(...) is a cache hit by the time they're processed.
+    """
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        ahead = deque()
+        for image_path in image_paths:
+            executor.submit(read_exif, image_path)
+            ahead.append(image_path)
+            if len(ahead) > 4 * max_workers:
+                yield ahead.popleft()
+        while ahead:
+            yield ahead.popleft()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=bool(ahead))  # only cancel reads if we were stopped early
+
+
+def report_exif_failures(failures: list[tuple[Path, str]]):
+    """Print how many images had EXIF data that could not be parsed (if any), with an example."""
+    if failures:
+        image_path, error = failures[0]
+        print(f"EXIF data of {len(failures):_} image(s) could not be parsed, e.g. '{image_path.name}': {error}")
+
+
+_cache: OrderedDict[tuple[str, int, int], ExifData] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+# =================================================================================================
+#  Parsing
+# =================================================================================================
+def _read_exif_uncached(image_path: Path) -> ExifData:
+    try:
+        with open(image_path, "rb") as f:
+            tiff = _read_jpeg_exif_segment(f)
+    except Exception as e:
+        return ExifData(error=f"invalid JPEG header ({e!r})")
+    if tiff is None:
+        return ExifData()  # no EXIF data (e.g. PNG, or JPEG without APP1 Exif segment)
+
+    try:
+        return _parse_tiff(tiff)
+    except Exception as e:
+        return ExifData(error=f"invalid EXIF data ({e!r})")
+
+
+def _read_jpeg_exif_segment(f: BinaryIO) -> bytes | None:
+    """Return the TIFF structure of the APP1 Exif segment, or None if the file is no JPEG or has no such segment."""
+    if f.read(2) != b"\xff\xd8":
+        return None
+    while True:
+        marker = f.read(2)
+        if (len(marker) != 2) or (marker[0] != 0xFF):
+            raise ValueError("unexpected end of header")
+        marker_type = marker[1]
+        while marker_type == 0xFF:  # fill bytes
+            marker_type = f.read(1)[0]
+        if marker_type in (0xD9, 0xDA):
+            return None  # end of image / start of scan, i.e. end of header
+        if (0xD0 <= marker_type <= 0xD7) or (marker_type == 0x01):
+            continue  # markers without segment
+        (length,) = struct.unpack(">H", f.read(2))
+        if marker_type == 0xE1:
+            segment = f.read(length - 2)
+            if len(segment) != length - 2:
+                raise ValueError("truncated APP1 segment")
+            if segment.startswith(b"Exif\x00\x00"):
+                return segment[6:]
+        else:
+            f.seek(length - 2, os.SEEK_CUR)
+
+
+def _parse_tiff(tiff: bytes) -> ExifData:
+    byte_order = {b"II": "<", b"MM": ">"}.get(tiff[:2])
+    if byte_order is None:
+        raise ValueError("invalid TIFF byte order")
+    magic, ifd0_offset = struct.unpack(byte_order + "HI", tiff[2:8])
+    if magic != 42:
+        raise ValueError("invalid TIFF header")
+
+    ifd0 = _read_ifd(tiff, ifd0_offset, byte_order)
+    exif_ifd = _read_ifd(tiff, ifd0[_TAG_EXIF_IFD][0], byte_order) if _TAG_EXIF_IFD in ifd0 else dict()
+    gps_ifd = _read_ifd(tiff, ifd0[_TAG_GPS_IFD][0], byte_order) if _TAG_GPS_IFD in ifd0 else dict()
+
+    # datetime:  first valid one of DateTime, DateTimeOriginal & DateTimeDigitized
+    dt, error = None, None
+    for dt_str in (
+        ifd0.get(_TAG_DATETIME),
+        exif_ifd.get(_TAG_DATETIME_ORIGINAL),
+        exif_ifd.get(_TAG_DATETIME_DIGITIZED),
+    ):
+        if (not dt_str) or (dt_str.strip(" :0") == ""):
+            continue  # absent or blank (cameras without clock write e.g. '0000:00:00 00:00:00')
+        try:
+            dt = datetime.strptime(dt_str, "%Y:%m:%d %H:%M:%S")
+            break
+        except ValueError:
+            error = f"invalid date '{dt_str}'"
+
+    # GPS coordinates
+    lat = _to_degrees(gps_ifd.get(_TAG_GPS_LATITUDE), gps_ifd.get(_TAG_GPS_LATITUDE_REF), "S")
+    lon = _to_degrees(gps_ifd.get(_TAG_GPS_LONGITUDE), gps_ifd.get(_TAG_GPS_LONGITUDE_REF), "W")
+    if (lat is None) or (lon is None):
+        lat, lon = None, None
+
+    return ExifData(dt=dt, lat=lat, lon=lon, error=error if dt is None else None)
+
+
+def _read_ifd(tiff: bytes, offset: int, byte_order: str) -> dict[int, str | tuple]:
+    """Return tag -> value for all entries of the IFD at the given offset (ASCII values as str, others as tuples)."""
+    (n_entries,) = struct.unpack_from(byte_order + "H", tiff, offset)
+    entries = dict()
+    for i in range(n_entries):
+        tag, field_type, count = struct.unpack_from(byte_order + "HHI", tiff, offset + 2 + 12 * i)
+        if field_type not in _TIFF_TYPES:
+            continue  # e.g. floats, which we don't need
+        fmt, size = _TIFF_TYPES[field_type]
+        value_offset = offset + 2 + 12 * i + 8  # values of at most 4 bytes are stored inline
+        if size * count > 4:
+            (value_offset,) = struct.unpack_from(byte_order + "I", tiff, value_offset)
+        if value_offset + size * count > len(tiff):
+            raise ValueError(f"value of tag 0x{tag:04x} out of bounds")
+        if fmt == "s":
+            value = tiff[value_offset : value_offset + count].split(b"\x00")[0].decode("ascii", errors="replace")
+        else:
+            value = struct.unpack_from(byte_order + fmt * count, tiff, value_offset)
+        entries[tag] = value
+    return entries
+
+
+def _to_degrees(dms: tuple | None, ref: str | None, negative_ref: str) -> float | None:
+    """Convert (degrees, minutes, seconds) rationals to decimal degrees;  None if absent or incomplete (e.g. 0/0)."""
+    if (dms is None) or (len(dms) != 6) or (0 in dms[1::2]):
+        return None
+    degrees, minutes, seconds = (dms[k] / dms[k + 1] for k in range(0, 6, 2))
+    value = degrees + (minutes / 60) + (seconds / 3600)
+    return -value if (ref or "").strip().upper() == negative_ref else value
@@ -4,24 +4,299 @@ This is the main file of the image search application.  We provide a CLI using t
 Run python image_search.py --help to see the available commands.
 """
 
+import sys
+import time
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Literal
+from typing import Callable, Literal
 
 import click
 
 import core
-from core.config import DEFAULT_LLM_MODEL_TEXT_IMAGE
+from core.cache import set_artifact_cache
+from core.catalog import get_catalog
+from core.config import (
+    ARTIFACT_CACHE_DIR,
+    ARTIFACT_CACHE_MAX_SIZE_MB,
+    DEFAULT_DUPLICATE_MIN_SIMILARITY,
+    DEFAULT_LLM_MODEL_FAST,
+    DEFAULT_LLM_MODEL_TEXT_IMAGE,
+    DEFAULT_SIMILAR_IMAGES_MIN_SCORE,
+    LLM_MAX_TOKENS_DESCRIPTION,
+    LLM_MAX_TOKENS_TAGS,
+    LLM_STOP_AFTER_TAGS,
+    WATCH_DEBOUNCE_SEC,
+)
+from core.data import GeoFilter, TimeFilter
+from core.models import OllamaEndpoint, set_ollama_endpoints
+from core.search import ScoringMode, VectorQuantization, read_ground_truth
+from core.tag import GenerationOptions, TagOrder, TagSchedule, set_generation_options
+from core.tag.embeddings import InferencePrecision, InferenceProfile, get_inference_profile, set_inference_profile
 
 
 # -------------------------------------------------------------------------
 #  CLI entrypoint
 # -------------------------------------------------------------------------
 @click.group()
-def cli():
+@click.option(
+    "--precision",
+    type=click.Choice([p.value for p in InferencePrecision]),
+    default=InferencePrecision.FP32.value,
+    required=False,
+    help="Precision of the embedding model when running on CPU: fp32 (default), bf16 or dynamic int8 quantization.",
+)
+@click.option(
+    "--threads",
+    type=int,
+    default=None,
+    required=False,
+    help="Number of intra-op threads used by the embedding model when running on CPU (default: torch default).",
+)
+@click.option(
+    "--interop-threads",
+    type=int,
+    default=None,
+    required=False,
+    help="Number of inter-op threads used by the embedding model when running on CPU (default: torch default).",
+)
+@click.option(
+    "--cache-dir",
+    default=str(ARTIFACT_CACHE_DIR) if ARTIFACT_CACHE_DIR else None,
+    required=False,
+    help="Directory of the global cache of LLM outputs, embeddings & geocodes, which is only used if provided "
+    + "(default: $IMAGE_SEARCH_CACHE_DIR, if set).",
+)
+@click.option(
+    "--cache-size-mb",
+    type=float,
+    default=ARTIFACT_CACHE_MAX_SIZE_MB,
+    required=False,
+    help=f"Max size of the global cache in MB (default: {ARTIFACT_CACHE_MAX_SIZE_MB}).  0 disables the cache.  "
+    + "Only used in combination with --cache-dir.",
+)
+@click.option(
+    "--ollama-hosts",
+    default=None,
+    required=False,
+    help="Comma-separated Ollama endpoints to distribute tagging over, each with an optional weight (max concurrent "
+    + "requests), e.g. 'http://gpu1:11434=2,http://gpu2:11434' (default: the default Ollama host only).",
+)
+@click.option(
+    "--max-tokens-description",
+    type=int,
+    default=LLM_MAX_TOKENS_DESCRIPTION,
+    required=False,
+    help=f"Max number of tokens the LLM may generate for a description (default: {LLM_MAX_TOKENS_DESCRIPTION}).  "
+    + "0 means unbounded.",
+)
+@click.option(
+    "--max-tokens-tags",
+    type=int,
+    default=LLM_MAX_TOKENS_TAGS,
+    required=False,
+    help=f"Max number of tokens the LLM may generate for tags (default: {LLM_MAX_TOKENS_TAGS}).  0 means unbounded.",
+)
+@click.option(
+    "--stop-after-tags",
+    type=int,
+    default=LLM_STOP_AFTER_TAGS,
+    required=False,
+    help=f"Stop LLM generation as soon as this many distinct tags were received (default: {LLM_STOP_AFTER_TAGS}).  "
+    + "0 means never stop early.",
+)
+@click.option(
+    "--context-size",
+    type=int,
+    default=None,
+    required=False,
+    help="Context window size (num_ctx) of LLM requests (default: model default).",
+)
+def cli(
+    precision: str,
+    threads: int | None,
+    interop_threads: int | None,
+    cache_dir: str | None,
+    cache_size_mb: float,
+    ollama_hosts: str | None,
+    max_tokens_description: int,
+    max_tokens_tags: int,
+    stop_after_tags: int,
+    context_size: int | None,
+):
     """
     Command-line tool for tagging & searching collections of images, using Multi-Modal LLMs.
     """
-    pass
+    set_artifact_cache(Path(cache_dir) if cache_dir else None, cache_size_mb)
+    if cache_dir and (cache_size_mb > 0):
+        print(f"Using artifact cache in '{Path(cache_dir).resolve()}' (max {cache_size_mb:_g} MB).")
+    if ollama_hosts:
+        try:
+            set_ollama_endpoints([OllamaEndpoint.parse(spec) for spec in ollama_hosts.split(",") if spec.strip()])
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint="--ollama-hosts")
+    set_generation_options(
+        GenerationOptions(
+            max_tokens_description=max_tokens_description,
+            max_tokens_tags=max_tokens_tags,
+            stop_after_tags=stop_after_tags,
+            context_size=context_size,
+        )
+    )
+    set_inference_profile(
+        InferenceProfile(
+            precision=InferencePrecision(precision),
+            num_threads=threads,
+            num_interop_threads=interop_threads,
+        )
+    )
+
+
+# -------------------------------------------------------------------------
+#  Shared options
+# -------------------------------------------------------------------------
+_WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+_MONTHS = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+
+
+def _time_filter_options(command):
+    """Add --from, --to, --weekdays & --months options to a search command; see _get_time_filter."""
+    date_type = click.DateTime(formats=["%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S"])
+    for option in reversed(
+        [
+            click.option(
+                "--from", "from_date", type=date_type, default=None, help="Only images taken at or after this date."
+            ),
+            click.option(
+                "--to",
+                "to_date",
+                type=date_type,
+                default=None,
+                help="Only images taken before or on this date (whole day included, if no time is given).",
+            ),
+            click.option(
+                "--weekdays",
+                default=None,
+                help="Only images taken on these weekdays, e.g. 'sat,sun' (comma-separated).",
+            ),
+            click.option(
+                "--months", default=None, help="Only images taken in these months, e.g. 'jun,jul,aug' or '6,7,8'."
+            ),
+        ]
+    ):
+        command = option(command)
+    return command
+
+
+def _get_time_filter(
+    from_date: datetime | None, to_date: datetime | None, weekdays: str | None, months: str | None
+) -> TimeFilter:
+    if (to_date is not None) and (to_date.time() == datetime.min.time()):
+        to_date += timedelta(days=1)  # date without time -> include entire day
+    return TimeFilter(
+        start=from_date,
+        end=to_date,
+        weekdays=_parse_names(weekdays, _WEEKDAYS, "--weekdays", first=0) if weekdays else None,
+        months=_parse_names(months, _MONTHS, "--months", first=1) if months else None,
+    )
+
+
+def _geo_filter_options(command):
+    """Add --near, --radius-km & --bbox options to a search command; see _get_geo_filter."""
+    for option in reversed(
+        [
+            click.option("--near", default=None, help="Only images taken near this point, as 'lat,lon' (degrees)."),
+            click.option("--radius-km", type=float, default=None, help="Radius around --near, in km."),
+            click.option(
+                "--bbox",
+                default=None,
+                help="Only images taken within this box, as 'min_lat,min_lon,max_lat,max_lon' (degrees).",
+            ),
+        ]
+    ):
+        command = option(command)
+    return command
+
+
+def _get_geo_filter(near: str | None, radius_km: float | None, bbox: str | None) -> GeoFilter:
+    if (near is None) != (radius_km is None):
+        raise click.UsageError("Provide both --near and --radius-km, or neither.")
+    return GeoFilter(
+        center=_parse_floats(near, 2, "--near") if near else None,
+        radius_km=radius_km,
+        bbox=_parse_floats(bbox, 4, "--bbox") if bbox else None,
+    )
+
+
+def _parse_floats(value: str, n: int, option_name: str) -> tuple[float, ...]:
+    """Parse comma-separated list of exactly n floats."""
+    try:
+        values = tuple(float(item) for item in value.split(","))
+    except ValueError:
+        values = ()
+    if len(values) != n:
+        raise click.BadParameter(f"Expected {n} comma-separated numbers, got '{value}'.", param_hint=option_name)
+    return values
+
+
+def _parse_names(value: str, names: list[str], option_name: str, first: int) -> frozenset[int]:
+    """Parse comma-separated list of (abbreviated) names or 1-based numbers into a set of indices starting at 'first'."""
+    indices = set()
+    for item in value.lower().replace(" ", "").split(","):
+        if item.isdigit() and (1 <= int(item) <= len(names)):
+            indices.add(int(item) - 1 + first)
+        elif item[:3] in names:
+            indices.add(names.index(item[:3]) + first)
+        else:
+            raise click.BadParameter(f"Unknown value '{item}'.", param_hint=option_name)
+    return frozenset(indices)
+
+
+def _get_tag_schedule(
+    order: str, max_duration: str | None, until: str | None, folder_weights: str | None
+) -> TagSchedule:
+    """Construct TagSchedule from the --order, --max-duration, --until & --folder-weights options of 'tag'."""
+    deadlines = []
+    if max_duration:
+        deadlines.append(time.time() + _parse_duration(max_duration, "--max-duration"))
+    if until:
+        try:
+            until_time = datetime.strptime(until.strip(), "%H:%M").time()
+        except ValueError:
+            raise click.BadParameter(f"Invalid time '{until}';  expected HH:MM.", param_hint="--until")
+        until_dt = datetime.combine(datetime.now().date(), until_time)
+        if until_dt <= datetime.now():
+            until_dt += timedelta(days=1)  # next occurrence
+        deadlines.append(until_dt.timestamp())
+
+    weights = []
+    for item in (folder_weights or "").split(","):
+        if item.strip():
+            pattern, _, weight = item.strip().rpartition("=")
+            try:
+                weights.append((pattern, float(weight)))
+            except ValueError:
+                raise click.BadParameter(f"Invalid folder weight '{item}'.", param_hint="--folder-weights")
+            if (not pattern) or (float(weight) < 0):
+                raise click.BadParameter(f"Invalid folder weight '{item}'.", param_hint="--folder-weights")
+
+    return TagSchedule(
+        order=TagOrder(order), deadline=min(deadlines) if deadlines else None, folder_weights=tuple(weights)
+    )
+
+
+def _parse_duration(value: str, option_name: str) -> float:
+    """Parse duration like '45s', '90m' or '6h' into seconds."""
+    units = dict(s=1, m=60, h=3600)
+    value = value.strip().lower()
+    try:
+        seconds = float(value[:-1]) * units[value[-1]]
+    except (ValueError, KeyError, IndexError):
+        raise click.BadParameter(
+            f"Invalid duration '{value}';  expected e.g. '45s', '90m' or '6h'.", param_hint=option_name
+        )
+    if seconds <= 0:
+        raise click.BadParameter(f"Duration '{value}' should be positive.", param_hint=option_name)
+    return seconds
 
 
 # -------------------------------------------------------------------------
@@ -66,110 +341,780 @@ def list_models():
     required=False,
     help="If True, will overwrite previously generated tags.",
 )
+@click.option(
+    "--recursive",
+    default=False,
+    required=False,
+    help="If True, treat directory as a catalog root and tag all image folders below it.",
+)
+@click.option(
+    "--dedup",
+    default=False,
+    required=False,
+    help="If True, near-identical images (burst shots, edited copies) are detected & only tagged once per group.",
+)
+@click.option(
+    "--cooperative",
+    default=False,
+    required=False,
+    help="If True, claim images using lease files, such that multiple 'tag' processes (e.g. on different machines "
+    + "sharing the directory) can tag the same directory simultaneously.",
+)
+@click.option(
+    "--cascade",
+    default=False,
+    required=False,
+    help="If True, first tag all images with --fast-model (making them searchable quickly), after which results are "
+    + "refined using --model (see --refine).",
+)
+@click.option(
+    "--fast-model",
+    default=DEFAULT_LLM_MODEL_FAST,
+    required=False,
+    help=f"Fast model used for the first pass, in cascade mode (default: {DEFAULT_LLM_MODEL_FAST}).",
+)
+@click.option(
+    "--refine",
+    type=click.Choice(["all", "weak", "off"]),
+    default="weak",
+    required=False,
+    help="In cascade mode, which results of the fast model to refine: all, only weak ones (few tags or short "
+    + "description; default) or none.",
+)
+@click.option(
+    "--mode",
+    type=click.Choice(["full", "embeddings-only"]),
+    default="full",
+    required=False,
+    help="full (default): extract description & tags using the LLM + embeddings.  embeddings-only: only extract the "
+    + "image embedding & EXIF info (fast), deferring the LLM until images are enriched (see 'enrich').",
+)
+@click.option(
+    "--order",
+    type=click.Choice([o.value for o in TagOrder]),
+    default=TagOrder.DIRECTORY.value,
+    required=False,
+    help="Order in which pending images are tagged: directory (default), newest (EXIF date) first or random "
+    + "(i.e. a random sample first).",
+)
+@click.option(
+    "--max-duration",
+    default=None,
+    required=False,
+    help="Time budget of this run, e.g. '90m' or '6h';  no new images are started afterwards.  Re-run to resume.",
+)
+@click.option(
+    "--until",
+    default=None,
+    required=False,
+    help="Deadline of this run as local time 'HH:MM' (next occurrence), e.g. '06:00' at the end of a nightly "
+    + "maintenance window;  no new images are started afterwards.  Re-run to resume.",
+)
+@click.option(
+    "--folder-weights",
+    default=None,
+    required=False,
+    help="With --recursive: comma-separated 'pattern=weight' pairs prioritizing image folders (matched against "
+    + "their path relative to directory, first match wins, default weight 1), e.g. 'family/*=3,scans/*=0'.  Folders "
+    + "are tagged in order of descending weight, with the time budget divided proportionally;  weight 0 skips them.",
+)
 def tag(
     directory: str,
     model: str,
     geolookup: Literal["off", "offline", "online"],
     embedding_size: int,
     overwrite: bool,
+    recursive: bool,
+    dedup: bool,
+    cooperative: bool,
+    cascade: bool,
+    fast_model: str,
+    refine: Literal["all", "weak", "off"],
+    mode: Literal["full", "embeddings-only"],
+    order: str,
+    max_duration: str | None,
+    until: str | None,
+    folder_weights: str | None,
 ):
     """Tag all images in a directory, putting extracted tags/metadata in the metadata subfolder."""
-    print(f"Tagging all images in directory '{directory}' using model '{model}'...")
-    core.tag_all_images(Path(directory), model, geolookup, embedding_size, overwrite)
-    print("Done.")
+    embeddings_only = mode == "embeddings-only"
+    if folder_weights and not recursive:
+        raise click.UsageError("--folder-weights requires --recursive.")
+    schedule = _get_tag_schedule(order, max_duration, until, folder_weights)
+    if cooperative and overwrite:
+        raise click.UsageError("--cooperative can't be combined with --overwrite.")
+    if cascade and cooperative and (refine != "off"):
+        raise click.UsageError("--cooperative can only be combined with --cascade if --refine is off.")
+    if embeddings_only and cascade:
+        raise click.UsageError("--mode embeddings-only can't be combined with --cascade.")
+    if embeddings_only and (embedding_size == 0):
+        raise click.UsageError("--mode embeddings-only requires --embedding-size > 0.")
+    if embeddings_only:
+        print(f"Computing image embeddings of all images in directory '{directory}' (no LLM)...")
+    elif cascade:
+        print(f"Tagging all images in directory '{directory}' using model cascade '{fast_model}' -> '{model}'...")
+    else:
+        print(f"Tagging all images in directory '{directory}' using model '{model}'...")
+    if schedule.deadline is not None:
+        print(f"Starting new images until {datetime.fromtimestamp(schedule.deadline):%Y-%m-%d %H:%M:%S}.")
+
+    if recursive:
+        completed = core.tag_catalog(
+            Path(directory),
+            model,
+            geolookup,
+            embedding_size,
+            overwrite,
+            dedup,
+            cooperative,
+            fast_model=fast_model if cascade else None,
+            refine=refine,
+            embeddings_only=embeddings_only,
+            schedule=schedule,
+        )
+    elif cascade:
+        completed = core.tag_cascade(
+            Path(directory),
+            fast_model,
+            model,
+            geolookup,
+            embedding_size,
+            overwrite,
+            dedup,
+            refine,
+            cooperative,
+            schedule=schedule,
+        )
+    else:
+        completed = core.tag_all_images(
+            Path(directory),
+            model,
+            geolookup,
+            embedding_size,
+            overwrite,
+            dedup,
+            cooperative,
+            embeddings_only=embeddings_only,
+            schedule=schedule,
+        )
+    print("Done." if completed else "Stopped at deadline;  re-run to resume.")
+
+
+@cli.command()
+@click.option("--directory", required=True, help="Path with images tagged using 'tag --mode embeddings-only'.")
+@click.option(
+    "--filenames",
+    default=None,
+    required=False,
+    help="Comma-separated filenames (relative to directory) of the images to enrich (default: all images that were "
+    + "not enriched yet).",
+)
+@click.option(
+    "--model",
+    default=DEFAULT_LLM_MODEL_TEXT_IMAGE,
+    required=False,
+    help="Model to be used.",
+)
+@click.option(
+    "--recursive",
+    default=False,
+    required=False,
+    help="If True, treat directory as a catalog root and enrich images in all image folders below it.",
+)
+def enrich(directory: str, filenames: str | None, model: str, recursive: bool):
+    """
+    Extract description & tags using the LLM (+ text embedding) of images that were tagged in embeddings-only mode.
+    """
+    if filenames:
+        image_paths = [Path(directory) / filename.strip() for filename in filenames.split(",") if filename.strip()]
+    elif recursive:
+        image_paths = [
+            image_path
+            for shard in get_catalog(Path(directory)).shards
+            for image_path in core.select_images_to_enrich(Path(directory) / shard)
+        ]
+    else:
+        image_paths = core.select_images_to_enrich(Path(directory))
+    print(f"Enriching images in directory '{directory}' using model '{model}'...")
+    n_enriched = core.enrich_images(image_paths, model)
+    print(f"Done;  enriched {n_enriched:_} image(s).")
+
+
+@cli.command()
+@click.option("--directory", required=True, help="Path with images to be watched & tagged.")
+@click.option(
+    "--model",
+    default=DEFAULT_LLM_MODEL_TEXT_IMAGE,
+    required=False,
+    help="Model to be used.",
+)
+@click.option(
+    "--geolookup",
+    type=click.Choice(["off", "offline", "online"]),
+    default="online",
+    required=False,
+    help="Way of resolving GPS coordinates into address/city info.",
+)
+@click.option(
+    "--embedding-size",
+    type=click.Choice([0, 128, 512, 2048]),
+    default=2048,
+    required=False,
+    help="Size of extracted embeddings for semantic search.  0 means no embeddings are extracted.",
+)
+@click.option(
+    "--recursive",
+    default=False,
+    required=False,
+    help="If True, treat directory as a catalog root and watch all image folders below it.",
+)
+@click.option(
+    "--debounce",
+    default=WATCH_DEBOUNCE_SEC,
+    required=False,
+    help="Number of seconds without new changes, before new images are tagged.",
+)
+def watch(
+    directory: str,
+    model: str,
+    geolookup: Literal["off", "offline", "online"],
+    embedding_size: int,
+    recursive: bool,
+    debounce: float,
+):
+    """Watch a directory and continuously tag new or changed images as they appear."""
+    print(f"Watching directory '{directory}' for new images, tagging them using model '{model}'...")
+    try:
+        core.watch_directory(Path(directory), model, geolookup, embedding_size, recursive, debounce)
+    except KeyboardInterrupt:
+        print("Stopped.")
+
+
+@cli.command()
+@click.option("--directory", required=True, help="Path with images to use for benchmarking.")
+@click.option(
+    "--embedding-size",
+    type=click.Choice([128, 512, 2048]),
+    default=2048,
+    required=False,
+    help="Size of the embeddings to compute.",
+)
+@click.option("--n", default=20, help="Max number of images to use (default: 20).")
+@click.option(
+    "--text-only",
+    default=False,
+    required=False,
+    help="If True, compare the text-only model used for search queries against the full model instead.",
+)
+def benchmark_embeddings(directory: str, embedding_size: int, n: int, text_only: bool):
+    """
+    Compare throughput & accuracy of computing embeddings on CPU with the configured --precision & thread settings
+    against the fp32 baseline.
+    """
+    if text_only:
+        core.benchmark_text_only_model(Path(directory), embedding_size, n)
+    else:
+        core.benchmark_inference_profile(Path(directory), get_inference_profile(), embedding_size, n)
 
 
 @cli.command()
 @click.option("--directory", required=True, help="Path to the directory containing tagged images.")
-def show_stats(directory: str):
+@click.option(
+    "--rebuild",
+    default=False,
+    required=False,
+    help="If True, rebuild the persisted aggregates from all metadata files first (e.g. after editing them manually).",
+)
+def show_stats(directory: str, rebuild: bool):
     """
     Show statistics about the tagged images in the given directory.
     :param directory: Path to the directory containing tagged images.
+    :param rebuild: Rebuild the persisted aggregates the statistics are computed from.
     """
     print(f"Showing stats for directory: {directory}")
-    core.show_stats(Path(directory))
+    core.show_stats(Path(directory), rebuild)
 
 
 @cli.command()
 @click.option("--directory", required=True, help="Path to the directory containing tagged images.")
 @click.option("--n", default=10, help="Number of top tags to display (default: 10).")
-def show_tags(directory: str, n: int):
+@click.option(
+    "--rebuild",
+    default=False,
+    required=False,
+    help="If True, rebuild the persisted aggregates from all metadata files first (e.g. after editing them manually).",
+)
+def show_tags(directory: str, n: int, rebuild: bool):
     """
     Show the most common tags in the given directory.
     :param directory: Path to the directory containing images.
     :param n: Number of top tags to display.
+    :param rebuild: Rebuild the persisted aggregates the tag counts are taken from.
     """
     print(f"Showing {n} most common tags in directory: {directory}")
-    core.show_tags(Path(directory), n)
+    core.show_tags(Path(directory), n, rebuild)
+
+
+@cli.command()
+@click.option("--directory", required=True, help="Path to the directory containing tagged images.")
+@click.option(
+    "--min-similarity",
+    default=DEFAULT_DUPLICATE_MIN_SIMILARITY,
+    required=False,
+    help="Minimum cosine similarity of image embeddings to be considered near-duplicates "
+    + f"(default: {DEFAULT_DUPLICATE_MIN_SIMILARITY}).",
+)
+@click.option(
+    "--recursive",
+    default=False,
+    required=False,
+    help="If True, treat directory as a catalog root and compare images across all image folders below it.",
+)
+def find_duplicates(directory: str, min_similarity: float, recursive: bool = False):
+    """
+    Find clusters of near-duplicate images, based on the similarity of their image embeddings.
+    :param directory: Path to the directory containing tagged images.
+    :param min_similarity: Minimum cosine similarity to be considered near-duplicates.
+    :param recursive: When true, compare images of all image folders of the catalog rooted at directory.
+    """
+    print(f"Finding near-duplicate images (similarity>={min_similarity}) in directory: {directory}")
+    clusters = core.find_duplicates(Path(directory), min_similarity, recursive)
+    print(f"Found {len(clusters)} clusters ({sum(len(cluster.filenames) for cluster in clusters)} images):")
+    for i, cluster in enumerate(clusters, start=1):
+        print(
+            f"  [{i}] {len(cluster.filenames)} images, "
+            + f"similarity {cluster.min_similarity:.4f} - {cluster.max_similarity:.4f}"
+        )
+        for filename in cluster.filenames:
+            print(f"        {filename}")
 
 
 @cli.command()
 @click.option("--directory", required=True, help="Path to the directory containing tagged images.")
 @click.option(
     "--query",
-    required=True,
+    required=False,
     help="Textual search query (comma- or space-delimited words).",
 )
+@click.option(
+    "--queries-file",
+    required=False,
+    help="File with 1 query per line, as an alternative to --query.  Results are stored separately per query.",
+)
 @click.option(
     "--use_time_location_info",
     required=False,
     default=True,
     help="When false, extracted time & location data is ignored in the search.",
 )
-def textual_search(directory: str, query: str, use_time_location_info: bool = True):
+@click.option(
+    "--recursive",
+    default=False,
+    required=False,
+    help="If True, treat directory as a catalog root and search all image folders below it.",
+)
+@click.option(
+    "--enrich",
+    default=False,
+    required=False,
+    help="If True, images in the results that were tagged in embeddings-only mode are enriched using --model first "
+    + "(after which the search is repeated).",
+)
+@click.option(
+    "--model",
+    default=DEFAULT_LLM_MODEL_TEXT_IMAGE,
+    required=False,
+    help="Model used to enrich results (see --enrich).",
+)
+@_time_filter_options
+@_geo_filter_options
+def textual_search(
+    directory: str,
+    query: str | None,
+    queries_file: str | None,
+    use_time_location_info: bool = True,
+    recursive: bool = False,
+    from_date: datetime | None = None,
+    to_date: datetime | None = None,
+    weekdays: str | None = None,
+    months: str | None = None,
+    near: str | None = None,
+    radius_km: float | None = None,
+    bbox: str | None = None,
+    enrich: bool = False,
+    model: str = DEFAULT_LLM_MODEL_TEXT_IMAGE,
+):
     """
     Search for images in a directory based on a text query.  Text queries are treated as a set of individual words,
     each of which contribute to the importance of a search result.  The more occurrences of a word in the image's tags +
     description, will increase the score of the image for that query.
     :param directory: Path to the directory containing images.
     :param query: Text query to search for (comma or space-separated).
+    :param queries_file: File with multiple queries to search for (1 per line).
     :param use_time_location_info: When false, extracted time & location data is ignored in the search.
+    :param recursive: When true, search all image folders of the catalog rooted at directory.
+    :param from_date, to_date, weekdays, months: Only consider images taken at matching times.
+    :param near, radius_km, bbox: Only consider images taken at matching locations.
+    :param enrich: When true, results that were tagged in embeddings-only mode are enriched first.
+    :param model: Model used to enrich results.
     """
 
     # --- execute search ----------------------------------
-    print(f"Searching for '{query}' in directory: {directory}")
-    results = core.textual_search(Path(directory), query, use_time_location_info)
+    queries = _get_queries(query, queries_file)
+    time_filter = _get_time_filter(from_date, to_date, weekdays, months)
+    geo_filter = _get_geo_filter(near, radius_km, bbox)
+    print(f"Searching for {_describe_queries(queries)} in directory: {directory}")
+    _show_filters(time_filter, geo_filter)
 
-    # --- show results ------------------------------------
-    print(f"Found {len(results)} images:")
-    max_file_len = max(len(result.filename) for result in results) if results else 0
-    for result in results:
-        filename = result.filename.ljust(max_file_len + 3)
-        print(f"  {filename}  {result.score:.4f}")
+    def search() -> dict[str, list]:
+        if recursive:
+            return core.catalog_textual_search_batch(
+                Path(directory), queries, use_time_location_info, time_filter=time_filter, geo_filter=geo_filter
+            )
+        else:
+            return core.textual_search_batch(Path(directory), queries, use_time_location_info, time_filter, geo_filter)
 
-    # --- copy results ------------------------------------
-    core.copy_search_results(Path(directory), query, results)
+    results_by_query = _search_and_enrich(Path(directory), search, model if enrich else None)
+
+    # --- show & copy results -----------------------------
+    _show_and_copy_results(Path(directory), results_by_query, show_score_src=False)
 
 
 @cli.command()
 @click.option("--directory", required=True, help="Path to the directory containing tagged images.")
-@click.option("--query", required=True, help="Semantic search query.")
+@click.option("--query", required=False, help="Semantic search query.")
+@click.option(
+    "--queries-file",
+    required=False,
+    help="File with 1 query per line, as an alternative to --query.  Results are stored separately per query.",
+)
 @click.option(
     "--min-score",
     default=0.49,
     required=False,
     help="Minimum score to be included as a result.",
 )
-def semantic_search(directory: str, query: str, min_score: float):
+@click.option(
+    "--recursive",
+    default=False,
+    required=False,
+    help="If True, treat directory as a catalog root and search all image folders below it.",
+)
+@click.option(
+    "--truncate-dim",
+    type=int,
+    default=None,
+    required=False,
+    help="Only use this many leading embedding dimensions when scoring (default: all).",
+)
+@click.option(
+    "--quantization",
+    type=click.Choice([q.value for q in VectorQuantization]),
+    default=VectorQuantization.FLOAT32.value,
+    required=False,
+    help="Representation of image embeddings when scoring: float32 (exact, default), float16, int8 or binary.",
+)
+@click.option(
+    "--streaming",
+    default=False,
+    required=False,
+    help="If True, embeddings are scored in chunks straight from an on-disk embedding index, instead of reading all "
+    + "metadata into memory first (for very large folders).  Only supports float32 scoring.",
+)
+@click.option(
+    "--max-results",
+    type=int,
+    default=None,
+    required=False,
+    help="Max number of results per query (the best ones;  default: all with score>=min-score).",
+)
+@click.option(
+    "--enrich",
+    default=False,
+    required=False,
+    help="If True, images in the results that were tagged in embeddings-only mode are enriched using --model first "
+    + "(after which the search is repeated).",
+)
+@click.option(
+    "--model",
+    default=DEFAULT_LLM_MODEL_TEXT_IMAGE,
+    required=False,
+    help="Model used to enrich results (see --enrich).",
+)
+@_time_filter_options
+@_geo_filter_options
+def semantic_search(
+    directory: str,
+    query: str | None,
+    queries_file: str | None,
+    min_score: float,
+    recursive: bool = False,
+    truncate_dim: int | None = None,
+    quantization: str = VectorQuantization.FLOAT32.value,
+    streaming: bool = False,
+    max_results: int | None = None,
+    from_date: datetime | None = None,
+    to_date: datetime | None = None,
+    weekdays: str | None = None,
+    months: str | None = None,
+    near: str | None = None,
+    radius_km: float | None = None,
+    bbox: str | None = None,
+    enrich: bool = False,
+    model: str = DEFAULT_LLM_MODEL_TEXT_IMAGE,
+):
     """
     Search for images in a directory based on a text query using semantic search.  Search will be based
     on similarity scores between embeddings (query vs image).
     :param directory: Path to the directory containing images.
     :param query: Text query to search for (comma or space-separated).
+    :param queries_file: File with multiple queries to search for (1 per line).
     :param min_score: Minimum score to be included as a result (default: 0.5).
+    :param recursive: When true, search all image folders of the catalog rooted at directory.
+    :param truncate_dim: Number of leading embedding dimensions to use when scoring (None = all).
+    :param quantization: Representation of image embeddings when scoring.
+    :param streaming: When true, embeddings are scored in chunks from the on-disk embedding index (bounded memory).
+    :param max_results: Max number of results per query (None = all with score >= min_score).
+    :param from_date, to_date, weekdays, months: Only consider images taken at matching times.
+    :param near, radius_km, bbox: Only consider images taken at matching locations.
+    :param enrich: When true, results that were tagged in embeddings-only mode are enriched first.
+    :param model: Model used to enrich results.
+    """
+    queries = _get_queries(query, queries_file)
+    scoring_mode = ScoringMode(dim=truncate_dim, quantization=VectorQuantization(quantization))
+    if streaming and (scoring_mode.quantization != VectorQuantization.FLOAT32):
+        raise click.UsageError("--streaming only supports --quantization float32.")
+    time_filter = _get_time_filter(from_date, to_date, weekdays, months)
+    geo_filter = _get_geo_filter(near, radius_km, bbox)
+    print(
+        f"Searching semantically for {_describe_queries(queries)} in directory: {directory}, "
+        + f"including results with score>={min_score}."
+    )
+    if scoring_mode != ScoringMode():
+        print(f"Using approximate scoring [{scoring_mode}].")
+    _show_filters(time_filter, geo_filter)
+
+    def search() -> dict[str, list]:
+        if recursive:
+            return core.catalog_semantic_search_batch(
+                Path(directory),
+                queries,
+                min_score,
+                scoring_mode=scoring_mode,
+                time_filter=time_filter,
+                geo_filter=geo_filter,
+                streaming=streaming,
+                max_results=max_results,
+            )
+        elif streaming:
+            return core.streaming_semantic_search_batch(
+                Path(directory), queries, min_score, max_results, scoring_mode, time_filter, geo_filter
+            )
+        else:
+            results_by_query = core.semantic_search_batch(
+                Path(directory), queries, min_score, scoring_mode, time_filter, geo_filter
+            )
+            return {query: results[:max_results] for query, results in results_by_query.items()}
+
+    results_by_query = _search_and_enrich(Path(directory), search, model if enrich else None)
+
+    # --- show & copy results -----------------------------
+    _show_and_copy_results(Path(directory), results_by_query, show_score_src=True)
+
+
+@cli.command()
+@click.option("--directory", required=True, help="Path to the directory containing tagged images.")
+@click.option(
+    "--recursive",
+    default=False,
+    required=False,
+    help="If True, treat directory as a catalog root and search all image folders below it.",
+)
+@_geo_filter_options
+def geo_search(
+    directory: str,
+    recursive: bool = False,
+    near: str | None = None,
+    radius_km: float | None = None,
+    bbox: str | None = None,
+):
+    """
+    Search for images taken within a radius of a point (nearest first) and/or within a bounding box, using a
+    persistent spatial index of the stored GPS coordinates.
+    :param directory: Path to the directory containing images.
+    :param recursive: When true, search all image folders of the catalog rooted at directory.
+    :param near, radius_km, bbox: Area to search in.
+    """
+    geo_filter = _get_geo_filter(near, radius_km, bbox)
+    if not geo_filter.is_active:
+        raise click.UsageError("Provide --near & --radius-km and/or --bbox.")
+    print(f"Searching for images taken {geo_filter} in directory: {directory}")
+    if recursive:
+        results = core.catalog_geo_search(Path(directory), geo_filter)
+    else:
+        results = core.geo_search(Path(directory), geo_filter)
+
+    # --- show & copy results -----------------------------
+    _show_and_copy_results(Path(directory), {f"taken {geo_filter}": results}, show_score_src=False)
+
+
+@cli.command()
+@click.option("--directory", required=True, help="Path to the directory containing tagged images.")
+@click.option(
+    "--filename",
+    required=True,
+    help="Already-tagged example image (relative to directory), for which we want to find similar images.",
+)
+@click.option(
+    "--min-score",
+    default=DEFAULT_SIMILAR_IMAGES_MIN_SCORE,
+    required=False,
+    help=f"Minimum score to be included as a result (default: {DEFAULT_SIMILAR_IMAGES_MIN_SCORE}).",
+)
+@click.option(
+    "--recursive",
+    default=False,
+    required=False,
+    help="If True, treat directory as a catalog root and search all image folders below it.",
+)
+def similar_images(directory: str, filename: str, min_score: float, recursive: bool = False):
+    """
+    Search for images similar to an already-tagged image, using its stored embeddings as query.  No embedding model
+    is loaded, so results are near-instant.
+    :param directory: Path to the directory containing images.
+    :param filename: Filename of the example image (relative to directory).
+    :param min_score: Minimum score to be included as a result.
+    :param recursive: When true, search all image folders of the catalog rooted at directory.
+    """
+    print(
+        f"Searching for images similar to '{filename}' in directory: {directory}, "
+        + f"including results with score>={min_score}."
+    )
+    if recursive:
+        results = core.catalog_similar_images(Path(directory), filename, min_score)
+    else:
+        results = core.similar_images(Path(directory), filename, min_score)
+
+    # --- show & copy results -----------------------------
+    _show_and_copy_results(Path(directory), {f"similar to {filename}": results}, show_score_src=True)
+
+
+@cli.command()
+@click.option("--directory", required=True, help="Path to the directory containing tagged images.")
+@click.option(
+    "--ground-truth",
+    required=True,
+    help="Directory with 1 subfolder per query (named after the query), containing all relevant images.",
+)
+@click.option("--k", default=10, help="Number of top results to compute recall@k & precision@k on (default: 10).")
+@click.option(
+    "--min-score",
+    default=0.49,
+    required=False,
+    help="Score threshold at which precision & recall are computed.",
+)
+@click.option(
+    "--min-recall-at-k",
+    type=float,
+    default=None,
+    required=False,
+    help="Fail (exit code 1) if any scoring mode has a lower recall@k.",
+)
+@click.option(
+    "--max-recall-drop",
+    type=float,
+    default=None,
+    required=False,
+    help="Fail (exit code 1) if recall@k of any scoring mode drops more than this vs. exact scoring.",
+)
+def benchmark_search(
+    directory: str,
+    ground_truth: str,
+    k: int,
+    min_score: float,
+    min_recall_at_k: float | None,
+    max_recall_drop: float | None,
+):
+    """
+    Compare search quality (recall@k, precision) & latency of exact scoring vs. truncated and/or quantized
+    embeddings, using a labelled set of queries.
     """
-    print(f"Searching semantically for '{query}' in directory: {directory}, including results with score>={min_score}.")
-    results = core.semantic_search(Path(directory), query, min_score)
+    queries = read_ground_truth(Path(ground_truth))
+    print(f"Benchmarking semantic search scoring modes on {len(queries)} queries in directory: {directory}")
+    reports = core.benchmark_scoring_modes(Path(directory), queries, k=k, min_score=min_score)
+    if not reports:
+        sys.exit(1)
+    core.show_scoring_mode_reports(reports, k)
+
+    violations = core.check_search_regressions(reports, min_recall_at_k, max_recall_drop)
+    if violations:
+        print()
+        print("REGRESSIONS:")
+        for violation in violations:
+            print(f"  {violation}")
+        sys.exit(1)
+
+
+# -------------------------------------------------------------------------
+#  Helpers
+# -------------------------------------------------------------------------
+def _get_queries(query: str | None, queries_file: str | None) -> list[str]:
+    """Returns list of queries based on --query or --queries-file options (exactly one of both should be provided)."""
+    if (query is None) == (queries_file is None):
+        raise click.UsageError("Provide exactly one of --query or --queries-file.")
+    elif query is not None:
+        return [query]
+    else:
+        # 1 query per line; empty lines & lines starting with '#' are ignored
+        lines = [line.strip() for line in Path(queries_file).read_text().splitlines()]
+        queries = list(dict.fromkeys(line for line in lines if line and not line.startswith("#")))
+        if not queries:
+            raise click.UsageError(f"No queries found in '{queries_file}'.")
+        return queries
+
+
+def _describe_queries(queries: list[str]) -> str:
+    return f"'{queries[0]}'" if len(queries) == 1 else f"{len(queries)} queries"
+
+
+def _show_filters(time_filter: TimeFilter, geo_filter: GeoFilter):
+    if time_filter.is_active:
+        print(f"Only considering images taken {time_filter}.")
+    if geo_filter.is_active:
+        print(f"Only considering images taken {geo_filter}.")
+
+
+def _search_and_enrich(directory: Path, search: Callable[[], dict[str, list]], model: str | None) -> dict[str, list]:
+    """
+    Execute search & return its results.  If a model is provided, results that were tagged in embeddings-only mode are
+    enriched using that model first, after which the search is repeated, such that their new description, tags & text
+    embedding are taken into account.
+    """
+    results_by_query = search()
+    if model is None:
+        return results_by_query
+    image_paths = [directory / result.filename for results in results_by_query.values() for result in results]
+    if core.enrich_images(image_paths, model) > 0:
+        results_by_query = search()
+    return results_by_query
+
 
-    # --- show results ------------------------------------
-    print(f"Found {len(results)} images:")
-    max_file_len = max(len(result.filename) for result in results) if results else 0
-    for result in results:
-        filename = result.filename.ljust(max_file_len + 3)
-        print(f"  {filename}  {result.score:.4f}   [{result.score_src}]")
+def _show_and_copy_results(directory: Path, results_by_query: dict[str, list], show_score_src: bool):
+    """Show results of each query & copy them to a separate results folder per query."""
+    for i, (query, results) in enumerate(results_by_query.items(), start=1):
+        # --- show results --------------------------------
+        if len(results_by_query) > 1:
+            print(f"[{i}/{len(results_by_query)}] '{query}'")
+        print(f"Found {len(results)} images:")
+        max_file_len = max(len(result.filename) for result in results) if results else 0
+        for result in results:
+            filename = result.filename.ljust(max_file_len + 3)
+            score_src = f"   [{result.score_src}]" if show_score_src else ""
+            print(f"  {filename}  {result.score:.4f}{score_src}")
 
-    # --- copy results ------------------------------------
-    core.copy_search_results(Path(directory), query, results)
+        # --- copy results --------------------------------
+        folder_suffix = f"_{i:0>3}" if len(results_by_query) > 1 else ""
+        core.copy_search_results(directory, query, results, folder_suffix)
 
 
 # -------------------------------------------------------------------------
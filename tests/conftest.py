@@ -0,0 +1,15 @@
+import pytest
+
+from core.data import Embedding, EmbeddingModel
+
+from .helpers import random_embedding
+
+
+@pytest.fixture
+def fake_text_embeddings(monkeypatch):
+    """Replace the text embedding model by deterministic random embeddings (random_embedding(text))."""
+
+    def construct_embeddings_from_texts(texts: list[str], model: EmbeddingModel, **kwargs) -> list[Embedding]:
+        return [Embedding(model=model, values=random_embedding(text).tolist()) for text in texts]
+
+    monkeypatch.setattr("core.search._scoring.construct_embeddings_from_texts", construct_embeddings_from_texts)
@@ -0,0 +1,51 @@
+"""Helpers shared by tests, to create (tagged) image folders."""
+
+import zlib
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from core.data import Embedding, EmbeddingModel, ImageEmbeddings, ImageMetadata, LocationInfo, SearchData, TimeInfo
+from core.tag._tag_image import _save_metadata
+
+EMBEDDING_MODEL = EmbeddingModel.JINA_EMBEDDINGS_V4_128
+
+
+def random_embedding(seed: int | str) -> np.ndarray:
+    """Deterministic, row-normalized random embedding (of EMBEDDING_MODEL)."""
+    seed = zlib.crc32(seed.encode()) if isinstance(seed, str) else seed
+    values = np.random.default_rng(seed).normal(size=EMBEDDING_MODEL.embedding_size)
+    return (values / np.linalg.norm(values)).astype(np.float32)
+
+
+def write_metadata(
+    directory: Path,
+    filename: str,
+    img: np.ndarray | None = None,
+    txt: np.ndarray | None = None,
+    dt: datetime | None = None,
+    lat_lon: tuple[float, float] | None = None,
+):
+    """Write the metadata of an image (& a placeholder image file), the same way tagging does."""
+    embeddings = None
+    if img is not None:
+        embeddings = ImageEmbeddings(
+            img=Embedding(model=EMBEDDING_MODEL, values=img.tolist()),
+            txt=Embedding(model=EMBEDDING_MODEL, values=txt.tolist()) if txt is not None else None,
+        )
+    metadata = ImageMetadata(
+        filename=filename,
+        model="test",
+        t_extract=0.0,
+        search_data=SearchData(
+            description=f"description of {filename}",
+            tags=["test"],
+            time=TimeInfo(dt=dt) if dt is not None else None,
+            location=LocationInfo(lat=lat_lon[0], lon=lat_lon[1]) if lat_lon is not None else None,
+        ),
+        embeddings=embeddings,
+    )
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / filename).write_bytes(b"\xff\xd8\xff\xd9")
+    _save_metadata(metadata, directory / "metadata" / f"{filename}.json")
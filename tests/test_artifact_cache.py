@@ -0,0 +1,112 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from core.cache import ArtifactCache, artifact_key, get_artifact_cache, get_or_compute, set_artifact_cache
+
+
+@pytest.fixture(autouse=True)
+def restore_active_cache(monkeypatch):
+    """Tests may (re)configure the process-wide cache;  restore it afterward."""
+    monkeypatch.setattr("core.cache._artifact_cache._active_cache", get_artifact_cache())
+
+
+@pytest.fixture
+def active_cache(tmp_path: Path) -> ArtifactCache:
+    set_artifact_cache(tmp_path / "cache", max_size_mb=1)
+    return get_artifact_cache()
+
+
+def test_artifact_key():
+    assert artifact_key("tags", "abc", "model") == artifact_key("tags", "abc", "model")
+    assert artifact_key("tags", "abc", "model") != artifact_key("tags", "abc", "other_model")
+    assert artifact_key("tags", "ab", "cmodel") != artifact_key("tags", "abc", "model")  # parts are separated
+
+
+def test_get_put(tmp_path: Path):
+    cache = ArtifactCache(tmp_path, max_size_mb=1)
+    key = artifact_key("description", "hash")
+    assert cache.get(key) is None
+    cache.put(key, {"description": "a dog", "tags": ["dog", "park"]})
+    assert cache.get(key) == {"description": "a dog", "tags": ["dog", "park"]}
+    assert ArtifactCache(tmp_path, max_size_mb=1).get(key) == {"description": "a dog", "tags": ["dog", "park"]}
+
+    cache.put(key, "overwritten")
+    assert cache.get(key) == "overwritten"
+    assert not list(tmp_path.rglob("*.tmp"))
+
+
+def test_get_corrupt_artifact(tmp_path: Path):
+    cache = ArtifactCache(tmp_path, max_size_mb=1)
+    key = artifact_key("corrupt")
+    cache.put(key, [1, 2, 3])
+    next(tmp_path.rglob(f"{key}.json")).write_text('{"truncated": ')
+    assert cache.get(key) is None
+
+
+def test_eviction_of_least_recently_used(tmp_path: Path):
+    value = "x" * 10_000  # ~10 kB per artifact
+    cache = ArtifactCache(tmp_path, max_size_mb=0.1)  # room for ~10 artifacts
+    keys = [artifact_key(str(i)) for i in range(9)]
+    for i, key in enumerate(keys):
+        cache.put(key, value)
+        path = next(tmp_path.rglob(f"{key}.json"))
+        os.utime(path, ns=(i * 10**9, i * 10**9))  # deterministic order of use
+    assert cache.get(keys[0]) == value  # hit -> most recently used
+
+    for i in range(9, 12):
+        cache.put(artifact_key(str(i)), value)
+
+    # evicted down to 80% of max size, least-recently-used first (keys[0] was just used)
+    remaining = [key for key in keys if cache.get(key) is not None]
+    assert keys[0] in remaining
+    assert keys[1] not in remaining
+    assert len(remaining) < len(keys)
+    total_size = sum(path.stat().st_size for path in tmp_path.rglob("*.json"))
+    assert total_size <= cache.max_size_bytes
+
+
+def test_eviction_with_existing_cache(tmp_path: Path):
+    value = "x" * 10_000
+    for i in range(20):
+        ArtifactCache(tmp_path, max_size_mb=10).put(artifact_key(str(i)), value)
+    cache = ArtifactCache(tmp_path, max_size_mb=0.1)
+    cache.put(artifact_key("new"), value)  # first write of a new instance scans existing artifacts
+    assert cache.get(artifact_key("new")) == value
+    assert sum(path.stat().st_size for path in tmp_path.rglob("*.json")) <= 0.8 * cache.max_size_bytes
+
+
+def test_get_or_compute(active_cache: ArtifactCache):
+    calls = []
+
+    def compute() -> set[str]:
+        calls.append(1)
+        return {"dog"}
+
+    key = artifact_key("tags", "hash")
+    assert get_or_compute(key, compute, sorted, set) == {"dog"}
+    assert get_or_compute(key, compute, sorted, set) == {"dog"}
+    assert len(calls) == 1
+    assert active_cache.get(key) == ["dog"]
+
+    # incompatible cached value -> recomputed & overwritten
+    active_cache.put(key, 123)
+    assert get_or_compute(key, compute, sorted, set) == {"dog"}
+    assert len(calls) == 2
+    assert active_cache.get(key) == ["dog"]
+
+
+def test_cache_disabled(tmp_path: Path):
+    for directory, max_size_mb in [(None, 1_000), (tmp_path, 0)]:
+        set_artifact_cache(directory, max_size_mb)
+        assert get_artifact_cache() is None
+        assert get_or_compute(artifact_key("x"), lambda: 1) == 1
+    assert not list(tmp_path.iterdir())
+
+
+def test_cached_values_are_json(tmp_path: Path):
+    cache = ArtifactCache(tmp_path, max_size_mb=1)
+    cache.put(artifact_key("k"), {"a": [1.5, None]})
+    assert json.loads(next(tmp_path.rglob("*.json")).read_text()) == {"a": [1.5, None]}
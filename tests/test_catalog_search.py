@@ -0,0 +1,53 @@
+from pathlib import Path
+
+import pytest
+
+from core.search import (
+    catalog_semantic_search,
+    catalog_semantic_search_batch,
+    catalog_textual_search_batch,
+    semantic_search_batch,
+)
+
+from .helpers import random_embedding, write_metadata
+
+QUERIES = ["dog", "cat on a roof", "beach"]
+
+
+@pytest.fixture
+def catalog(tmp_path: Path) -> Path:
+    for shard in ["a", "b/c"]:
+        for i in range(20):
+            write_metadata(tmp_path / shard, f"{i:02d}.jpg", img=random_embedding(f"{shard}/{i}"))
+    return tmp_path
+
+
+def _as_tuples(results) -> list[tuple[str, float, str]]:
+    return [(result.filename, round(result.score, 5), result.score_src) for result in results]
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_catalog_batch_matches_single_queries(catalog: Path, fake_text_embeddings, streaming: bool):
+    results_by_query = catalog_semantic_search_batch(catalog, QUERIES, -1.0, streaming=streaming, max_results=25)
+    assert list(results_by_query) == QUERIES
+    for query in QUERIES:
+        expected = catalog_semantic_search(catalog, query, -1.0, streaming=streaming, max_results=25)
+        assert len(expected) == 25
+        assert _as_tuples(results_by_query[query]) == _as_tuples(expected)
+
+
+def test_catalog_batch_merges_shards(catalog: Path, fake_text_embeddings):
+    results_by_query = catalog_semantic_search_batch(catalog, QUERIES, -1.0)
+    for query in QUERIES:
+        expected = [
+            (f"{shard}/{filename}", score, score_src)
+            for shard in ["a", "b/c"]
+            for filename, score, score_src in _as_tuples(semantic_search_batch(catalog / shard, [query], -1.0)[query])
+        ]
+        assert _as_tuples(results_by_query[query]) == sorted(expected, key=lambda t: (-t[1], t[0]))
+
+
+def test_catalog_textual_batch(catalog: Path):
+    results_by_query = catalog_textual_search_batch(catalog, ["description", "nothing"], use_time_location_data=False)
+    assert len(results_by_query["description"]) == 40
+    assert results_by_query["nothing"] == []
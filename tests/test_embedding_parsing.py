@@ -0,0 +1,66 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from core.data import EmbeddingModel
+from core.tag import get_embedding_index, read_metadata_table
+from core.tag._metadata_table import parse_embedding_values
+
+from .helpers import EMBEDDING_MODEL, random_embedding, write_metadata
+
+
+def test_parse_list_and_string():
+    values = random_embedding(0)
+    serialized = ",".join(map(str, values.tolist()))  # as in Embedding.serialize_values
+    np.testing.assert_array_equal(parse_embedding_values(serialized, EMBEDDING_MODEL), values)
+    np.testing.assert_array_equal(parse_embedding_values(values.tolist(), EMBEDDING_MODEL), values)
+    assert parse_embedding_values(serialized, EMBEDDING_MODEL).dtype == np.float32
+
+
+@pytest.mark.parametrize(
+    "serialized",
+    [
+        "1.0,2.0,abc" + ",0.5" * 125,  # invalid value in the middle
+        "1.0,,2.0" + ",0.5" * 125,  # empty value
+        "0.5," * 128,  # trailing separator
+        ",".join(["0.5"] * 127),  # too few values (e.g. truncated file)
+        ",".join(["0.5"] * 129),  # too many values
+        "",
+    ],
+)
+def test_parse_invalid_string(serialized: str):
+    with pytest.raises(ValueError):
+        parse_embedding_values(serialized, EMBEDDING_MODEL)
+
+
+def test_parse_wrong_size_for_model():
+    with pytest.raises(ValueError):
+        parse_embedding_values(random_embedding(0).tolist(), EmbeddingModel.JINA_EMBEDDINGS_V4_512)
+
+
+def _corrupt_embedding(directory: Path, filename: str):
+    path = directory / "metadata" / f"{filename}.json"
+    data = json.loads(path.read_text())
+    data["embeddings"]["img"]["values"] = data["embeddings"]["img"]["values"].rsplit(",", 10)[0] + ",x"
+    path.write_text(json.dumps(data))
+
+
+def test_invalid_embeddings_are_skipped(tmp_path: Path):
+    for i in range(5):
+        write_metadata(tmp_path, f"{i}.jpg", img=random_embedding(i), txt=random_embedding(10 + i))
+    _corrupt_embedding(tmp_path, "3.jpg")
+
+    table = read_metadata_table(tmp_path)
+    assert sorted(table.filenames.tolist()) == ["0.jpg", "1.jpg", "2.jpg", "4.jpg"]
+
+    index = get_embedding_index(tmp_path)
+    rows = {
+        filename: block.img[i]
+        for block in index.blocks
+        if block.model is not None
+        for i, filename in enumerate(block.filenames.tolist())
+    }
+    assert sorted(rows) == ["0.jpg", "1.jpg", "2.jpg", "4.jpg"]
+    np.testing.assert_allclose(rows["1.jpg"], random_embedding(1), atol=1e-6)
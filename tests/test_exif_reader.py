@@ -0,0 +1,244 @@
+import os
+import struct
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from core.tag.exif._exif_reader import (
+    _TAG_DATETIME,
+    _TAG_DATETIME_DIGITIZED,
+    _TAG_DATETIME_ORIGINAL,
+    _TAG_EXIF_IFD,
+    _TAG_GPS_IFD,
+    _TAG_GPS_LATITUDE,
+    _TAG_GPS_LATITUDE_REF,
+    _TAG_GPS_LONGITUDE,
+    _TAG_GPS_LONGITUDE_REF,
+    ExifData,
+    read_exif,
+)
+
+ASCII, SHORT, LONG, RATIONAL = 2, 3, 4, 5
+
+
+# =================================================================================================
+#  Fixture builders
+# =================================================================================================
+def build_tiff(
+    byte_order: str,
+    ifd0: list[tuple] = (),
+    exif: list[tuple] | None = None,
+    gps: list[tuple] | None = None,
+) -> bytes:
+    """
+    Build a TIFF structure (as embedded in an APP1 Exif segment) with the given (tag, type, value)-entries in IFD0 and,
+    optionally, an Exif & GPS sub-IFD (pointed to from IFD0).  ASCII values are str, RATIONAL values are lists of
+    (numerator, denominator)-tuples, others are lists of ints.
+    """
+    bo = {"II": "<", "MM": ">"}[byte_order]
+    ifd0 = list(ifd0) + [(tag, LONG, [0]) for tag, ifd in [(_TAG_EXIF_IFD, exif), (_TAG_GPS_IFD, gps)] if ifd]
+    ifds = [ifd0] + [ifd for ifd in [exif, gps] if ifd]
+
+    # offsets of all IFDs (pointers are stored inline, so they don't affect sizes)
+    offsets, offset = [], 8
+    for entries in ifds:
+        offsets.append(offset)
+        offset += len(_encode_ifd(bo, entries, 0))
+    pointers = dict(zip([tag for tag, ifd in [(_TAG_EXIF_IFD, exif), (_TAG_GPS_IFD, gps)] if ifd], offsets[1:]))
+    ifds[0] = [(tag, type_, [pointers[tag]] if tag in pointers else value) for tag, type_, value in ifds[0]]
+
+    header = byte_order.encode() + struct.pack(bo + "HI", 42, 8)
+    return header + b"".join(_encode_ifd(bo, entries, offset) for entries, offset in zip(ifds, offsets))
+
+
+def _encode_ifd(bo: str, entries: list[tuple], offset: int) -> bytes:
+    """IFD (sorted entries, next-IFD offset 0) followed by its data area, for an IFD at the given offset."""
+    data_offset = offset + 2 + 12 * len(entries) + 4
+    directory, data = struct.pack(bo + "H", len(entries)), b""
+    for tag, type_, value in sorted(entries, key=lambda entry: entry[0]):
+        if type_ == ASCII:
+            raw, count = value.encode() + b"\x00", len(value) + 1
+        elif type_ == RATIONAL:
+            raw, count = b"".join(struct.pack(bo + "II", *rational) for rational in value), len(value)
+        else:
+            raw, count = b"".join(struct.pack(bo + {SHORT: "H", LONG: "I"}[type_], v) for v in value), len(value)
+        if len(raw) <= 4:
+            directory += struct.pack(bo + "HHI", tag, type_, count) + raw.ljust(4, b"\x00")
+        else:
+            directory += struct.pack(bo + "HHII", tag, type_, count, data_offset + len(data))
+            data += raw + (b"\x00" if len(raw) % 2 else b"")
+    return directory + struct.pack(bo + "I", 0) + data
+
+
+def build_jpeg(tiff: bytes | None, extra_segments: list[tuple[int, bytes]] = ()) -> bytes:
+    """Minimal JPEG header (SOI, JFIF APP0, optional extra segments & APP1 Exif) followed by SOS & dummy image data."""
+    segments = [(0xE0, b"JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00")] + list(extra_segments)
+    if tiff is not None:
+        segments.append((0xE1, b"Exif\x00\x00" + tiff))
+    header = b"\xff\xd8" + b"".join(
+        bytes([0xFF, marker]) + struct.pack(">H", len(payload) + 2) + payload for marker, payload in segments
+    )
+    return header + b"\xff\xda\x00\x02" + os.urandom(64) + b"\xff\xd9"
+
+
+def _dms(degrees: int, minutes: int, seconds_x100: int) -> list[tuple[int, int]]:
+    return [(degrees, 1), (minutes, 1), (seconds_x100, 100)]
+
+
+def _gps(lat_ref: str, lon_ref: str) -> list[tuple]:
+    return [
+        (_TAG_GPS_LATITUDE_REF, ASCII, lat_ref),
+        (_TAG_GPS_LATITUDE, RATIONAL, _dms(33, 51, 3600)),  # 33° 51' 36.00"
+        (_TAG_GPS_LONGITUDE_REF, ASCII, lon_ref),
+        (_TAG_GPS_LONGITUDE, RATIONAL, _dms(151, 12, 5400)),  # 151° 12' 54.00"
+    ]
+
+
+@pytest.fixture
+def write_image(tmp_path: Path):
+    """Write image content to a new file & return its path."""
+    counter = iter(range(1_000_000))
+
+    def write(content: bytes, suffix: str = ".jpg") -> Path:
+        path = tmp_path / f"image_{next(counter)}{suffix}"
+        path.write_bytes(content)
+        return path
+
+    return write
+
+
+LAT, LON = 33 + 51 / 60 + 36 / 3600, 151 + 12 / 60 + 54 / 3600
+
+
+# =================================================================================================
+#  Tests
+# =================================================================================================
+@pytest.mark.parametrize("byte_order", ["II", "MM"])
+def test_datetime_and_gps(write_image, byte_order: str):
+    tiff = build_tiff(byte_order, ifd0=[(_TAG_DATETIME, ASCII, "2024:07:14 18:30:05")], gps=_gps("N", "E"))
+    exif = read_exif(write_image(build_jpeg(tiff)))
+    assert exif.dt == datetime(2024, 7, 14, 18, 30, 5)
+    assert exif.lat == pytest.approx(LAT)
+    assert exif.lon == pytest.approx(LON)
+    assert exif.error is None
+
+
+@pytest.mark.parametrize("byte_order", ["II", "MM"])
+@pytest.mark.parametrize(
+    "lat_ref, lon_ref, lat_sign, lon_sign",
+    [("N", "E", 1, 1), ("S", "E", -1, 1), ("N", "W", 1, -1), ("S", "W", -1, -1), ("s", "w", -1, -1)],
+)
+def test_gps_refs(write_image, byte_order: str, lat_ref: str, lon_ref: str, lat_sign: int, lon_sign: int):
+    exif = read_exif(write_image(build_jpeg(build_tiff(byte_order, gps=_gps(lat_ref, lon_ref)))))
+    assert (exif.lat, exif.lon) == (pytest.approx(lat_sign * LAT), pytest.approx(lon_sign * LON))
+    assert exif.dt is None
+
+
+def test_incomplete_gps(write_image):
+    gps = _gps("N", "E")
+    without_lon = build_tiff("II", gps=gps[:2])
+    zero_denominator = build_tiff("II", gps=gps[:1] + [(_TAG_GPS_LATITUDE, RATIONAL, [(0, 0)] * 3)] + gps[2:])
+    for tiff in [without_lon, zero_denominator]:
+        assert read_exif(write_image(build_jpeg(tiff))) == ExifData()
+
+
+@pytest.mark.parametrize("byte_order", ["II", "MM"])
+def test_datetime_from_exif_ifd(write_image, byte_order: str):
+    tiff = build_tiff(
+        byte_order,
+        ifd0=[(_TAG_DATETIME, ASCII, "0000:00:00 00:00:00")],  # camera without clock
+        exif=[
+            (_TAG_DATETIME_ORIGINAL, ASCII, "2023:01:02 03:04:05"),
+            (_TAG_DATETIME_DIGITIZED, ASCII, "2023:01:02 03:04:06"),
+        ],
+    )
+    assert read_exif(write_image(build_jpeg(tiff))) == ExifData(dt=datetime(2023, 1, 2, 3, 4, 5))
+
+
+def test_invalid_datetime(write_image):
+    tiff = build_tiff("II", ifd0=[(_TAG_DATETIME, ASCII, "2023:13:45 99:00:00")])
+    exif = read_exif(write_image(build_jpeg(tiff)))
+    assert exif.dt is None
+    assert "invalid date" in exif.error
+
+    # invalid DateTime, but valid DateTimeOriginal -> no error
+    tiff = build_tiff(
+        "MM",
+        ifd0=[(_TAG_DATETIME, ASCII, "yesterday")],
+        exif=[(_TAG_DATETIME_ORIGINAL, ASCII, "2023:01:02 03:04:05")],
+    )
+    assert read_exif(write_image(build_jpeg(tiff))) == ExifData(dt=datetime(2023, 1, 2, 3, 4, 5))
+
+
+def test_exif_written_by_pillow(write_image, tmp_path: Path):
+    exif = Image.Exif()
+    exif[_TAG_DATETIME] = "2022:02:22 22:22:22"
+    gps_ifd = exif.get_ifd(_TAG_GPS_IFD)
+    gps_ifd.update({1: "S", 2: (33.0, 51.0, 36.0), 3: "W", 4: (151.0, 12.0, 54.0)})
+    Image.new("RGB", (16, 16)).save(tmp_path / "pillow.jpg", exif=exif)
+
+    assert read_exif(tmp_path / "pillow.jpg") == ExifData(
+        dt=datetime(2022, 2, 22, 22, 22, 22), lat=pytest.approx(-LAT), lon=pytest.approx(-LON)
+    )
+
+
+def test_exif_after_other_app1_segment(write_image):
+    xmp = (0xE1, b"http://ns.adobe.com/xap/1.0/\x00<x:xmpmeta/>")
+    tiff = build_tiff("MM", ifd0=[(_TAG_DATETIME, ASCII, "2024:01:01 00:00:00")])
+    assert read_exif(write_image(build_jpeg(tiff, extra_segments=[xmp]))).dt == datetime(2024, 1, 1)
+
+
+@pytest.mark.parametrize("byte_order", ["II", "MM"])
+def test_missing_and_truncated_ifds(write_image, byte_order: str):
+    tiff = build_tiff(byte_order, ifd0=[(_TAG_DATETIME, ASCII, "2024:07:14 18:30:05")], gps=_gps("N", "E"))
+    bo = {"II": "<", "MM": ">"}[byte_order]
+
+    # IFD0 offset beyond the end of the data
+    missing_ifd0 = tiff[:4] + struct.pack(bo + "I", len(tiff) + 100) + tiff[8:]
+    # TIFF truncated halfway the GPS IFD / halfway IFD0
+    truncated_gps_ifd = tiff[: len(tiff) - 40]
+    truncated_ifd0 = tiff[:20]
+
+    for broken_tiff in [missing_ifd0, truncated_gps_ifd, truncated_ifd0, tiff[:6], b"XX" + tiff[2:]]:
+        exif = read_exif(write_image(build_jpeg(broken_tiff)))
+        assert (exif.dt, exif.lat, exif.lon) == (None, None, None)
+        assert exif.error.startswith("invalid EXIF data")
+
+
+def test_truncated_jpeg_header(write_image):
+    jpeg = build_jpeg(build_tiff("II", ifd0=[(_TAG_DATETIME, ASCII, "2024:07:14 18:30:05")]))
+    i_app1 = jpeg.index(b"\xff\xe1")
+    for truncated in [jpeg[: i_app1 + 10], jpeg[: i_app1 + 2], jpeg[:3]]:
+        exif = read_exif(write_image(truncated))
+        assert exif.error.startswith("invalid JPEG header")
+
+
+def test_jpeg_without_exif(write_image, tmp_path: Path):
+    assert read_exif(write_image(build_jpeg(None))) == ExifData()
+    Image.new("RGB", (16, 16)).save(tmp_path / "no_exif.jpg")
+    assert read_exif(tmp_path / "no_exif.jpg") == ExifData()
+
+
+def test_non_jpeg(write_image, tmp_path: Path):
+    exif = Image.Exif()
+    exif[_TAG_DATETIME] = "2022:02:22 22:22:22"
+    for suffix in [".png", ".webp", ".gif"]:
+        Image.new("RGB", (16, 16)).save(tmp_path / f"image{suffix}", exif=exif)
+        assert read_exif(tmp_path / f"image{suffix}") == ExifData()  # header-only reader supports JPEG only
+    assert read_exif(write_image(b"")) == ExifData()
+    assert read_exif(write_image(b"not an image at all")) == ExifData()
+    assert read_exif(write_image(b"MM\x00\x2a\x00\x00\x00\x08", suffix=".tif")) == ExifData()
+
+
+def test_missing_file(tmp_path: Path):
+    assert read_exif(tmp_path / "missing.jpg").error is not None
+
+
+def test_cache_is_invalidated_when_file_changes(write_image):
+    path = write_image(build_jpeg(build_tiff("II", ifd0=[(_TAG_DATETIME, ASCII, "2024:01:01 00:00:00")])))
+    assert read_exif(path).dt == datetime(2024, 1, 1)
+    path.write_bytes(build_jpeg(build_tiff("II", ifd0=[(_TAG_DATETIME, ASCII, "2025:12:31 23:59:59")])))
+    os.utime(path, ns=(1, 1))  # in case the size & mtime_ns happened to remain equal
+    assert read_exif(path).dt == datetime(2025, 12, 31, 23, 59, 59)
@@ -0,0 +1,168 @@
+import math
+import os
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from core.data import GeoFilter
+from core.tag import get_geo_index, haversine_km
+from core.tag._geo_index import _BAND_DEG, _NO_BAND, EARTH_RADIUS_KM, _get_search_ranges, _split_lon_range
+
+from .helpers import write_metadata
+
+
+# =================================================================================================
+#  Helpers
+# =================================================================================================
+def _random_points(n: int, seed: int = 0) -> list[tuple[float, float]]:
+    """Random points, concentrated around the antimeridian, the poles & band edges, plus some extreme ones."""
+    rng = np.random.default_rng(seed)
+    points = [(float(lat), float(lon)) for lat, lon in zip(rng.uniform(-90, 90, n), rng.uniform(-180, 180, n))]
+    points += [(float(lat), float(lon)) for lat, lon in zip(rng.uniform(-30, 30, n), rng.uniform(175, 185, n) % 360)]
+    points = [(lat, lon - 360 if lon > 180 else lon) for lat, lon in points]
+    points += [(float(lat), float(lon)) for lat, lon in zip(rng.uniform(85, 90, n), rng.uniform(-180, 180, n))]
+    points += [(float(lat), float(lon)) for lat, lon in zip(rng.uniform(-90, -85, n), rng.uniform(-180, 180, n))]
+    points += [(float(lat), 10.0) for lat in rng.integers(-89, 90, 20)]  # exactly on band edges
+    points += [(90.0, 0.0), (-90.0, 0.0), (0.0, 180.0), (0.0, -180.0), (45.0, 179.9999), (45.0, -179.9999)]
+    return points
+
+
+def _expected(points: list[tuple[float, float]], geo_filter: GeoFilter) -> list[int]:
+    """Brute-force reference:  indices of matching points (nearest first if a radius is given)."""
+    lat, lon = np.array(points).T
+    is_match = np.ones(len(points), dtype=bool)
+    if geo_filter.bbox is not None:
+        min_lat, min_lon, max_lat, max_lon = geo_filter.bbox
+        is_match &= (lat >= min_lat) & (lat <= max_lat)
+        if min_lon <= max_lon:
+            is_match &= (lon >= min_lon) & (lon <= max_lon)
+        else:
+            is_match &= (lon >= min_lon) | (lon <= max_lon)
+    if geo_filter.center is None:
+        return sorted(np.flatnonzero(is_match).tolist())
+    distances = haversine_km(geo_filter.center[0], geo_filter.center[1], lat, lon)
+    is_match &= distances <= geo_filter.radius_km
+    indices = np.flatnonzero(is_match)
+    return indices[np.argsort(distances[indices], kind="stable")].tolist()
+
+
+@pytest.fixture(scope="module")
+def points() -> list[tuple[float, float]]:
+    return _random_points(300)
+
+
+@pytest.fixture(scope="module")
+def image_directory(tmp_path_factory, points) -> Path:
+    directory = tmp_path_factory.mktemp("geo")
+    for i, lat_lon in enumerate(points):
+        write_metadata(directory, f"{i:04d}.jpg", lat_lon=lat_lon)
+    write_metadata(directory, "no_location.jpg")
+    return directory
+
+
+# =================================================================================================
+#  Tests
+# =================================================================================================
+@pytest.mark.parametrize(
+    "min_lon, max_lon, expected",
+    [
+        (-10.0, 10.0, [(-10.0, 10.0)]),
+        (170.0, 190.0, [(170.0, 180.0), (-180.0, -170.0)]),  # crossing +180
+        (-190.0, -170.0, [(170.0, 180.0), (-180.0, -170.0)]),  # crossing -180
+        (-180.0, 180.0, [(-180.0, 180.0)]),
+        (-200.0, 200.0, [(-180.0, 180.0)]),  # more than all longitudes
+        (100.0, 460.0, [(-180.0, 180.0)]),
+        (180.0, 180.0, [(180.0, 180.0)]),
+    ],
+)
+def test_split_lon_range(min_lon: float, max_lon: float, expected: list[tuple[float, float]]):
+    assert _split_lon_range(min_lon, max_lon) == expected
+
+
+def test_bands(image_directory: Path, points):
+    index = get_geo_index(image_directory)
+    assert np.all(np.diff(index.bands.astype(np.int64)) >= 0)  # sorted by band...
+    for band in np.unique(index.bands):
+        assert np.all(np.diff(index.lon[index.bands == band]) >= 0)  # ...& by longitude within each band
+        if band != _NO_BAND:
+            lat = index.lat[index.bands == band]
+            assert np.all((lat >= band * _BAND_DEG) & (lat < (band + 1) * _BAND_DEG) | (lat == 90.0))
+    assert index.filenames[-1] == "no_location.jpg"
+    assert index.bands[-1] == _NO_BAND
+
+
+def test_haversine_km():
+    # 1 degree along the equator / a meridian
+    assert haversine_km(0.0, 0.0, np.array([0.0]), np.array([1.0]))[0] == pytest.approx(111.195, abs=0.01)
+    assert haversine_km(0.0, 0.0, np.array([1.0]), np.array([0.0]))[0] == pytest.approx(111.195, abs=0.01)
+    # across the antimeridian & over the pole
+    assert haversine_km(0.0, 179.5, np.array([0.0]), np.array([-179.5]))[0] == pytest.approx(111.195, abs=0.01)
+    assert haversine_km(89.0, 0.0, np.array([89.0]), np.array([180.0]))[0] == pytest.approx(222.39, abs=0.01)
+    # antipodes
+    assert haversine_km(0.0, 0.0, np.array([0.0]), np.array([180.0]))[0] == pytest.approx(math.pi * EARTH_RADIUS_KM)
+
+
+@pytest.mark.parametrize(
+    "geo_filter",
+    [
+        GeoFilter(center=(0.0, 0.0), radius_km=1_000),
+        GeoFilter(center=(10.0, 179.5), radius_km=500),  # circle crossing +180
+        GeoFilter(center=(-10.0, -179.5), radius_km=800),  # circle crossing -180
+        GeoFilter(center=(0.0, 180.0), radius_km=300),
+        GeoFilter(center=(88.0, 45.0), radius_km=500),  # north pole inside circle
+        GeoFilter(center=(-89.5, -120.0), radius_km=100),  # south pole inside circle
+        GeoFilter(center=(80.0, 170.0), radius_km=1_000),  # near pole & antimeridian, pole outside circle
+        GeoFilter(center=(45.0, 10.0), radius_km=0.001),
+        GeoFilter(center=(45.0, 10.0), radius_km=30_000),  # entire earth
+        GeoFilter(bbox=(-10.0, -20.0, 10.0, 20.0)),
+        GeoFilter(bbox=(-30.0, 170.0, 30.0, -170.0)),  # bbox crossing the antimeridian
+        GeoFilter(bbox=(85.0, -180.0, 90.0, 180.0)),
+        GeoFilter(bbox=(3.0, 10.0, 7.0, 10.0)),  # band edges, on a single longitude
+        GeoFilter(center=(0.0, 179.0), radius_km=2_000, bbox=(-30.0, 170.0, 30.0, -175.0)),
+    ],
+    ids=str,
+)
+def test_select(image_directory: Path, points, geo_filter: GeoFilter):
+    selected = get_geo_index(image_directory).select(geo_filter)
+    expected = [f"{i:04d}.jpg" for i in _expected(points, geo_filter)]
+    assert sorted(selected) == sorted(expected)
+    if geo_filter.center is not None:
+        lat, lon = np.array([points[int(filename[:4])] for filename in selected]).reshape(-1, 2).T
+        assert np.all(np.diff(haversine_km(geo_filter.center[0], geo_filter.center[1], lat, lon)) >= 0)  # nearest first
+    assert "no_location.jpg" not in selected
+
+
+def test_search_ranges_contain_circle():
+    rng = np.random.default_rng(1)
+    for _ in range(200):
+        center = (float(rng.uniform(-90, 90)), float(rng.uniform(-180, 180)))
+        radius_km = float(rng.uniform(1, 5_000))
+        (min_lat, max_lat), lon_ranges = _get_search_ranges(GeoFilter(center=center, radius_km=radius_km))
+        lat, lon = rng.uniform(-90, 90, 2_000), rng.uniform(-180, 180, 2_000)
+        inside = haversine_km(center[0], center[1], lat, lon) <= radius_km
+        in_lat_range = (lat >= min_lat) & (lat <= max_lat)
+        in_lon_range = np.any([(lon >= lo) & (lon <= hi) for lo, hi in lon_ranges], axis=0)
+        assert np.all(in_lat_range[inside] & in_lon_range[inside])
+
+
+def test_incremental_update(tmp_path: Path, monkeypatch):
+    write_metadata(tmp_path, "a.jpg", lat_lon=(52.37, 4.90))
+    write_metadata(tmp_path, "b.jpg", lat_lon=(-33.87, 151.21))
+    near_amsterdam = GeoFilter(center=(52.37, 4.90), radius_km=10)
+    assert get_geo_index(tmp_path).select(near_amsterdam) == ["a.jpg"]
+
+    # up to date -> metadata folder is not listed
+    def scan_metadata_files(image_directory: Path):
+        raise AssertionError("metadata folder listed")
+
+    monkeypatch.setattr("core.tag._metadata_index._scan_metadata_files", scan_metadata_files)
+    assert get_geo_index(tmp_path).select(near_amsterdam) == ["a.jpg"]
+    monkeypatch.undo()
+
+    write_metadata(tmp_path, "b.jpg", lat_lon=(52.36, 4.91))
+    write_metadata(tmp_path, "c.jpg")
+    os.remove(tmp_path / "metadata" / "a.jpg.json")
+    index = get_geo_index(tmp_path)
+    assert index.select(near_amsterdam) == ["b.jpg"]
+    assert sorted(index.filenames.tolist()) == ["b.jpg", "c.jpg"]
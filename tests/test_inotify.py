@@ -0,0 +1,92 @@
+import struct
+from pathlib import Path
+
+import pytest
+
+from core.tag._inotify import (
+    _EVENT_STRUCT,
+    IN_CLOSE_WRITE,
+    IN_CREATE,
+    IN_ISDIR,
+    IN_MOVED_TO,
+    IN_Q_OVERFLOW,
+    InotifyWatcher,
+    _parse_events,
+)
+
+DIRECTORIES = {1: Path("/photos/2024"), 2: Path("/photos/2025")}
+
+
+def _event(wd: int, mask: int, name: str = "", padded_len: int | None = None) -> bytes:
+    """Raw inotify event, with the name NUL-padded like the kernel does (to a multiple of 16 bytes by default)."""
+    name_bytes = name.encode()
+    name_len = 0 if not name else (padded_len or (len(name_bytes) // 16 + 1) * 16)
+    return _EVENT_STRUCT.pack(wd, mask, 0, name_len) + name_bytes.ljust(name_len, b"\0")
+
+
+def test_parse_events_single():
+    assert _parse_events(_event(1, IN_CLOSE_WRITE, "a.jpg"), DIRECTORIES) == [(Path("/photos/2024"), "a.jpg", False)]
+
+
+def test_parse_events_multiple_in_one_buffer():
+    buffer = (
+        _event(1, IN_CLOSE_WRITE, "a.jpg")
+        + _event(2, IN_MOVED_TO, "a_very_long_filename_spanning_multiple_blocks.jpg")
+        + _event(1, IN_MOVED_TO | IN_ISDIR, "new_folder")
+    )
+    assert _parse_events(buffer, DIRECTORIES) == [
+        (Path("/photos/2024"), "a.jpg", False),
+        (Path("/photos/2025"), "a_very_long_filename_spanning_multiple_blocks.jpg", False),
+        (Path("/photos/2024"), "new_folder", True),
+    ]
+
+
+def test_parse_events_name_exactly_filling_padding():
+    name = "x" * 16  # kernel pads to >= len(name) + 1, but accept names without terminating NUL as well
+    assert _parse_events(_event(1, IN_CLOSE_WRITE, name, padded_len=16), DIRECTORIES) == [
+        (Path("/photos/2024"), name, False)
+    ]
+
+
+def test_parse_events_ignores_file_creation():
+    buffer = _event(1, IN_CREATE, "partial.jpg") + _event(1, IN_CREATE | IN_ISDIR, "sub")
+    assert _parse_events(buffer, DIRECTORIES) == [(Path("/photos/2024"), "sub", True)]
+
+
+def test_parse_events_ignores_unknown_watches_and_nameless_events():
+    buffer = _event(99, IN_CLOSE_WRITE, "a.jpg") + _event(1, IN_CLOSE_WRITE)
+    assert _parse_events(buffer, DIRECTORIES) == []
+
+
+def test_parse_events_non_utf8_name():
+    raw_name = b"caf\xe9.jpg"
+    buffer = _EVENT_STRUCT.pack(1, IN_CLOSE_WRITE, 0, 16) + raw_name.ljust(16, b"\0")
+    [(_, name, _)] = _parse_events(buffer, DIRECTORIES)
+    assert name.encode(errors="surrogateescape") == raw_name
+
+
+def test_parse_events_overflow():
+    buffer = _event(1, IN_CLOSE_WRITE, "a.jpg") + struct.pack("iIII", -1, IN_Q_OVERFLOW, 0, 0)
+    assert _parse_events(buffer, DIRECTORIES) is None
+
+
+def test_parse_events_empty():
+    assert _parse_events(b"", DIRECTORIES) == []
+
+
+@pytest.mark.skipif(not InotifyWatcher.is_supported(), reason="inotify not supported on this platform")
+def test_watcher_reports_written_files_and_new_folders(tmp_path: Path):
+    watcher = InotifyWatcher()
+    try:
+        watcher.add_watch(tmp_path)
+        assert watcher.read_events(timeout=0) == []
+
+        with open(tmp_path / "a.jpg", "wb") as f:
+            f.write(b"not complete yet")
+            assert watcher.read_events(timeout=0.1) == []  # IN_CREATE of a file is not reported
+        (tmp_path / "sub").mkdir()
+
+        events = watcher.read_events(timeout=1.0)
+        assert sorted(events) == [(tmp_path, "a.jpg", False), (tmp_path, "sub", True)]
+    finally:
+        watcher.close()
@@ -0,0 +1,175 @@
+import multiprocessing
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from core.tag._leases import LeaseManager
+
+N_IMAGES = 200
+N_WORKERS = 6
+
+# worker processes only need to be independent processes (with their own LeaseManager), which forking is faster for
+_CONTEXT = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn")
+
+
+# =================================================================================================
+#  Workers (run in separate processes)
+# =================================================================================================
+def _claim_all(directory: Path, expiry_sec: float, barrier, results):
+    """Try to claim all images at the same time as the other workers & report (claimed, held, n_reclaimed)."""
+    with LeaseManager(directory, expiry_sec=expiry_sec, heartbeat_sec=60) as leases:
+        barrier.wait()
+        claimed = [i for i in range(N_IMAGES) if leases.try_acquire(directory / f"{i:03d}.jpg")]
+        barrier.wait()  # nobody releases before everyone is done claiming
+        held = [i for i in claimed if leases.is_held(directory / f"{i:03d}.jpg")]
+        results.put((leases.worker_id, claimed, held, leases.n_reclaimed))
+        barrier.wait()
+
+
+def _read_leases(directory: Path, started, stop, results):
+    """Keep reading all lease files & report the number of reads that returned an empty (partially written) lease."""
+    lease_directory = directory / "metadata" / "_leases"
+    n_reads, n_empty = 0, 0
+    started.set()
+    while not stop.is_set():
+        for lease_path in lease_directory.glob("*.lease"):
+            try:
+                n_empty += lease_path.read_text() == ""
+                n_reads += 1
+            except FileNotFoundError:
+                pass
+    results.put((n_reads, n_empty))
+
+
+def _run_workers(directory: Path, expiry_sec: float) -> list[tuple[str, list[int], list[int], int]]:
+    barrier, results = _CONTEXT.Barrier(N_WORKERS), _CONTEXT.Queue()
+    processes = [
+        _CONTEXT.Process(target=_claim_all, args=(directory, expiry_sec, barrier, results)) for _ in range(N_WORKERS)
+    ]
+    for process in processes:
+        process.start()
+    worker_results = [results.get(timeout=60) for _ in processes]
+    for process in processes:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+    return worker_results
+
+
+def _create_expired_leases(directory: Path, age_sec: float):
+    """Leases of a crashed worker, last refreshed age_sec ago."""
+    lease_directory = directory / "metadata" / "_leases"
+    lease_directory.mkdir(parents=True)
+    t = time.time() - age_sec
+    for i in range(N_IMAGES):
+        lease_path = lease_directory / f"{i:03d}.jpg.lease"
+        lease_path.write_text("crashed-host:1234:abcdef01")
+        os.utime(lease_path, (t, t))
+
+
+# =================================================================================================
+#  Tests
+# =================================================================================================
+def test_each_image_is_claimed_by_exactly_one_worker(tmp_path: Path):
+    worker_results = _run_workers(tmp_path, expiry_sec=600)
+
+    claimed = sorted(i for _, worker_claimed, _, _ in worker_results for i in worker_claimed)
+    assert claimed == list(range(N_IMAGES))  # every image claimed, none of them twice
+    assert all(worker_held == worker_claimed for _, worker_claimed, worker_held, _ in worker_results)
+    assert sum(n_reclaimed for *_, n_reclaimed in worker_results) == 0
+    assert not list((tmp_path / "metadata" / "_leases").iterdir())  # all released, no temporary files left
+
+
+def test_expired_leases_are_reclaimed_exactly_once(tmp_path: Path):
+    _create_expired_leases(tmp_path, age_sec=3_600)
+    worker_results = _run_workers(tmp_path, expiry_sec=600)
+
+    assert sum(n_reclaimed for *_, n_reclaimed in worker_results) == N_IMAGES
+    held = sorted(i for _, _, worker_held, _ in worker_results for i in worker_held)
+    assert held == list(range(N_IMAGES))  # in the end, every image is held by exactly 1 worker
+    assert not list((tmp_path / "metadata" / "_leases").iterdir())
+
+
+def test_live_leases_are_not_reclaimed(tmp_path: Path):
+    _create_expired_leases(tmp_path, age_sec=10)
+    worker_results = _run_workers(tmp_path, expiry_sec=600)
+
+    assert all(worker_claimed == [] for _, worker_claimed, _, _ in worker_results)
+    assert sum(n_reclaimed for *_, n_reclaimed in worker_results) == 0
+    assert len(list((tmp_path / "metadata" / "_leases").glob("*.lease"))) == N_IMAGES
+
+
+def test_leases_are_never_empty(tmp_path: Path):
+    started, stop, results = _CONTEXT.Event(), _CONTEXT.Event(), _CONTEXT.Queue()
+    (tmp_path / "metadata" / "_leases").mkdir(parents=True)
+    reader = _CONTEXT.Process(target=_read_leases, args=(tmp_path, started, stop, results))
+    reader.start()
+    try:
+        assert started.wait(timeout=60)
+        for _ in range(5):
+            with LeaseManager(tmp_path) as leases:
+                for i in range(N_IMAGES):
+                    assert leases.try_acquire(tmp_path / f"{i:03d}.jpg")
+                    assert leases.is_held(tmp_path / f"{i:03d}.jpg")
+    finally:
+        stop.set()
+        n_reads, n_empty = results.get(timeout=60)
+        reader.join(timeout=60)
+    assert n_reads > 0
+    assert n_empty == 0
+
+
+def test_fresh_lease_renamed_concurrently_is_put_back(tmp_path: Path, monkeypatch):
+    """
+    Another worker reclaims an expired lease & acquires the image, between our expiry check and our rename, such that
+    we rename its fresh lease, which should be put back.
+    """
+    _create_expired_leases(tmp_path, age_sec=3_600)
+    image_path = tmp_path / "000.jpg"
+    other, us = LeaseManager(tmp_path), LeaseManager(tmp_path)
+    rename = os.rename
+
+    def rename_after_other_worker_reclaimed(src, dst):
+        monkeypatch.setattr(os, "rename", rename)
+        assert other.try_acquire(image_path)
+        rename(src, dst)
+
+    monkeypatch.setattr(os, "rename", rename_after_other_worker_reclaimed)
+    assert not us.try_acquire(image_path)
+    assert other.is_held(image_path)
+    assert not us.is_held(image_path)
+    assert (other.n_reclaimed, us.n_reclaimed) == (1, 0)
+    assert sorted(path.name for path in us.lease_directory.glob("000.jpg*")) == ["000.jpg.lease"]
+
+
+def test_fresh_lease_renamed_concurrently_and_replaced(tmp_path: Path, monkeypatch):
+    """
+    Same as above, but yet another worker acquires the image while the fresh lease is renamed away, in which case it
+    can't be put back:  the worker it belonged to finds out it lost its lease, using is_held.
+    """
+    _create_expired_leases(tmp_path, age_sec=3_600)
+    image_path = tmp_path / "000.jpg"
+    other, another, us = LeaseManager(tmp_path), LeaseManager(tmp_path), LeaseManager(tmp_path)
+    rename = os.rename
+
+    def rename_during_reclaim(src, dst):
+        monkeypatch.setattr(os, "rename", rename)
+        assert other.try_acquire(image_path)
+        rename(src, dst)
+        assert another.try_acquire(image_path)
+
+    monkeypatch.setattr(os, "rename", rename_during_reclaim)
+    assert not us.try_acquire(image_path)
+    assert [manager.is_held(image_path) for manager in [other, another, us]] == [False, True, False]
+    assert sorted(path.name for path in us.lease_directory.glob("000.jpg*")) == ["000.jpg.lease"]
+
+
+@pytest.mark.parametrize("expiry_sec", [0.5])
+def test_heartbeat_keeps_leases_alive(tmp_path: Path, expiry_sec: float):
+    with LeaseManager(tmp_path, expiry_sec=expiry_sec, heartbeat_sec=0.1) as holder:
+        assert holder.try_acquire(tmp_path / "000.jpg")
+        time.sleep(3 * expiry_sec)
+        other = LeaseManager(tmp_path, expiry_sec=expiry_sec)
+        assert not other.try_acquire(tmp_path / "000.jpg")
+        assert holder.is_held(tmp_path / "000.jpg")
@@ -0,0 +1,327 @@
+import json
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import ollama
+import pytest
+
+from core.models import OllamaEndpoint, OllamaPool
+
+MESSAGES = [{"role": "user", "content": "Describe this image."}]
+
+
+# =================================================================================================
+#  Stub Ollama server
+# =================================================================================================
+class StubOllamaServer:
+    """
+    Minimal stand-in for 'ollama serve' (/api/tags & /api/chat, streamed or not) on an ephemeral port, answering
+    every chat request with its own name, such that tests can tell which endpoint served a request.
+
+    Behavior can be changed while running:
+      - models: models reported by /api/tags
+      - fail: None (normal), 'drop' (close the connection without a response, or halfway a streamed response) or
+              'error' (HTTP 500)
+      - gate: if set, chat requests block until the event is set
+    """
+
+    def __init__(self, name: str, models: list[str] = ("llava:7b",)):
+        self.name = name
+        self.models = list(models)
+        self.fail: str | None = None
+        self.gate: threading.Event | None = None
+        self.n_requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._connections: set[socket.socket] = set()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._create_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+
+    @property
+    def host(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def stop(self):
+        """Go down:  stop accepting connections & close all open (keep-alive) connections."""
+        self._server.shutdown()
+        self._server.server_close()
+        with self._lock:
+            for connection in self._connections:
+                try:
+                    connection.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass  # already closed
+
+    def _create_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server._connections.add(self.connection)
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._send_json({"models": [{"name": model, "model": model} for model in server.models]})
+                else:
+                    self._send_json({"error": "not found"}, status=404)
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if self.path != "/api/chat":
+                    self._send_json({"error": "not found"}, status=404)
+                    return
+                elif request.get("model") not in server.models:
+                    self._send_json({"error": f"model '{request.get('model')}' not found"}, status=404)
+                    return
+
+                with server._lock:
+                    server.n_requests += 1
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                try:
+                    if server.gate is not None:
+                        server.gate.wait(timeout=10)
+                    if server.fail == "error":
+                        self._send_json({"error": "internal server error"}, status=500)
+                    elif server.fail == "drop" and not request.get("stream", True):
+                        self._drop_connection()
+                    elif request.get("stream", True):
+                        self._send_stream(request["model"])
+                    else:
+                        self._send_json(self._response(request["model"], server.name, done=True))
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+            def _response(self, model: str, content: str, done: bool) -> dict:
+                return {
+                    "model": model,
+                    "created_at": "2024-01-01T00:00:00Z",
+                    "message": {"role": "assistant", "content": content},
+                    "done": done,
+                    **({"done_reason": "stop", "eval_count": 3} if done else {}),
+                }
+
+            def _send_stream(self, model: str):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for i, token in enumerate([server.name, " says", " hi"]):
+                    if (server.fail == "drop") and (i == 2):
+                        self._drop_connection()  # halfway the response
+                        return
+                    self._send_chunk(json.dumps(self._response(model, token, done=False)) + "\n")
+                self._send_chunk(json.dumps(self._response(model, "", done=True)) + "\n")
+                self._send_chunk("")
+
+            def _send_chunk(self, data: str):
+                encoded = data.encode()
+                self.wfile.write(f"{len(encoded):x}\r\n".encode() + encoded + b"\r\n")
+                self.wfile.flush()
+
+            def _send_json(self, data: dict, status: int = 200):
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _drop_connection(self):
+                self.close_connection = True
+                self.wfile.flush()
+                self.connection.shutdown(socket.SHUT_RDWR)
+
+        return Handler
+
+
+@pytest.fixture
+def stub_servers():
+    """Factory of stub Ollama servers, which are all stopped afterward."""
+    servers = []
+
+    def create(name: str, models: list[str] = ("llava:7b",)) -> StubOllamaServer:
+        servers.append(StubOllamaServer(name, models))
+        return servers[-1]
+
+    yield create
+    for server in servers:
+        if server.gate is not None:
+            server.gate.set()
+        server.stop()
+
+
+def _chat(pool: OllamaPool) -> str:
+    return pool.chat(model="llava:7b", messages=MESSAGES, stream=False).message.content
+
+
+def _chat_stream(pool: OllamaPool) -> str:
+    return pool.chat_stream(model="llava:7b", messages=MESSAGES).content
+
+
+def _wait_until(condition, timeout: float = 5.0):
+    t_end = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < t_end, "timed out"
+        time.sleep(0.01)
+
+
+# =================================================================================================
+#  Tests
+# =================================================================================================
+def test_chat_and_stream(stub_servers):
+    server = stub_servers("a")
+    pool = OllamaPool([OllamaEndpoint(server.host)], timeout_sec=5)
+    assert _chat(pool) == "a"
+    result = pool.chat_stream(model="llava:7b", messages=MESSAGES)
+    assert (result.content, result.n_tokens, result.stopped_early) == ("a says hi", 3, False)
+
+    result = pool.chat_stream(should_stop=lambda content: content.endswith("says"), model="llava:7b", messages=MESSAGES)
+    assert (result.content, result.stopped_early) == ("a says", True)
+
+
+def test_weighted_least_loaded_dispatch(stub_servers):
+    servers = [stub_servers("a"), stub_servers("b")]
+    for server in servers:
+        server.gate = threading.Event()
+    pool = OllamaPool([OllamaEndpoint(servers[0].host, weight=2), OllamaEndpoint(servers[1].host, weight=1)])
+    assert pool.concurrency == 3
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(_chat, pool) for _ in range(3)]
+        _wait_until(lambda: (servers[0].in_flight, servers[1].in_flight) == (2, 1))  # a: 0/2 -> b: 0/1 -> a: 1/2
+
+        # all endpoints at capacity -> the 4th request waits for a free slot
+        fourth = executor.submit(_chat, pool)
+        time.sleep(0.2)
+        assert not fourth.done()
+        assert servers[0].n_requests + servers[1].n_requests == 3
+
+        servers[1].gate.set()  # b finishes its request first -> the 4th goes to b
+        _wait_until(lambda: fourth.done())
+        assert fourth.result() == "b"
+        servers[0].gate.set()
+        assert sorted(future.result() for future in futures) == ["a", "a", "b"]
+
+    assert (servers[0].max_in_flight, servers[1].max_in_flight) == (2, 1)
+
+
+def test_weighted_dispatch_under_load(stub_servers):
+    servers = [stub_servers("a"), stub_servers("b"), stub_servers("c")]
+    pool = OllamaPool([OllamaEndpoint(server.host, weight) for server, weight in zip(servers, [3, 2, 1])])
+
+    with ThreadPoolExecutor(max_workers=12) as executor:
+        results = list(executor.map(lambda _: _chat(pool), range(120)))
+
+    assert sorted(set(results)) == ["a", "b", "c"]
+    assert [server.max_in_flight <= weight for server, weight in zip(servers, [3, 2, 1])] == [True] * 3
+    assert results.count("a") > results.count("c")
+
+
+@pytest.mark.parametrize("chat", [_chat, _chat_stream], ids=["chat", "chat_stream"])
+@pytest.mark.parametrize("fail", ["drop", "error"])
+def test_failover_of_in_flight_requests(stub_servers, chat, fail: str):
+    servers = [stub_servers("a"), stub_servers("b")]
+    servers[0].fail = fail
+    pool = OllamaPool([OllamaEndpoint(server.host) for server in servers], retry_sec=60, timeout_sec=5)
+
+    # a fails while handling the request (halfway the response when streaming) -> retried on b
+    assert chat(pool).startswith("b")
+    assert servers[0].n_requests == 1
+
+    # a is out of rotation, even though it would be the least-loaded endpoint
+    assert [chat(pool).startswith("b") for _ in range(3)] == [True] * 3
+    assert servers[0].n_requests == 1
+
+
+def test_failover_when_endpoint_goes_down(stub_servers):
+    servers = [stub_servers("a"), stub_servers("b")]
+    pool = OllamaPool([OllamaEndpoint(server.host) for server in servers], retry_sec=60, timeout_sec=5)
+    assert _chat(pool) == "a"
+    servers[0].stop()
+    assert [_chat(pool) for _ in range(3)] == ["b"] * 3
+
+
+def test_no_endpoint_available(stub_servers):
+    servers = [stub_servers("a"), stub_servers("b")]
+    for server in servers:
+        server.fail = "drop"
+    pool = OllamaPool([OllamaEndpoint(server.host) for server in servers], retry_sec=60, timeout_sec=5)
+    with pytest.raises(ConnectionError):
+        _chat(pool)
+    assert [server.n_requests for server in servers] == [1, 1]  # each endpoint tried once
+
+
+def test_request_errors_are_not_retried(stub_servers):
+    servers = [stub_servers("a"), stub_servers("b")]
+    pool = OllamaPool([OllamaEndpoint(server.host) for server in servers], timeout_sec=5)
+    with pytest.raises(ollama.ResponseError):
+        pool.chat(model="missing:7b", messages=MESSAGES, stream=False)
+    with pytest.raises(ollama.ResponseError):
+        pool.chat_stream(model="missing:7b", messages=MESSAGES)
+    assert _chat(pool) == "a"  # endpoints remain in rotation
+
+
+def test_failed_endpoint_is_readmitted_after_retry_sec(stub_servers):
+    servers = [stub_servers("a"), stub_servers("b")]
+    servers[0].fail = "error"
+    pool = OllamaPool([OllamaEndpoint(server.host) for server in servers], retry_sec=0.5, timeout_sec=5)
+    assert _chat(pool) == "b"
+    servers[0].fail = None  # a recovers, but is only tried again after retry_sec
+    assert _chat(pool) == "b"
+
+    time.sleep(0.6)
+    assert _chat(pool) == "a"  # back in rotation (& least loaded, being the 1st endpoint)
+    assert servers[0].n_requests == 2
+
+
+def test_waiting_requests_pick_up_readmitted_endpoint(stub_servers):
+    server = stub_servers("a")
+    server.fail = "error"
+    pool = OllamaPool([OllamaEndpoint(server.host)], retry_sec=0.3, timeout_sec=5)
+    with pytest.raises(ConnectionError):
+        _chat(pool)  # only endpoint failed
+    with pytest.raises(ConnectionError):
+        _chat(pool)  # ... & is out of rotation
+    server.fail = None
+    time.sleep(0.4)
+    assert _chat(pool) == "a"
+
+
+def test_ensure_model_exists(stub_servers):
+    servers = [stub_servers("a", ["llava:7b", "moondream:1.8b"]), stub_servers("b", ["moondream:1.8b"])]
+    down = stub_servers("down")
+    down.stop()
+    pool = OllamaPool([OllamaEndpoint(server.host) for server in servers + [down]], timeout_sec=5)
+
+    assert pool.check_health() == [["llava:7b", "moondream:1.8b"], ["moondream:1.8b"], None]
+    assert pool.list_models() == ["llava:7b", "moondream:1.8b"]
+
+    # b lacks the model -> taken out of rotation for good, even when it would be least loaded
+    pool.ensure_model_exists("llava:7b")
+    servers[0].gate = threading.Event()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(_chat, pool) for _ in range(2)]
+        _wait_until(lambda: servers[0].in_flight == 1)
+        time.sleep(0.2)
+        assert servers[0].in_flight == 1  # 2nd request waits for a, instead of going to b
+        servers[0].gate.set()
+        assert [future.result() for future in futures] == ["a", "a"]
+    assert servers[1].n_requests == 0
+
+    with pytest.raises(ValueError):
+        pool.ensure_model_exists("llama3.2-vision:11b")
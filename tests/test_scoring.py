@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from core.search import ScoringMode, VectorQuantization
+from core.search._scoring import EmbeddingMatrix
+from core.tag.embeddings import normalize_rows
+
+
+def _random_rows(n: int, d: int, seed: int) -> np.ndarray:
+    return normalize_rows(np.random.default_rng(seed).normal(size=(n, d)).astype(np.float32))
+
+
+@pytest.mark.parametrize("dim", [None, 128, 100, 64, 13])
+def test_binary_similarities_match_simhash(dim: int | None):
+    corpus = _random_rows(50, 128, seed=0)
+    queries = _random_rows(3, 128, seed=1)
+    matrix = EmbeddingMatrix(np.arange(50), corpus).with_scoring_mode(
+        ScoringMode(dim=dim, quantization=VectorQuantization.BINARY)
+    )
+    true_dim = dim or 128
+    assert matrix.dim == true_dim
+    assert matrix.values.shape[1] == (true_dim + 7) // 8
+
+    # reference: fraction of differing signs over exactly the (truncated) dimensions
+    differing = (queries[:, None, :true_dim] > 0) != (corpus[None, :, :true_dim] > 0)
+    expected = np.cos(np.pi * differing.sum(axis=2) / true_dim)
+    np.testing.assert_allclose(matrix.similarities(queries), expected, atol=1e-6)
+
+
+@pytest.mark.parametrize("dim", [100, 128])
+def test_binary_similarity_of_identical_vectors_is_one(dim: int):
+    corpus = _random_rows(10, 128, seed=2)
+    matrix = EmbeddingMatrix(np.arange(10), corpus).with_scoring_mode(
+        ScoringMode(dim=dim, quantization=VectorQuantization.BINARY)
+    )
+    np.testing.assert_allclose(np.diag(matrix.similarities(corpus)), 1.0, atol=1e-6)
+
+
+@pytest.mark.parametrize("quantization", list(VectorQuantization))
+def test_quantized_similarities_approximate_exact(quantization: VectorQuantization):
+    corpus = _random_rows(200, 128, seed=3)
+    queries = _random_rows(5, 128, seed=4)
+    exact = queries[:, :100] @ normalize_rows(corpus[:, :100]).T / np.linalg.norm(queries[:, :100], axis=1)[:, None]
+    approx = (
+        EmbeddingMatrix(np.arange(200), corpus)
+        .with_scoring_mode(ScoringMode(dim=100, quantization=quantization))
+        .similarities(queries)
+    )
+    tolerance = {"float32": 1e-5, "float16": 1e-3, "int8": 2e-2, "binary": 0.5}[quantization.value]
+    assert np.max(np.abs(approx - exact)) < tolerance
@@ -0,0 +1,74 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from core.search import ScoringMode, catalog_similar_images, similar_images
+from core.search._scoring import CorpusEmbeddings, rank_scores
+from core.search._similar_images import get_example_query_embeddings
+from core.tag import read_metadata_table
+
+from .helpers import random_embedding, write_metadata
+
+
+def _write_images(directory: Path, n: int):
+    for i in range(n):
+        img = random_embedding(f"{directory.name}/img/{i}") if i % 7 else None  # some images without embeddings
+        txt = random_embedding(f"{directory.name}/txt/{i}") if i % 3 else None  # some without text embedding
+        write_metadata(directory, f"{i:02d}.jpg", img=img, txt=txt)
+
+
+def _expected_results(directory: Path, filename: str, min_score: float, scoring_mode: ScoringMode = ScoringMode()):
+    """Reference implementation:  score all metadata in memory, best score over all example queries."""
+    corpus = CorpusEmbeddings.from_table(read_metadata_table(directory)).with_scoring_mode(scoring_mode)
+    scores, is_txt = corpus.score(get_example_query_embeddings(directory / filename))
+    i_best = np.argmax(scores, axis=0)
+    columns = np.arange(scores.shape[1])
+    results = rank_scores(corpus.filenames, scores[i_best, columns], is_txt[i_best, columns], min_score)
+    return [result for result in results if result.filename != filename]
+
+
+def _as_tuples(results) -> list[tuple[str, float, str]]:
+    return [(result.filename, round(result.score, 5), result.score_src) for result in results]
+
+
+@pytest.mark.parametrize("example", ["01.jpg", "03.jpg"])  # with & without text embedding
+@pytest.mark.parametrize("scoring_mode", [ScoringMode(), ScoringMode(dim=64)])
+def test_similar_images_matches_in_memory_scoring(tmp_path: Path, example: str, scoring_mode: ScoringMode):
+    _write_images(tmp_path, 40)
+    results = similar_images(tmp_path, example, -1.0, scoring_mode)
+    assert example not in [result.filename for result in results]
+    assert len(results) == 40 - 6 - 1  # all images with embeddings, except the example
+    assert _as_tuples(results) == _as_tuples(_expected_results(tmp_path, example, -1.0, scoring_mode))
+
+
+def test_similar_images_min_score(tmp_path: Path):
+    _write_images(tmp_path, 40)
+    results = similar_images(tmp_path, "01.jpg", 0.1)
+    assert all(result.score >= 0.1 for result in results)
+    assert _as_tuples(results) == _as_tuples(_expected_results(tmp_path, "01.jpg", 0.1))
+
+
+def test_similar_images_without_embeddings(tmp_path: Path):
+    _write_images(tmp_path, 10)
+    assert similar_images(tmp_path, "00.jpg", -1.0) == []
+
+
+def test_catalog_similar_images(tmp_path: Path):
+    for shard in ["a", "b"]:
+        _write_images(tmp_path / shard, 20)
+
+    results = catalog_similar_images(tmp_path, "a/01.jpg", -1.0)
+
+    query_embeddings = get_example_query_embeddings(tmp_path / "a" / "01.jpg")
+    expected = []
+    for shard in ["a", "b"]:
+        corpus = CorpusEmbeddings.from_table(read_metadata_table(tmp_path / shard))
+        scores, is_txt = corpus.score(query_embeddings)
+        i_best = np.argmax(scores, axis=0)
+        columns = np.arange(scores.shape[1])
+        for result in rank_scores(corpus.filenames, scores[i_best, columns], is_txt[i_best, columns], -1.0):
+            if f"{shard}/{result.filename}" != "a/01.jpg":  # example is only excluded from its own shard
+                expected.append((f"{shard}/{result.filename}", round(result.score, 5), result.score_src))
+    assert len(results) == 2 * (20 - 3) - 1
+    assert _as_tuples(results) == sorted(expected, key=lambda t: (-t[1], t[0]))
@@ -0,0 +1,118 @@
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from core.data import TimeFilter
+from core.tag import get_time_index
+
+from .helpers import write_metadata
+
+# 2024-01-01 is a Monday
+TIMES = {
+    "mon_morning.jpg": datetime(2024, 1, 1, 9, 0, 0),
+    "mon_midnight.jpg": datetime(2024, 1, 1, 0, 0, 0),
+    "tue.jpg": datetime(2024, 1, 2, 12, 30, 0),
+    "sun.jpg": datetime(2024, 1, 7, 23, 59, 59),
+    "feb.jpg": datetime(2024, 2, 29, 12, 0, 0),  # Thursday
+    "dec_2023.jpg": datetime(2023, 12, 31, 23, 59, 59),  # Sunday
+    "1969.jpg": datetime(1969, 7, 20, 20, 17, 40),  # Sunday, before the epoch
+    "tz_aware.jpg": datetime(2024, 3, 15, 10, 0, 0, tzinfo=timezone.utc),  # Friday
+}
+NO_TIME = ["no_time_1.jpg", "no_time_2.jpg"]
+
+
+@pytest.fixture
+def image_directory(tmp_path: Path) -> Path:
+    for filename, dt in TIMES.items():
+        write_metadata(tmp_path, filename, dt=dt)
+    for filename in NO_TIME:
+        write_metadata(tmp_path, filename)
+    return tmp_path
+
+
+def _expected(time_filter: TimeFilter) -> list[str]:
+    """Brute-force reference, in chronological order."""
+    matches = []
+    for filename, dt in sorted(TIMES.items(), key=lambda item: item[1].replace(tzinfo=None)):
+        dt = dt.replace(tzinfo=None)
+        if (time_filter.start is not None) and (dt < time_filter.start):
+            continue
+        if (time_filter.end is not None) and (dt >= time_filter.end):
+            continue
+        if (time_filter.weekdays is not None) and (dt.weekday() not in time_filter.weekdays):
+            continue
+        if (time_filter.months is not None) and (dt.month not in time_filter.months):
+            continue
+        matches.append(filename)
+    return matches
+
+
+def test_index_contents(image_directory: Path):
+    index = get_time_index(image_directory)
+    assert index.filenames.tolist()[: len(TIMES)] == _expected(TimeFilter(start=datetime(1900, 1, 1)))
+    assert sorted(index.filenames.tolist()[len(TIMES) :]) == NO_TIME
+    assert np.all(np.isnat(index.timestamps[len(TIMES) :]))
+
+
+@pytest.mark.parametrize(
+    "time_filter",
+    [
+        TimeFilter(start=datetime(2024, 1, 1)),  # start is inclusive (mon_midnight)
+        TimeFilter(end=datetime(2024, 1, 1)),  # end is exclusive (mon_midnight)
+        TimeFilter(start=datetime(2024, 1, 1, 0, 0, 1)),
+        TimeFilter(end=datetime(2024, 1, 1, 0, 0, 1)),
+        TimeFilter(start=datetime(2024, 1, 1), end=datetime(2024, 1, 8)),
+        TimeFilter(start=datetime(2024, 1, 7, 23, 59, 59), end=datetime(2024, 1, 7, 23, 59, 59)),  # empty range
+        TimeFilter(start=datetime(2024, 6, 1), end=datetime(2024, 1, 1)),  # start after end
+        TimeFilter(start=datetime(2030, 1, 1)),
+        TimeFilter(end=datetime(1900, 1, 1)),
+        TimeFilter(weekdays=frozenset({0})),
+        TimeFilter(weekdays=frozenset({6})),
+        TimeFilter(weekdays=frozenset({3, 4})),
+        TimeFilter(months=frozenset({1})),
+        TimeFilter(months=frozenset({2, 12})),
+        TimeFilter(months=frozenset({7})),
+        TimeFilter(start=datetime(2024, 1, 1), weekdays=frozenset({6}), months=frozenset({1})),
+        TimeFilter(end=datetime(2024, 3, 15, 10, 0, 1)),  # time zone info is ignored
+    ],
+    ids=str,
+)
+def test_select(image_directory: Path, time_filter: TimeFilter):
+    assert get_time_index(image_directory).select(time_filter) == _expected(time_filter)
+
+
+def test_select_never_returns_images_without_time(image_directory: Path):
+    index = get_time_index(image_directory)
+    for time_filter in [TimeFilter(start=datetime(1, 1, 1)), TimeFilter(weekdays=frozenset(range(7)))]:
+        selected = index.select(time_filter)
+        assert len(selected) == len(TIMES)
+        assert not set(selected) & set(NO_TIME)
+
+
+def test_empty_directory(tmp_path: Path):
+    assert get_time_index(tmp_path).select(TimeFilter(start=datetime(2024, 1, 1))) == []
+
+
+def test_incremental_update(image_directory: Path, monkeypatch):
+    get_time_index(image_directory)
+
+    # up to date -> metadata folder is not listed
+    def scan_metadata_files(image_directory: Path):
+        raise AssertionError("metadata folder listed")
+
+    monkeypatch.setattr("core.tag._metadata_index._scan_metadata_files", scan_metadata_files)
+    assert get_time_index(image_directory).select(TimeFilter(months=frozenset({2}))) == ["feb.jpg"]
+    monkeypatch.undo()
+
+    # changed, added & removed images
+    write_metadata(image_directory, "feb.jpg", dt=datetime(2024, 5, 1))
+    write_metadata(image_directory, "new.jpg", dt=datetime(2024, 2, 1))
+    os.remove(image_directory / "metadata" / "tue.jpg.json")
+    index = get_time_index(image_directory)
+    assert index.select(TimeFilter(months=frozenset({2}))) == ["new.jpg"]
+    assert index.select(TimeFilter(months=frozenset({5}))) == ["feb.jpg"]
+    assert "tue.jpg" not in index.filenames.tolist()
+    assert len(index.filenames) == len(TIMES) + len(NO_TIME)